@@ -158,8 +158,14 @@ CONDA_PACKAGE_EXTENSIONS = (
 CONDA_PACKAGE_PARTS = tuple(f"{ext}.part" for ext in CONDA_PACKAGE_EXTENSIONS)
 CONDA_TARBALL_EXTENSION = CONDA_PACKAGE_EXTENSION_V1  # legacy support for conda-build
 CONDA_TEMP_EXTENSION = ".c~"
+CONDA_PARTIAL_EXTENSION = ".partial"
 CONDA_TEMP_EXTENSIONS = (CONDA_TEMP_EXTENSION, ".trash")
 CONDA_LOGS_DIR = ".logs"
+# in the pkgs_dir, see conda.core.file_store
+FILE_STORE_DIR = ".files"
+# in the pkgs_dir index cache
+SOLVE_CACHE_DIR = "solve"
+PACKAGE_CACHE_INDEX_FN = "packages.json"
 
 UNKNOWN_CHANNEL = "<unknown>"
 REPODATA_FN = "repodata.json"
@@ -236,10 +236,16 @@ class Context(Configuration):
     _repodata_threads = ParameterLoader(
         PrimitiveParameter(0, element_type=int), aliases=("repodata_threads",)
     )
+    # parse repodata in worker processes; 0 keeps loading in threads
+    repodata_processes = ParameterLoader(PrimitiveParameter(0, element_type=int))
     # download packages
     _fetch_threads = ParameterLoader(
         PrimitiveParameter(0, element_type=int), aliases=("fetch_threads",)
     )
+    extract_while_downloading = ParameterLoader(PrimitiveParameter(False))
+    adaptive_fetch = ParameterLoader(PrimitiveParameter(False))
+    # extract large packages in worker processes; 0 extracts in threads
+    extract_processes = ParameterLoader(PrimitiveParameter(0, element_type=int))
     _verify_threads = ParameterLoader(
         PrimitiveParameter(0, element_type=int), aliases=("verify_threads",)
     )
@@ -281,6 +287,8 @@ class Context(Configuration):
     use_index_cache = ParameterLoader(PrimitiveParameter(False))
 
     separate_format_cache = ParameterLoader(PrimitiveParameter(False))
+    package_file_store = ParameterLoader(PrimitiveParameter(False))
+    package_cache_index = ParameterLoader(PrimitiveParameter(False))
 
     _root_prefix = ParameterLoader(
         PrimitiveParameter(""), aliases=("root_dir", "root_prefix")
@@ -308,6 +316,14 @@ class Context(Configuration):
     # number of seconds to cache repodata locally
     #   True/1: respect Cache-Control max-age header
     #   False/0: always fetch remote repodata (HTTP 304 responses respected)
+    # seconds past local_repodata_ttl to keep using cached repodata while it is
+    #   refreshed in the background
+    local_repodata_stale_grace = ParameterLoader(
+        PrimitiveParameter(0, element_type=int)
+    )
+    repodata_index_socket = ParameterLoader(
+        PrimitiveParameter("", element_type=str), expandvars=True
+    )
 
     # remote connection details
     ssl_verify = ParameterLoader(
@@ -441,6 +457,7 @@ class Context(Configuration):
     experimental = ParameterLoader(SequenceParameter(PrimitiveParameter("", str)))
     no_lock = ParameterLoader(PrimitiveParameter(False))
     repodata_use_zst = ParameterLoader(PrimitiveParameter(True))
+    repodata_stream_parse = ParameterLoader(PrimitiveParameter(False))
 
     ####################################################
     #               Solver Configuration               #
@@ -448,7 +465,16 @@ class Context(Configuration):
     deps_modifier = ParameterLoader(PrimitiveParameter(DepsModifier.NOT_SET))
     update_modifier = ParameterLoader(PrimitiveParameter(UpdateModifier.UPDATE_SPECS))
     sat_solver = ParameterLoader(PrimitiveParameter(SatSolverChoice.PYCOSAT))
+    # bisect solver objectives in worker processes; 0 bisects sequentially
+    sat_portfolio_processes = ParameterLoader(PrimitiveParameter(0, element_type=int))
+    sat_objective_encodings = ParameterLoader(
+        MapParameter(PrimitiveParameter("", element_type=str))
+    )
     solver_ignore_timestamps = ParameterLoader(PrimitiveParameter(False))
+    solve_cache = ParameterLoader(PrimitiveParameter(False))
+    solve_cache_max_entries = ParameterLoader(
+        PrimitiveParameter(1000, element_type=int)
+    )
     solver = ParameterLoader(
         PrimitiveParameter(DEFAULT_SOLVER),
         aliases=("experimental_solver",),
@@ -1213,10 +1239,16 @@ class Context(Configuration):
                 "repodata_fns",
                 "use_only_tar_bz2",
                 "repodata_threads",
+                "repodata_processes",
                 "fetch_threads",
+                "extract_while_downloading",
+                "adaptive_fetch",
+                "extract_processes",
                 "experimental",
                 "no_lock",
                 "repodata_use_zst",
+                "repodata_stream_parse",
+                "repodata_index_socket",
             ),
             "Basic Conda Configuration": (  # TODO: Is there a better category name here?
                 "envs_dirs",
@@ -1227,6 +1259,7 @@ class Context(Configuration):
                 "client_ssl_cert",
                 "client_ssl_cert_key",
                 "local_repodata_ttl",
+                "local_repodata_stale_grace",
                 "offline",
                 "proxy_servers",
                 "remote_connect_timeout_secs",
@@ -1246,6 +1279,10 @@ class Context(Configuration):
                 "pip_interop_enabled",
                 "track_features",
                 "solver",
+                "solve_cache",
+                "solve_cache_max_entries",
+                "sat_portfolio_processes",
+                "sat_objective_encodings",
             ),
             "Package Linking and Install-time Configuration": (
                 "allow_softlinks",
@@ -1260,6 +1297,8 @@ class Context(Configuration):
                 "shortcuts_only",
                 "non_admin_enabled",
                 "separate_format_cache",
+                "package_file_store",
+                "package_cache_index",
                 "verify_threads",
                 "execute_threads",
             ),
@@ -1580,6 +1619,38 @@ class Context(Configuration):
                 defaults to None, which uses the default ThreadPoolExecutor behavior.
                 """
             ),
+            extract_while_downloading=dals(
+                """
+                Extract packages as their bytes arrive, instead of after the whole
+                package has been downloaded. The extracted package is only used once
+                the download has been verified. Not supported on Windows.
+                """
+            ),
+            adaptive_fetch=dals(
+                """
+                Limit the packages downloaded at once from each channel host, instead
+                of from all hosts together, and adapt each limit to the host's
+                throughput and errors. fetch_threads is the most for one host. Large
+                packages are downloaded in several parallel byte ranges, if the server
+                supports them.
+                """
+            ),
+            extract_processes=dals(
+                """
+                Worker processes to use when extracting large packages, whose
+                decompression would otherwise hold the interpreter lock of the extract
+                threads. Smaller packages are still extracted in threads. The default,
+                0, extracts all packages in threads.
+                """
+            ),
+            repodata_processes=dals(
+                """
+                Worker processes to use when parsing repodata for several channels and
+                subdirs at once. Each worker writes the processed records to the
+                repodata index cache, which the main process then memory-maps. The
+                default, 0, loads repodata in threads (see repodata_threads).
+                """
+            ),
             force_reinstall=dals(
                 """
                 Ensure that any user-requested package for the current operation is uninstalled
@@ -1613,6 +1684,24 @@ class Context(Configuration):
                 cache repodata before checking the remote server for an update.
                 """
             ),
+            local_repodata_stale_grace=dals(
+                """
+                Number of seconds after cached repodata times out (see
+                local_repodata_ttl) during which it is still used without waiting
+                for the remote server. Stale repodata is instead refreshed in a
+                background process, for use by later commands. The default, 0,
+                always waits for the refresh.
+                """
+            ),
+            repodata_index_socket=dals(
+                """
+                Path of the Unix socket of a local repodata index server, started with
+                `python -m conda.core.index_server`. The server keeps repodata loaded
+                and answers queries from concurrent conda processes, so each of them
+                does not have to parse it. Repodata is loaded in-process when no
+                server is listening. The default, "", does not use a server.
+                """
+            ),
             migrated_channel_aliases=dals(
                 """
                 A list of previously-used channel_alias values. Useful when switching between
@@ -1769,6 +1858,23 @@ class Context(Configuration):
                 to True.
                 """
             ),
+            package_cache_index=dals(
+                """
+                Keep the records of each package cache in an index file, so that
+                loading the cache reads one file instead of the metadata of every
+                package. The index is checked against the modification times of the
+                package cache and its packages.
+                """
+            ),
+            package_file_store=dals(
+                """
+                Store the files of extracted packages once per package cache, by
+                content, and hard link them into each extracted package. Identical
+                files of different builds or formats of a package then take up disk
+                space only once. `conda clean --packages` removes stored files that
+                are no longer used.
+                """
+            ),
             extra_safety_checks=dals(
                 """
                 Spend extra time validating package contents.  Currently, runs sha256 verification
@@ -1877,6 +1983,38 @@ class Context(Configuration):
                 dependencies and specified constraints.
                 """
             ),
+            solve_cache=dals(
+                """
+                Store the results of the classic solver on disk, and reuse them when the
+                same request is solved again against unchanged repodata, installed
+                packages, pins and settings. Remove them with `conda clean --solve-cache`.
+                """
+            ),
+            solve_cache_max_entries=dals(
+                """
+                The number of solutions kept when solve_cache is enabled. The least
+                recently used solutions are removed first.
+                """
+            ),
+            sat_portfolio_processes=dals(
+                """
+                Worker processes to use for minimizing each objective of the classic
+                solver. Several bounds are probed at the same time, spread over the
+                installed SAT solver interfaces (pycosat, pycryptosat, pysat), and the
+                first proof of optimality is taken. The default, 0, probes one bound at
+                a time in the main process.
+                """
+            ),
+            sat_objective_encodings=dals(
+                """
+                How the classic solver encodes the bound on each package metric it
+                minimizes, by metric: channel, version, build, arch or timestamp. The
+                default, bdd, builds a binary decision diagram for every bound tried;
+                totalizer builds a generalized totalizer once per objective, which can
+                need far fewer clauses for large version metrics. For example,
+                `{version: totalizer, build: totalizer}`.
+                """
+            ),
             number_channel_notices=dals(
                 """
                 Sets the number of channel notices to be displayed when running commands
@@ -1899,6 +2037,13 @@ class Context(Configuration):
                 Disable check for `repodata.json.zst`; use `repodata.json` only.
                 """
             ),
+            repodata_stream_parse=dals(
+                """
+                Parse cached `repodata.json` incrementally, one package record at a
+                time, instead of reading and decoding the whole file at once. Lowers
+                peak memory use for large channels.
+                """
+            ),
         )
 
 
@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import os
 import sys
+from collections import Counter
 from logging import getLogger
 from os.path import isdir, join
 from typing import TYPE_CHECKING
@@ -48,7 +49,8 @@ def configure_parser(sub_parsers: _SubParsersAction, **kwargs) -> ArgumentParser
         "-a",
         "--all",
         action="store_true",
-        help="Remove index cache, lock files, unused cache packages, tarballs, and logfiles.",
+        help="Remove index cache, solve cache, lock files, unused cache packages, "
+        "tarballs, and logfiles.",
     )
     removal_target_options.add_argument(
         "-i",
@@ -56,6 +58,11 @@ def configure_parser(sub_parsers: _SubParsersAction, **kwargs) -> ArgumentParser
         action="store_true",
         help="Remove index cache.",
     )
+    removal_target_options.add_argument(
+        "--solve-cache",
+        action="store_true",
+        help="Remove cached solver results.",
+    )
     removal_target_options.add_argument(
         "-p",
         "--packages",
@@ -103,10 +110,10 @@ def configure_parser(sub_parsers: _SubParsersAction, **kwargs) -> ArgumentParser
     return p
 
 
-def _get_size(*parts: str, warnings: list[str] | None) -> int:
+def _get_stat(*parts: str, warnings: list[str] | None) -> os.stat_result:
     path = join(*parts)
     try:
-        stat = os.lstat(path)
+        return os.lstat(path)
     except OSError as e:
         if warnings is None:
             raise
@@ -114,13 +121,15 @@ def _get_size(*parts: str, warnings: list[str] | None) -> int:
 
         # let the user deal with the issue
         raise NotImplementedError
-    else:
-        # TODO: This doesn't handle packages that have hard links to files within
-        # themselves, like bin/python3.3 and bin/python3.3m in the Python package
-        if stat.st_nlink > 1:
-            raise NotImplementedError
 
-        return stat.st_size
+
+def _get_size(*parts: str, warnings: list[str] | None) -> int:
+    stat = _get_stat(*parts, warnings=warnings)
+    # hard linked files may be in use elsewhere
+    if stat.st_nlink > 1:
+        raise NotImplementedError
+
+    return stat.st_size
 
 
 def _get_pkgs_dirs(pkg_sizes: dict[str, dict[str, int]]) -> dict[str, tuple[str, ...]]:
@@ -178,26 +187,50 @@ def find_tarballs() -> dict[str, Any]:
 
 
 def find_pkgs() -> dict[str, Any]:
+    from ..core.file_store import FileStore
+
     warnings: list[str] = []
     pkg_sizes: dict[str, dict[str, int]] = {}
     for pkgs_dir in find_pkgs_dirs():
         # pkgs are directories in pkgs_dir
         _, pkgs, _ = next(os.walk(pkgs_dir))
+        pkg_stats: dict[str, list[os.stat_result]] = {}
         for pkg in pkgs:
             # pkgs also have an info directory
             if not isdir(join(pkgs_dir, pkg, "info")):
                 continue
 
-            # get size
             try:
-                size = sum(
-                    _get_size(root, file, warnings=warnings)
+                pkg_stats[pkg] = [
+                    _get_stat(root, file, warnings=warnings)
                     for root, _, files in os.walk(join(pkgs_dir, pkg))
                     for file in files
-                )
+                ]
             except NotImplementedError:
                 pass
-            else:
+
+        # hard links within the package cache, between packages, within a
+        # package or into the file store, don't put a package in use
+        cache_links = Counter(
+            (stat.st_dev, stat.st_ino)
+            for stats in pkg_stats.values()
+            for stat in stats
+            if stat.st_nlink > 1
+        )
+        for entry in FileStore(pkgs_dir).entries():
+            try:
+                stat = os.lstat(entry.path)
+            except OSError:
+                continue
+            cache_links[(stat.st_dev, stat.st_ino)] += 1
+
+        for pkg, stats in pkg_stats.items():
+            if all(
+                stat.st_nlink <= cache_links[(stat.st_dev, stat.st_ino)]
+                for stat in stats
+                if stat.st_nlink > 1
+            ):
+                size = sum(stat.st_size for stat in stats)
                 pkg_sizes.setdefault(pkgs_dir, {})[pkg] = size
 
     return {
@@ -258,6 +291,18 @@ def rm_pkgs(
             _rm_rf(pkgs_dir, pkg, quiet=quiet, verbose=verbose)
 
 
+def rm_stored_files(*, quiet: bool, verbose: bool, dry_run: bool) -> None:
+    """Remove the files in the package caches' file stores that are unused."""
+    from ..core.file_store import FileStore
+
+    if dry_run:
+        return
+    for pkgs_dir in find_pkgs_dirs():
+        for path in FileStore(pkgs_dir).prune():
+            if not quiet and verbose:
+                print(f"Removed {path}")
+
+
 def find_index_cache() -> list[str]:
     files = []
     for pkgs_dir in find_pkgs_dirs():
@@ -268,6 +313,18 @@ def find_index_cache() -> list[str]:
     return files
 
 
+def find_solve_cache() -> list[str]:
+    from ..base.constants import SOLVE_CACHE_DIR
+
+    files = []
+    for pkgs_dir in find_pkgs_dirs():
+        # solutions are stored within the index cache
+        path = join(pkgs_dir, "cache", SOLVE_CACHE_DIR)
+        if isdir(path):
+            files.append(path)
+    return files
+
+
 def find_pkgs_dirs() -> list[str]:
     from ..core.package_cache_data import PackageCacheData
 
@@ -370,6 +427,7 @@ def _execute(args, parser):
         args.all
         or args.tarballs
         or args.index_cache
+        or args.solve_cache
         or args.packages
         or args.tempfiles
         or args.logfiles
@@ -384,6 +442,11 @@ def _execute(args, parser):
         json_result["tarballs"] = tars = find_tarballs()
         rm_pkgs(**tars, **kwargs, name="tarball(s)")
 
+    if args.solve_cache or args.all:
+        cache = find_solve_cache()
+        json_result["solve_cache"] = {"files": cache}
+        rm_items(cache, **kwargs, name="solve cache(s)")
+
     if args.index_cache or args.all:
         cache = find_index_cache()
         json_result["index_cache"] = {"files": cache}
@@ -392,6 +455,7 @@ def _execute(args, parser):
     if args.packages or args.all:
         json_result["packages"] = pkgs = find_pkgs()
         rm_pkgs(**pkgs, **kwargs, name="package(s)")
+        rm_stored_files(**kwargs)
 
     if args.tempfiles or args.all:
         json_result["tempfiles"] = tmps = find_tempfiles(args.tempfiles)
@@ -1,11 +1,17 @@
 # Copyright (C) 2012 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
+import os
+import pickle
 import sys
 from array import array
-from itertools import combinations
+from contextlib import contextmanager
+from itertools import combinations, cycle, islice
 from logging import DEBUG, getLogger
+from queue import SimpleQueue
+from tempfile import mkstemp
 
 from .constants import TRACE
+from .io import spawn_context
 
 log = getLogger(__name__)
 
@@ -243,6 +249,127 @@ _sat_solver_str_to_cls = {
 _sat_solver_cls_to_str = {cls: string for string, cls in _sat_solver_str_to_cls.items()}
 
 
+BDD_ENCODING = "bdd"
+TOTALIZER_ENCODING = "totalizer"
+
+
+class _Totalizer:
+    """
+    Generalized totalizer encoding of ``sum(coeffs * lits)``, built once per
+    objective so that each bound tried while minimizing only adds unit clauses.
+
+    Every node of a balanced tree over the terms gets one variable for each sum
+    its subtree can reach, with sums of ``cap`` or more merged into ``cap``.
+    The clauses only force these variables true when the terms below them add
+    up to their sum. Requiring the root variables for every sum above ``k`` to
+    be false thus bounds the objective by ``k``, for any ``k < cap``.
+    (Joshi, Martins & Manquinho, "Generalized Totalizer Encoding for
+    Pseudo-Boolean Constraints", CP 2015.)
+    """
+
+    def __init__(self, clauses, lits, coeffs, cap):
+        nodes = [{min(c, cap): lit} for c, lit in zip(coeffs, lits)]
+        while len(nodes) > 1:
+            merged = [
+                self._merge(clauses, left, right, cap)
+                for left, right in zip(nodes[::2], nodes[1::2])
+            ]
+            if len(nodes) % 2:
+                merged.append(nodes[-1])
+            nodes = merged
+        self.outputs = sorted(nodes[0].items()) if nodes else []
+
+    @staticmethod
+    def _merge(clauses, left, right, cap):
+        outputs = {}
+        new_clauses = []
+        for a, x in ((0, None), *left.items()):
+            for b, y in ((0, None), *right.items()):
+                if x is None and y is None:
+                    continue
+                total = min(a + b, cap)
+                out = outputs.get(total)
+                if out is None:
+                    out = outputs[total] = clauses.new_var()
+                if x is None:
+                    new_clauses.append((-y, out))
+                elif y is None:
+                    new_clauses.append((-x, out))
+                else:
+                    new_clauses.append((-x, -y, out))
+        clauses.add_clauses(new_clauses)
+        return outputs
+
+    def at_most(self, k):
+        """Unit clauses that bound the sum by ``k``."""
+        return [(-out,) for total, out in self.outputs if total > k]
+
+
+#: (path, clauses) of the shared clauses last read by this portfolio worker
+_shared_clauses = (None, None)
+
+
+def _run_probe(sat_solver_str, shared_path, clauses, m):
+    """
+    Solve the clauses shared at ``shared_path`` plus ``clauses`` with a new
+    solver instance; runs in portfolio workers.
+    """
+    global _shared_clauses
+    if _shared_clauses[0] != shared_path:
+        with open(shared_path, "rb") as fh:
+            _shared_clauses = shared_path, pickle.load(fh)
+    sat_solver = _sat_solver_str_to_cls[sat_solver_str]()
+    sat_solver.add_clauses(_shared_clauses[1])
+    sat_solver.add_clauses(clauses)
+    return sat_solver.run(m)
+
+
+class _SatPortfolio:
+    """
+    Worker processes that run bisection probes of ``Clauses.minimize`` at the
+    same time, each with the next of ``sat_solver_strs``.
+    """
+
+    def __init__(self, processes, sat_solver_strs):
+        self.processes = processes
+        self._sat_solver_strs = cycle(sat_solver_strs)
+        self._pool = None
+
+    @contextmanager
+    def shared_clauses(self, clauses):
+        """
+        Write ``clauses``, which all probes of an objective have in common, to a
+        file that each worker reads once, and yield its path for ``submit``.
+        """
+        fd, path = mkstemp(prefix="conda-portfolio-", suffix=".pickle")
+        try:
+            with open(fd, "wb") as fh:
+                pickle.dump(clauses, fh, pickle.HIGHEST_PROTOCOL)
+            yield path
+        finally:
+            os.unlink(path)
+
+    def submit(self, shared_path, clauses, m, callback, error_callback):
+        if self._pool is None:
+            self._pool = spawn_context().Pool(self.processes)
+        self._pool.apply_async(
+            _run_probe,
+            (next(self._sat_solver_strs), shared_path, clauses, m),
+            callback=callback,
+            error_callback=error_callback,
+        )
+
+    def close(self):
+        """
+        Stop the workers, including any still running probes. The next
+        ``submit`` starts new ones.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
 # Code that uses special cases (generates no clauses) is in ADTs/FEnv.h in
 # minisatp. Code that generates clauses is in Hardware_clausify.cc (and are
 # also described in the paper, "Translating Pseudo-Boolean Constraints into
@@ -251,6 +378,8 @@ class Clauses:
     def __init__(self, m=0, sat_solver_str=_sat_solver_cls_to_str[_PycoSatSolver]):
         self.unsat = False
         self.m = m
+        # a _SatPortfolio to bisect objectives in parallel with
+        self.portfolio = None
 
         try:
             sat_solver_cls = _sat_solver_str_to_cls[sat_solver_str]
@@ -268,6 +397,18 @@ class Clauses:
     def as_list(self):
         return self._sat_solver.as_list()
 
+    def save_state(self):
+        """
+        Get state information to be able to discard everything added since,
+        i.e. both clauses and variables.
+        """
+        return self.m, self.unsat, self._sat_solver.save_state()
+
+    def restore_state(self, saved_state):
+        """Restore state saved via `save_state`."""
+        self.m, self.unsat, sat_solver_state = saved_state
+        self._sat_solver.restore_state(sat_solver_state)
+
     def new_var(self):
         m = self.m + 1
         self.m = m
@@ -660,13 +801,148 @@ class Clauses:
             self._sat_solver.restore_state(saved_state)
         return solution
 
-    def minimize(self, lits, coeffs, bestsol=None, trymax=False):
+    def _require_bound(self, lits, coeffs, lo, hi, peak, totalizer=None):
+        """
+        Require the peak or the sum of the objective to be within [lo, hi].
+
+        With a ``totalizer`` only the upper bound is encoded; while minimizing,
+        ``lo`` is always a proven lower bound anyway.
+        """
+        if totalizer is not None and not peak:
+            if hi < 0:
+                self.unsat = True
+            self.add_clauses(totalizer.at_most(hi))
+        elif peak:
+            prevent = tuple(a for c, a in zip(coeffs, lits) if c > hi)
+            require = tuple(a for c, a in zip(coeffs, lits) if lo <= c <= hi)
+            self.Prevent(self.Any, prevent)
+            if require:
+                self.Require(self.Any, require)
+        else:
+            self.Require(self.LinearBound, lits, coeffs, lo, hi, False)
+
+    def _portfolio_bisect(
+        self, lits, coeffs, lo, try0, peak, bestsol, bestval, objective_dict, totalizer
+    ):
+        """
+        Bisect the peak or sum objective like `minimize`, but with up to
+        ``portfolio.processes`` bounds probed at the same time in the portfolio's
+        worker processes. Each result narrows [lo, hi], and probes that can no
+        longer narrow it are abandoned. Their workers are stopped once no useful
+        probe is left, and when bisection ends with the first proof of
+        optimality, i.e. a solution whose value is the proven lower bound.
+        Probes share the clauses they have in common through
+        ``portfolio.shared_clauses`` and only send their own bound.
+        """
+        portfolio = self.portfolio
+        if peak:
+
+            def objval(sol):
+                return max(objective_dict.get(s, 0) for s in sol)
+
+        else:
+
+            def objval(sol):
+                return sum(objective_dict.get(s, 0) for s in sol)
+
+        m_orig = self.m
+        saved_state = self._sat_solver.save_state()
+        shared = list(self.as_list())
+        results = SimpleQueue()
+        probes = set()  # bounds in flight that can still narrow [lo, hi]
+        running = set()  # bounds being solved by a worker, including abandoned ones
+        hi = bestval
+        with portfolio.shared_clauses(shared) as shared_path:
+            try:
+                while lo < hi:
+                    if running and not probes:
+                        # only abandoned probes are left; take their workers back
+                        portfolio.close()
+                        results = SimpleQueue()
+                        running.clear()
+                    mids = [try0] if try0 is not None and lo <= try0 < hi else []
+                    free = portfolio.processes - len(running)
+                    mids.extend(
+                        lo + (hi - lo) * (i + 1) // (free + 1) for i in range(free)
+                    )
+                    for mid in dict.fromkeys(mids):
+                        if len(running) == portfolio.processes:
+                            break
+                        if mid in probes or not lo <= mid < hi:
+                            continue
+                        self._require_bound(lits, coeffs, lo, mid, peak, totalizer)
+                        if self.unsat:
+                            results.put((mid, None))
+                        else:
+                            portfolio.submit(
+                                shared_path,
+                                list(islice(self.as_list(), len(shared), None)),
+                                self.m,
+                                callback=lambda sol, mid=mid, results=results: (
+                                    results.put((mid, sol))
+                                ),
+                                error_callback=lambda e, mid=mid, results=results: (
+                                    results.put((mid, e))
+                                ),
+                            )
+                            running.add(mid)
+                        probes.add(mid)
+                        self.m = m_orig
+                        self._sat_solver.restore_state(saved_state)
+                        self.unsat = False
+                    try0 = None
+
+                    mid, newsol = results.get()
+                    probes.discard(mid)
+                    running.discard(mid)
+                    if isinstance(newsol, BaseException):
+                        raise newsol
+                    if newsol is None:
+                        lo = max(lo, mid + 1)
+                        log.log(
+                            TRACE,
+                            "Portfolio failure at %d, new range=(%d,%d)",
+                            mid,
+                            lo,
+                            hi,
+                        )
+                    else:
+                        newval = objval(newsol)
+                        if newval < bestval:
+                            bestsol, bestval = newsol, newval
+                        hi = bestval
+                        log.log(
+                            TRACE,
+                            "Portfolio success at %d, new range=(%d,%d)",
+                            mid,
+                            lo,
+                            hi,
+                        )
+                    # these can only tell what is known by now
+                    probes = {mid for mid in probes if lo <= mid < hi}
+            finally:
+                if running:
+                    # abandoned probes must not outlive the shared clauses
+                    portfolio.close()
+
+        if lo > hi:
+            # FIXME: As in minimize, this is not supposed to happen!
+            return bestsol, bestval
+        # keep the optimum required, as the sequential bisection does
+        self._require_bound(lits, coeffs, bestval, bestval, peak, totalizer)
+        return bestsol, bestval
+
+    def minimize(self, lits, coeffs, bestsol=None, trymax=False, encoding=BDD_ENCODING):
         """
         Minimize the objective function given by (coeff, integer) pairs in
         zip(coeffs, lits).
         The actual minimization is multiobjective: first, we minimize the
         largest active coefficient value, then we minimize the sum.
+        The sum is bounded with a BDD built for each bisection step, or, with
+        the "totalizer" encoding, a _Totalizer built once for the objective.
         """
+        if encoding not in (BDD_ENCODING, TOTALIZER_ENCODING):
+            raise NotImplementedError(f"Unknown objective encoding: {encoding}")
         if bestsol is None or len(bestsol) < self.m:
             log.debug("Clauses added, recomputing solution")
             bestsol = self.sat()
@@ -699,6 +975,36 @@ class Clauses:
             objective_dict = {a: c for c, a in zip(coeffs, lits)}
             bestval = objval(bestsol, objective_dict)
 
+            if encoding == TOTALIZER_ENCODING and not peak and lo < bestval:
+                # kept along with the bound on the optimum
+                totalizer = _Totalizer(self, lits, coeffs, bestval + 1)
+            else:
+                totalizer = None
+
+            if self.portfolio is not None:
+                bestsol, bestval = self._portfolio_bisect(
+                    lits,
+                    coeffs,
+                    lo,
+                    try0,
+                    peak,
+                    bestsol,
+                    bestval,
+                    objective_dict,
+                    totalizer,
+                )
+                log.debug(
+                    "Final %s objective: %d" % ("peak" if peak else "sum", bestval)
+                )
+                if bestval == 0:
+                    break
+                elif peak:
+                    lits = [a for c, a in zip(coeffs, lits) if c <= bestval]
+                    coeffs = [c for c in coeffs if c <= bestval]
+                    try0 = sum_val(bestsol, objective_dict)
+                    lo = bestval
+                continue
+
             # If we got lucky and the initial solution is optimal, we still
             # need to generate the constraints at least once
             hi = bestval
@@ -716,14 +1022,7 @@ class Clauses:
                     mid = (lo + hi) // 2
                 else:
                     mid = try0
-                if peak:
-                    prevent = tuple(a for c, a in zip(coeffs, lits) if c > mid)
-                    require = tuple(a for c, a in zip(coeffs, lits) if lo <= c <= mid)
-                    self.Prevent(self.Any, prevent)
-                    if require:
-                        self.Require(self.Any, require)
-                else:
-                    self.Require(self.LinearBound, lits, coeffs, lo, mid, False)
+                self._require_bound(lits, coeffs, lo, mid, peak, totalizer)
 
                 if log.isEnabledFor(DEBUG):
                     log.log(
@@ -26,6 +26,7 @@ from ..auxlib.logz import NullHandler
 from ..auxlib.type_coercion import boolify
 from .compat import encode_environment, on_win
 from .constants import NULL
+from .lru import caches as lru_caches
 from .path import expand
 
 log = getLogger(__name__)
@@ -617,6 +618,17 @@ class ThreadLimitedThreadPoolExecutor(ThreadPoolExecutor):
 as_completed = as_completed
 
 
+def spawn_context():
+    """
+    The ``multiprocessing`` context to start worker processes with. Workers
+    are spawned, never forked: conda may be running other threads, e.g. for
+    downloads, and a forked child inherits whatever locks they held.
+    """
+    import multiprocessing
+
+    return multiprocessing.get_context("spawn")
+
+
 def get_instrumentation_record_file():
     default_record_file = join("~", ".conda", "instrumentation-record.csv")
     return expand(
@@ -681,6 +693,11 @@ class time_recorder(ContextDecorator):  # pragma: no cover
                 cls.total_call_num[entry_name],
                 entry_name,
             )
+        log.info("=== cache hits, misses and size ===")
+        for name, cache in sorted(lru_caches.items()):
+            log.info(
+                "CACHE % 9d % 9d % 9d %s", cache.hits, cache.misses, len(cache), name
+            )
 
     @memoizemethod
     def _ensure_dir(self):
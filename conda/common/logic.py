@@ -29,7 +29,13 @@ through the Require and Prevent functions.
 
 from itertools import chain
 
-from ._logic import FALSE, TRUE
+from ._logic import (
+    BDD_ENCODING,
+    FALSE,
+    TOTALIZER_ENCODING,
+    TRUE,
+    _SatPortfolio,
+)
 from ._logic import Clauses as _Clauses
 
 # TODO: We may want to turn the user-facing {TRUE,FALSE} values into an Enum and
@@ -44,6 +50,12 @@ PycoSatSolver = "pycosat"
 PyCryptoSatSolver = "pycryptosat"
 PySatSolver = "pysat"
 
+SatPortfolio = _SatPortfolio
+
+# how Clauses.minimize bounds the sum of an objective
+BDDEncoding = BDD_ENCODING
+TotalizerEncoding = TOTALIZER_ENCODING
+
 
 class Clauses:
     def __init__(self, m=0, sat_solver=PycoSatSolver):
@@ -59,12 +71,34 @@ class Clauses:
     def unsat(self):
         return self._clauses.unsat
 
+    @property
+    def portfolio(self):
+        return self._clauses.portfolio
+
+    @portfolio.setter
+    def portfolio(self, portfolio):
+        self._clauses.portfolio = portfolio
+
     def get_clause_count(self):
         return self._clauses.get_clause_count()
 
     def as_list(self):
         return self._clauses.as_list()
 
+    def save_state(self):
+        """
+        Get state information to be able to discard the clauses, variables and
+        names added since, e.g. to reuse a base set of clauses.
+        """
+        return self._clauses.save_state(), dict(self.names), dict(self.indices)
+
+    def restore_state(self, saved_state):
+        """Restore state saved via `save_state`."""
+        clauses_state, names, indices = saved_state
+        self._clauses.restore_state(clauses_state)
+        self.names = dict(names)
+        self.indices = dict(indices)
+
     def _check_variable(self, variable):
         if 0 < abs(variable) <= self.m:
             return variable
@@ -258,14 +292,16 @@ class Clauses:
             yield sol
             exclude.append([-k for k in sol if -m <= k <= m])
 
-    def minimize(self, objective, bestsol=None, trymax=False):
+    def minimize(self, objective, bestsol=None, trymax=False, encoding=BDDEncoding):
         if not isinstance(objective, dict):
             # in case of duplicate literal -> coefficient mappings, always take the last one
             objective = {named_lit: coeff for coeff, named_lit in objective}
         literals = self._convert(list(objective.keys()))
         coeffs = list(objective.values())
 
-        return self._clauses.minimize(literals, coeffs, bestsol=bestsol, trymax=trymax)
+        return self._clauses.minimize(
+            literals, coeffs, bestsol=bestsol, trymax=trymax, encoding=encoding
+        )
 
 
 def minimal_unsatisfiable_subset(clauses, sat, explicit_specs):
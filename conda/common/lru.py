@@ -0,0 +1,95 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Size-bounded, least-recently-used caches for interning parsed objects.
+
+``VersionOrder``, ``VersionSpec``, ``BuildNumberMatch`` and ``MatchSpec`` keep
+the objects they parse in these caches, so that processes that live for a
+long time, e.g. services that embed the solver, don't grow without limit.
+Every cache counts its hits and misses. The counts are logged with the
+``time_recorder`` totals when ``CONDA_INSTRUMENTATION_ENABLED`` is set.
+
+Lookups don't take the lock: a hit is a dict lookup plus ``move_to_end``, and
+the counters are bumped without synchronization, so they are approximate under
+concurrent use. Only stores and evictions are serialized.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Hashable
+
+_MISSING = object()
+
+#: every cache created, by name
+caches: dict[str, LRUCache] = {}
+
+
+class LRUCache:
+    """
+    Mapping from keys to interned values that holds at most ``maxsize``
+    entries. Storing into a full cache evicts the least recently used entry.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+        caches[name] = self
+
+    def __getitem__(self, key: Hashable) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self._touch(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._touch(key)
+        return value
+
+    def _touch(self, key: Hashable) -> None:
+        self.hits += 1
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            # evicted by another thread since the lookup
+            pass
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            data = self._data
+            data[key] = value
+            data.move_to_end(key)
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.name!r}, maxsize={self.maxsize}, "
+            f"size={len(self)}, hits={self.hits}, misses={self.misses})"
+        )
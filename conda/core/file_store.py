@@ -0,0 +1,132 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Content-addressed store of extracted package files.
+
+With ``package_file_store`` enabled, ``ExtractPackageAction`` hands every
+package it extracts to ``FileStore.add_package``. Each regular file listed in
+the package's ``info/paths.json`` is stored once under
+``<pkgs_dir>/.files``, keyed by its sha256 and mode, and the extracted
+package directory keeps a hard link to the stored file. Two builds of the same
+package, or its ``.tar.bz2`` and ``.conda`` variants, then share their
+identical files. A stored file is in use as long as something else links to
+it; ``conda clean --packages`` removes the unused ones with ``prune()``.
+
+Python sources keep files of their own, so that the modification times
+recorded in compiled ``.pyc`` files stay valid.
+"""
+
+from __future__ import annotations
+
+import os
+from logging import getLogger
+from os.path import dirname, isdir, join
+from stat import S_IMODE, S_ISREG
+from typing import TYPE_CHECKING
+
+from ..base.constants import CONDA_TEMP_EXTENSION, FILE_STORE_DIR
+from ..common.path import win_path_ok
+from ..gateways.disk import mkdir_p
+from ..gateways.disk.delete import rm_rf
+from ..gateways.disk.read import compute_sum, read_paths_json
+from ..models.enums import PathType
+
+if TYPE_CHECKING:
+    from typing import Iterator
+
+log = getLogger(__name__)
+
+
+class FileStore:
+    """Files of the packages extracted in ``pkgs_dir``, stored by content."""
+
+    def __init__(self, pkgs_dir: str):
+        self.path = join(pkgs_dir, FILE_STORE_DIR)
+
+    def entry_path(self, sha256: str, mode: int) -> str:
+        return join(self.path, sha256[:2], f"{sha256}.{mode:o}")
+
+    def entries(self) -> Iterator[os.DirEntry]:
+        """The stored files."""
+        if not isdir(self.path):
+            return
+        for prefix in os.scandir(self.path):
+            if prefix.is_dir(follow_symlinks=False):
+                for entry in os.scandir(prefix.path):
+                    if entry.is_file(follow_symlinks=False):
+                        yield entry
+
+    def add_package(self, extracted_package_dir: str) -> int:
+        """
+        Replace the files of ``extracted_package_dir`` that are already stored
+        with hard links to them, and store the others. Return the number of
+        files that were already stored.
+        """
+        try:
+            paths_data = read_paths_json(extracted_package_dir)
+        except Exception as e:
+            log.debug("Not storing files of %s: %r", extracted_package_dir, e)
+            return 0
+        shared = 0
+        for path_data in paths_data.paths:
+            if (
+                path_data.path_type != PathType.hardlink
+                or not getattr(path_data, "sha256", None)
+                or path_data.path.endswith(".py")
+            ):
+                continue
+            path = join(extracted_package_dir, win_path_ok(path_data.path))
+            try:
+                shared += self._add(path, path_data.sha256)
+            except OSError as e:
+                log.debug("Not storing %s: %r", path, e)
+        return shared
+
+    def _add(self, path: str, sha256: str) -> bool:
+        stat = os.lstat(path)
+        if not S_ISREG(stat.st_mode):
+            return False
+        entry = self.entry_path(sha256, S_IMODE(stat.st_mode))
+        try:
+            entry_stat = os.lstat(entry)
+        except FileNotFoundError:
+            entry_stat = None
+
+        if entry_stat is not None:
+            if (entry_stat.st_dev, entry_stat.st_ino) == (stat.st_dev, stat.st_ino):
+                return True
+            if entry_stat.st_size != stat.st_size:
+                return False
+            temp_path = path + CONDA_TEMP_EXTENSION
+            try:
+                os.link(entry, temp_path)
+                os.replace(temp_path, path)
+            except OSError:
+                rm_rf(temp_path)
+                raise
+            return True
+
+        # other packages will rely on the content, so check it once here
+        if compute_sum(path, "sha256") != sha256:
+            log.debug("Not storing %s: sha256 differs from paths.json", path)
+            return False
+        mkdir_p(dirname(entry))
+        try:
+            os.link(path, entry)
+        except FileExistsError:
+            # stored meanwhile by another process
+            pass
+        return False
+
+    def prune(self) -> list[str]:
+        """Remove the stored files that nothing else links to any more."""
+        removed = []
+        for entry in self.entries():
+            try:
+                # DirEntry.stat() has no link count on Windows
+                if os.lstat(entry.path).st_nlink == 1:
+                    os.unlink(entry.path)
+                    removed.append(entry.path)
+            except OSError as e:
+                log.debug("Could not remove %s: %r", entry.path, e)
+        return removed
@@ -118,6 +118,8 @@ def fetch_index(
     """
     log.debug("channel_urls=" + repr(channel_urls))
     index = {}
+    SubdirData._refresh_stale(channel_urls, repodata_fn)
+    SubdirData._load_in_processes(channel_urls, repodata_fn)
     with ThreadLimitedThreadPoolExecutor() as executor:
         subdir_instantiator = lambda url: SubdirData(
             Channel(url), repodata_fn=repodata_fn
@@ -0,0 +1,276 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Local repodata index server.
+
+Loads ``SubdirData`` once and answers ``query``, ``query_all`` and
+``iter_records`` requests from other ``conda`` processes over a Unix socket
+(see ``conda.gateways.repodata.daemon`` for the protocol). Clients use it when
+the ``repodata_index_socket`` setting names a listening socket, and load
+repodata in-process otherwise.
+
+Start it with::
+
+    python -m conda.core.index_server [SOCKET]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import chain
+from logging import getLogger
+from os.path import exists, getmtime
+from typing import TYPE_CHECKING
+
+from ..auxlib import NULL
+from ..base.constants import REPODATA_FN
+from ..base.context import context
+from ..common.path import url_to_path
+from ..exceptions import ArgumentError
+from ..gateways.connection.session import get_session_for_settings
+from ..gateways.repodata import get_repo_interface
+from ..gateways.repodata.daemon import METHODS, client_settings, encode_message
+from ..models.channel import Channel
+from ..models.match_spec import MatchSpec
+from .subdir_data import SubdirData
+
+if TYPE_CHECKING:
+    from typing import Any, Iterator
+
+    from ..models.records import PackageRecord
+
+log = getLogger(__name__)
+
+#: context cache entries that shape the records loaded from repodata; they
+#: are read deep inside ``SubdirData``, so loads with a client's values swap
+#: them in. ``channel_settings`` is passed explicitly, through the session.
+CONTEXT_KEYS = {
+    "use_only_tar_bz2": "_use_only_tar_bz2",
+    "add_pip_as_python_dependency": "add_pip_as_python_dependency",
+}
+
+
+class SharedLock:
+    """Shared holders run together; an exclusive holder runs alone."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._shared -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not (self._exclusive or self._shared))
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+class IndexService:
+    """
+    Answer index requests from ``SubdirData`` kept loaded in this process, one
+    copy for each combination of the clients' ``SETTINGS``.
+    """
+
+    def __init__(self):
+        self._locks = defaultdict(threading.Lock)
+        # kept apart from SubdirData._cache_, which is keyed on url and
+        # repodata_fn only
+        self._subdir_datas: dict[tuple[str, str, str], SubdirData] = {}
+        # loads with this process's context run concurrently; a load that
+        # swaps in a client's settings runs alone
+        self._context_lock = SharedLock()
+
+    @contextmanager
+    def client_context(self, settings: dict[str, Any]):
+        """Load with the client's ``CONTEXT_KEYS`` settings in place of ours."""
+        swapped = {
+            key: settings[name]
+            for name, key in CONTEXT_KEYS.items()
+            if settings[name] != getattr(context, name)
+        }
+        if not swapped:
+            with self._context_lock.shared():
+                yield
+            return
+        with self._context_lock.exclusive():
+            saved = {key: context._cache_.get(key, NULL) for key in swapped}
+            context._cache_.update(swapped)
+            try:
+                yield
+            finally:
+                for key, value in saved.items():
+                    if value is NULL:
+                        context._cache_.pop(key, None)
+                    else:
+                        context._cache_[key] = value
+
+    @staticmethod
+    def stale(subdir_data: SubdirData) -> bool:
+        if subdir_data.url_w_subdir.startswith("file://"):
+            path = url_to_path(subdir_data.url_w_repodata_fn)
+            return exists(path) and getmtime(path) > subdir_data._mtime
+        cache = subdir_data.repo_cache
+        cache.load_state()
+        return cache.stale()
+
+    def subdir_data(
+        self, url: str, repodata_fn: str, settings: dict[str, Any]
+    ) -> SubdirData:
+        """
+        Return ``SubdirData`` loaded for a client with ``settings``, reloaded
+        once its cache is stale. Call with ``self._locks[key]`` held.
+        """
+        key = url, repodata_fn, json.dumps(settings, sort_keys=True)
+        subdir_data = self._subdir_datas.get(key)
+        # cache paths depend on the settings too
+        with self.client_context(settings):
+            if subdir_data is None:
+                subdir_data = self._subdir_datas[key] = type.__call__(
+                    SubdirData,
+                    Channel(url),
+                    repodata_fn,
+                    RepoInterface=get_repo_interface(),
+                )
+                # the client's auth handlers
+                subdir_data._session = get_session_for_settings(
+                    subdir_data.url_w_credentials, settings["channel_settings"]
+                )
+            elif not self.stale(subdir_data):
+                return subdir_data
+            subdir_data._mtime = time.time()
+            subdir_data.reload()
+        return subdir_data
+
+    def records(
+        self,
+        url: str,
+        repodata_fn: str,
+        settings: dict[str, Any],
+        spec: MatchSpec | None = None,
+    ) -> list[PackageRecord]:
+        """
+        Records from ``url`` matching ``spec``, or all of them. The subdir
+        stays locked until they are listed, so that another connection's
+        ``reload()`` cannot swap the index out from under the query.
+        """
+        with self._locks[url, repodata_fn, json.dumps(settings, sort_keys=True)]:
+            subdir_data = self.subdir_data(url, repodata_fn, settings)
+            if spec is None:
+                return list(subdir_data.iter_records())
+            return list(subdir_data.query(spec))
+
+    def dispatch(self, method: str, params: dict[str, Any]) -> list[PackageRecord]:
+        if method not in METHODS:
+            raise ValueError(f"Unknown index server method {method!r}")
+        repodata_fn = params.get("repodata_fn") or REPODATA_FN
+        settings = params.get("settings") or client_settings()
+        if method == "query_all":
+            spec = MatchSpec(params["spec"])
+            return list(
+                chain.from_iterable(
+                    self.records(url, repodata_fn, settings, spec)
+                    for url in params["channel_urls"]
+                )
+            )
+        if method == "query":
+            return self.records(
+                params["url"], repodata_fn, settings, MatchSpec(params["spec"])
+            )
+        return self.records(params["url"], repodata_fn, settings)
+
+    def respond(self, request: bytes) -> Iterator[bytes]:
+        """Encoded response lines for one encoded request."""
+        try:
+            message = json.loads(request)
+            records = [
+                record.dump()
+                for record in self.dispatch(message["method"], message["params"])
+            ]
+        except Exception as e:
+            log.debug("Index server request failed.", exc_info=True)
+            yield encode_message({"error": f"{e.__class__.__name__}: {e}"})
+            return
+        yield encode_message({"ok": True, "count": len(records)})
+        for record in records:
+            yield encode_message(record)
+
+
+class IndexRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.server.service.respond(self.rfile.readline()):
+            self.wfile.write(line)
+
+
+class IndexServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, address: str, service: IndexService | None = None):
+        self.service = service or IndexService()
+        super().__init__(address, IndexRequestHandler)
+
+
+def serve(address: str) -> None:
+    """Serve index requests on the Unix socket at ``address`` until interrupted."""
+    if os.path.exists(address):
+        # left behind by a server that did not shut down cleanly
+        os.unlink(address)
+    with IndexServer(address) as server:
+        log.info("Serving repodata index requests on %s", address)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(address)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from ..gateways.logging import initialize_logging
+
+    parser = ArgumentParser(
+        prog="python -m conda.core.index_server",
+        description="Serve repodata to other conda processes on this machine.",
+    )
+    parser.add_argument(
+        "socket",
+        nargs="?",
+        help="Path of the Unix socket to listen on. "
+        "Defaults to the repodata_index_socket setting.",
+    )
+    args = parser.parse_args(argv)
+    initialize_logging()
+    address = args.socket or context.repodata_index_socket
+    if not address:
+        raise ArgumentError("No socket given, and repodata_index_socket is not set.")
+    serve(address)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,9 +5,18 @@
 from __future__ import annotations
 
 import codecs
+import json
 import os
+import time
 from collections import defaultdict
-from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    CancelledError,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import nullcontext
 from errno import EACCES, ENOENT, EPERM, EROFS
 from functools import partial
 from itertools import chain
@@ -15,6 +24,7 @@ from json import JSONDecodeError
 from logging import getLogger
 from os import scandir
 from os.path import basename, dirname, getsize, join
+from queue import SimpleQueue
 from sys import platform
 from tarfile import ReadError
 from typing import TYPE_CHECKING
@@ -22,36 +32,46 @@ from typing import TYPE_CHECKING
 from .. import CondaError, CondaMultiError, conda_signal_handler
 from ..auxlib.collection import first
 from ..auxlib.decorators import memoizemethod
+from ..auxlib.entity import EntityEncoder
 from ..base.constants import (
     CONDA_PACKAGE_EXTENSION_V1,
     CONDA_PACKAGE_EXTENSION_V2,
     CONDA_PACKAGE_EXTENSIONS,
+    CONDA_PARTIAL_EXTENSION,
+    PACKAGE_CACHE_INDEX_FN,
     PACKAGE_CACHE_MAGIC_FILE,
 )
 from ..base.context import context
+from ..common.compat import on_win
 from ..common.constants import NULL, TRACE
-from ..common.io import IS_INTERACTIVE, ProgressBar, time_recorder
+from ..common.io import IS_INTERACTIVE, ProgressBar, spawn_context, time_recorder
 from ..common.iterators import groupby_to_dict as groupby
 from ..common.path import expand, strip_pkg_extension, url_to_path
 from ..common.signals import signal_handler
 from ..common.url import path_to_url
 from ..deprecations import deprecated
 from ..exceptions import NotWritableError, NoWritablePkgsDirError
+from ..gateways.connection.download import segment_count
+from ..gateways.connection.scheduler import HostScheduler
+from ..gateways.disk import mkdir_p
 from ..gateways.disk.create import (
     create_package_cache_directory,
     extract_tarball,
     write_as_json_to_file,
 )
 from ..gateways.disk.delete import rm_rf
+from ..gateways.disk.lock import lock
 from ..gateways.disk.read import (
     compute_sum,
     isdir,
     isfile,
     islink,
+    lexists,
     read_index_json,
     read_index_json_from_tarball,
     read_repodata_json,
 )
+from ..gateways.disk.stream_extract import StreamingExtract, extract_file
 from ..gateways.disk.test import file_path_is_writable
 from ..models.match_spec import MatchSpec
 from ..models.records import PackageCacheRecord, PackageRecord
@@ -72,6 +92,11 @@ except ImportError:
     THREADSAFE_EXTRACT = False
 # On the machines we tested, extraction doesn't get any faster after 3 threads
 EXTRACT_THREADS = min(os.cpu_count() or 1, 3) if THREADSAFE_EXTRACT else 1
+# With context.extract_processes, packages at least this large are extracted in
+# worker processes; smaller ones are done before a worker would have started
+EXTRACT_PROCESS_MIN_SIZE = 1 << 23
+# seconds between progress updates from an extract worker
+EXTRACT_PROGRESS_INTERVAL = 0.1
 
 
 class PackageCacheType(type):
@@ -105,6 +130,13 @@ class PackageCacheData(metaclass=PackageCacheType):
         write_as_json_to_file(meta, PackageRecord.from_objects(package_cache_record))
 
         self._package_cache_records[package_cache_record] = package_cache_record
+        if context.package_cache_index:
+            # the pkgs_dir entry load() finds the package by
+            if package_cache_record.is_fetched:
+                base_name = package_cache_record.tarball_basename
+            else:
+                base_name = basename(package_cache_record.extracted_package_dir)
+            PackageCacheIndex(self.pkgs_dir).update(base_name, package_cache_record)
 
     def load(self):
         self.__package_cache_records = _package_cache_records = {}
@@ -113,6 +145,20 @@ class PackageCacheData(metaclass=PackageCacheType):
             # no directory exists, and we didn't have permissions to create it
             return
 
+        index = (
+            PackageCacheIndex(self.pkgs_dir) if context.package_cache_index else None
+        )
+        stored = index.read() if index else None
+        mtime_ns = os.stat(self.pkgs_dir).st_mtime_ns
+        if stored and stored["mtime_ns"] == mtime_ns:
+            for entry in stored["entries"].values():
+                if entry["record"]:
+                    package_cache_record = PackageCacheRecord(**entry["record"])
+                    _package_cache_records[package_cache_record] = package_cache_record
+            return
+        stored_entries = stored["entries"] if stored else {}
+        entries = {}
+
         _CONDA_TARBALL_EXTENSIONS = CONDA_PACKAGE_EXTENSIONS
         pkgs_dir_contents = tuple(entry.name for entry in scandir(self.pkgs_dir))
         for base_name in self._dedupe_pkgs_dir_contents(pkgs_dir_contents):
@@ -125,10 +171,37 @@ class PackageCacheData(metaclass=PackageCacheType):
                 or isfile(full_path)
                 and full_path.endswith(_CONDA_TARBALL_EXTENSIONS)
             ):
-                package_cache_record = self._make_single_record(base_name)
+                if index is None:
+                    package_cache_record = self._make_single_record(base_name)
+                else:
+                    package_cache_record = self._indexed_record(
+                        index, base_name, stored_entries, entries
+                    )
                 if package_cache_record:
                     _package_cache_records[package_cache_record] = package_cache_record
 
+        if index and self.is_writable:
+            index.write(mtime_ns, entries)
+
+    def _indexed_record(self, index, base_name, stored_entries, entries):
+        """
+        The record of pkgs_dir entry ``base_name`` from ``stored_entries``, if
+        its package is unchanged; otherwise it is read again. The entry is
+        added to ``entries``.
+        """
+        signature = index.signature(join(self.pkgs_dir, base_name))
+        entry = stored_entries.get(base_name)
+        if signature and entry and entry["signature"] == signature:
+            entries[base_name] = entry
+            return PackageCacheRecord(**entry["record"]) if entry["record"] else None
+        package_cache_record = self._make_single_record(base_name)
+        entries[base_name] = {
+            # reading the record may have written info/repodata_record.json
+            "signature": index.signature(join(self.pkgs_dir, base_name)),
+            "record": package_cache_record.dump() if package_cache_record else None,
+        }
+        return package_cache_record
+
     def reload(self):
         self.load()
         return self
@@ -559,6 +632,118 @@ class UrlsData:
         return first(self, lambda url: basename(url) == package_path)
 
 
+class PackageCacheIndex:
+    """
+    Records of the packages in a package cache, by pkgs_dir entry, stored in
+    ``<pkgs_dir>/cache/packages.json``.
+
+    Each entry keeps the modification times of its package, and the index
+    keeps the modification time of the pkgs_dir it was last checked against.
+    While the pkgs_dir is unchanged, loading the package cache reads only this
+    file. Otherwise only the entries whose package changed are read again.
+    Writers hold a lock on the file and rewrite it in place.
+    """
+
+    VERSION = 1
+    #: modification times this recent may still change without being seen
+    RACY_INTERVAL_NS = 2_000_000_000
+
+    def __init__(self, pkgs_dir):
+        self.pkgs_dir = pkgs_dir
+        self.path = join(pkgs_dir, "cache", PACKAGE_CACHE_INDEX_FN)
+
+    @classmethod
+    def settled(cls, mtime_ns):
+        return time.time_ns() - mtime_ns > cls.RACY_INTERVAL_NS
+
+    @classmethod
+    def signature(cls, full_path):
+        """
+        Modification times of a pkgs_dir entry's tarball, extracted directory
+        and its info directory, or None if they may still change.
+        """
+        extracted_package_dir, ext = strip_pkg_extension(full_path)
+        paths = (full_path,) if ext else ()
+        signature = []
+        for path in (
+            *paths,
+            extracted_package_dir,
+            join(extracted_package_dir, "info"),
+        ):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            except OSError:
+                return None
+            if not cls.settled(stat.st_mtime_ns):
+                return None
+            signature.append(stat.st_mtime_ns)
+            if path is full_path and ext:
+                signature.append(stat.st_size)
+        return signature
+
+    def _parse(self, data):
+        try:
+            index = json.loads(data)
+        except ValueError:
+            return None
+        if (
+            not isinstance(index, dict)
+            or index.get("version") != self.VERSION
+            or index.get("pkgs_dir") != self.pkgs_dir
+        ):
+            return None
+        return index
+
+    def read(self):
+        """The stored index, or None if there is none."""
+        try:
+            with open(self.path, "rb") as fh:
+                return self._parse(fh.read())
+        except OSError:
+            return None
+
+    def _write(self, mtime_ns, entries, update=False):
+        try:
+            mkdir_p(dirname(self.path))
+            with open(self.path, "a+b") as fh, lock(fh):
+                if update:
+                    fh.seek(0)
+                    index = self._parse(fh.read())
+                    entries = {**(index["entries"] if index else {}), **entries}
+                index = {
+                    "version": self.VERSION,
+                    "pkgs_dir": self.pkgs_dir,
+                    "mtime_ns": mtime_ns,
+                    "entries": entries,
+                }
+                fh.seek(0)
+                fh.truncate()
+                fh.write(
+                    json.dumps(index, cls=EntityEncoder, separators=(",", ":")).encode()
+                )
+        except OSError as e:
+            log.debug("Could not write package cache index %s: %r", self.path, e)
+
+    def write(self, mtime_ns, entries):
+        """
+        Replace the index with ``entries``, found in the pkgs_dir while it had
+        modification time ``mtime_ns``.
+        """
+        self._write(mtime_ns if self.settled(mtime_ns) else None, entries)
+
+    def update(self, base_name, package_cache_record):
+        """Store the record of the pkgs_dir entry ``base_name``."""
+        entry = {
+            "signature": self.signature(join(self.pkgs_dir, base_name)),
+            "record": package_cache_record.dump(),
+        }
+        # the pkgs_dir has changed since the index was checked
+        self._write(None, {base_name: entry}, update=True)
+
+
 # ##############################
 # downloading
 # ##############################
@@ -805,11 +990,27 @@ class ProgressiveFetchExtract:
             nonlocal cancelled_flag
             return cancelled_flag
 
+        fetch_threads = context.fetch_threads
+        if context.adaptive_fetch:
+            # each host runs up to fetch_threads downloads, see HostScheduler
+            hosts = {HostScheduler.host(action.url) for action in self.cache_actions}
+            fetch_threads *= max(1, len(hosts))
+
+        extract_pool = None
+        if context.extract_processes and not context.debug:
+            extract_pool = ExtractProcessPool(context.extract_processes)
+        # packages extracted by extract_pool
+        in_process = set()
+
         with signal_handler(conda_signal_handler), time_recorder(
             "fetch_extract_execute"
-        ), ThreadPoolExecutor(
-            context.fetch_threads
-        ) as fetch_executor, ThreadPoolExecutor(EXTRACT_THREADS) as extract_executor:
+        ), ThreadPoolExecutor(fetch_threads) as fetch_executor, ThreadPoolExecutor(
+            EXTRACT_THREADS
+        ) as extract_executor, extract_pool or nullcontext():
+            scheduler = None
+            if context.adaptive_fetch:
+                scheduler = HostScheduler(fetch_executor, context.fetch_threads)
+
             for prec_or_spec, (
                 cache_action,
                 extract_action,
@@ -822,12 +1023,34 @@ class ProgressiveFetchExtract:
 
                 progress_bars[prec_or_spec] = progress_bar
 
-                future = fetch_executor.submit(
+                if scheduler and cache_action:
+                    # one connection for each Range request
+                    connections = (
+                        1
+                        if _can_stream(cache_action, extract_action)
+                        else segment_count(cache_action.size)
+                    )
+                    submit = partial(
+                        scheduler.submit,
+                        cache_action.url,
+                        cache_action.size,
+                        connections=connections,
+                    )
+                else:
+                    submit = fetch_executor.submit
+                download_total = 1.0
+                if extract_pool and extract_pool.wants(extract_action):
+                    # extraction reports progress too
+                    in_process.add(prec_or_spec)
+                    download_total = 0.5
+                future = submit(
                     do_cache_action,
                     prec_or_spec,
                     cache_action,
                     progress_bar,
+                    download_total,
                     cancelled=cancelled,
+                    extract_action=extract_action,
                 )
 
                 future.add_done_callback(
@@ -847,12 +1070,23 @@ class ProgressiveFetchExtract:
                     prec_or_spec = completed_future.result()
 
                     cache_action, extract_action = self.paired_actions[prec_or_spec]
-                    extract_future = extract_executor.submit(
-                        do_extract_action,
-                        prec_or_spec,
-                        extract_action,
-                        progress_bars[prec_or_spec],
-                    )
+                    if cache_action and extract_action:
+                        extract_action.use_checksums(cache_action.checksums)
+                    if prec_or_spec in in_process:
+                        extract_future = extract_pool.waiters.submit(
+                            do_extract_action,
+                            prec_or_spec,
+                            extract_action,
+                            progress_bars[prec_or_spec],
+                            extract_pool,
+                        )
+                    else:
+                        extract_future = extract_executor.submit(
+                            do_extract_action,
+                            prec_or_spec,
+                            extract_action,
+                            progress_bars[prec_or_spec],
+                        )
                     extract_future.add_done_callback(
                         partial(
                             done_callback,
@@ -921,12 +1155,28 @@ class ProgressiveFetchExtract:
         return hash(self) == hash(other)
 
 
-def do_cache_action(prec, cache_action, progress_bar, download_total=1.0, *, cancelled):
-    """This function gets called from `ProgressiveFetchExtract.execute`."""
+def do_cache_action(
+    prec,
+    cache_action,
+    progress_bar,
+    download_total=1.0,
+    *,
+    cancelled,
+    extract_action=None,
+    connections=1,
+):
+    """
+    This function gets called from `ProgressiveFetchExtract.execute`.
+
+    With `context.extract_while_downloading`, `extract_action`'s package is
+    extracted while it downloads, see `StreamingExtract`. Otherwise it is
+    downloaded with up to `connections` parallel Range requests.
+    """
     # pass None if already cached (simplifies code)
     if not cache_action:
         return prec
     cache_action.verify()
+    cache_action.segments = connections
 
     if not cache_action.url.startswith("file:/"):
 
@@ -942,16 +1192,63 @@ def do_cache_action(prec, cache_action, progress_bar, download_total=1.0, *, can
         download_total = 0
         progress_update_cache_action = None
 
-    cache_action.execute(progress_update_cache_action)
+    streaming = _streaming_extract(cache_action, extract_action)
+    if streaming is None:
+        cache_action.execute(progress_update_cache_action)
+        return prec
+
+    # segments would be written out of order
+    cache_action.segments = 1
+    streaming.start()
+    try:
+        cache_action.execute(progress_update_cache_action)
+    except BaseException:
+        streaming.fail()
+        raise
+    extract_action.streamed = streaming.finish()
     return prec
 
 
-def do_extract_action(prec, extract_action, progress_bar):
-    """This function gets called after do_cache_action completes."""
+def _can_stream(cache_action, extract_action):
+    """Whether `extract_action` can extract while `cache_action` downloads."""
+    if not (context.extract_while_downloading and extract_action) or on_win:
+        # a download's open `.partial` can't be renamed on Windows
+        return False
+    return not (
+        cache_action.url.startswith("file:/")
+        or extract_action.source_full_path != cache_action.target_full_path
+        # resumed downloads start over if the server ignores ranges
+        or lexists(cache_action.target_full_path + CONDA_PARTIAL_EXTENSION)
+    )
+
+
+def _streaming_extract(cache_action, extract_action):
+    """Extraction of `extract_action` while `cache_action` downloads, if possible."""
+    if not _can_stream(cache_action, extract_action):
+        return None
+    return StreamingExtract(
+        cache_action.target_full_path + CONDA_PARTIAL_EXTENSION,
+        cache_action.target_full_path,
+        extract_action.stream_path,
+    )
+
+
+def do_extract_action(prec, extract_action, progress_bar, extract_pool=None):
+    """
+    This function gets called after do_cache_action completes.
+
+    With `extract_pool`, the package is extracted in a worker process.
+    """
     # pass None if already extracted (simplifies code)
     if not extract_action:
         return prec
     extract_action.verify()
+    if extract_pool and not extract_action.streamed:
+        # the download filled the first half of the progress bar
+        extract_pool.extract(
+            extract_action, lambda fraction: progress_bar.update_to((1 + fraction) / 2)
+        )
+        extract_action.streamed = True
     # currently unable to do updates on extract;
     # likely too fast to bother
     extract_action.execute(None)
@@ -959,6 +1256,105 @@ def do_extract_action(prec, extract_action, progress_bar):
     return prec
 
 
+class ExtractProcessPool:
+    """
+    Worker processes that extract packages of `EXTRACT_PROCESS_MIN_SIZE` bytes
+    or more, for `context.extract_processes`.
+
+    A worker extracts to the action's `stream_path`, reading the package front
+    to back, and reports the fraction read through shared memory; the thread
+    waiting for it passes that on to the package's progress bar.
+    `ExtractPackageAction.execute` then only moves the directory into place.
+    """
+
+    def __init__(self, processes: int):
+        mp_context = spawn_context()
+        # one slot per worker, written by the worker only
+        self._progress = mp_context.Array("d", processes, lock=False)
+        self._slots = SimpleQueue()
+        for slot in range(processes):
+            self._slots.put(slot)
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=mp_context,
+            initializer=_init_extract_worker,
+            initargs=(self._progress,),
+        )
+        #: threads that wait for the workers, apart from the extract threads
+        self.waiters = ThreadPoolExecutor(processes)
+
+    @staticmethod
+    def wants(extract_action: ExtractPackageAction | None) -> bool:
+        """Whether `extract_action`'s package is large enough for a worker."""
+        if not extract_action:
+            return False
+        size = extract_action.size
+        if size is None:
+            try:
+                size = getsize(extract_action.source_full_path)
+            except OSError:
+                return False
+        return size >= EXTRACT_PROCESS_MIN_SIZE
+
+    def extract(self, extract_action: ExtractPackageAction, progress_update_callback):
+        """Extract `extract_action`'s package to its `stream_path` in a worker."""
+        slot = self._slots.get()
+        self._progress[slot] = 0.0
+        try:
+            future = self._executor.submit(
+                _extract_in_worker,
+                extract_action.source_full_path,
+                extract_action.stream_path,
+                slot,
+            )
+            while not wait((future,), timeout=EXTRACT_PROGRESS_INTERVAL).done:
+                progress_update_callback(self._progress[slot])
+            future.result()
+            progress_update_callback(self._progress[slot])
+        except BaseException:
+            rm_rf(extract_action.stream_path)
+            raise
+        finally:
+            self._slots.put(slot)
+
+    def shutdown(self, wait=True):
+        self.waiters.shutdown(wait=wait)
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+_extract_progress = None
+
+
+def _init_extract_worker(progress):
+    global _extract_progress
+    _extract_progress = progress
+
+
+def _extract_in_worker(source_full_path, destination_directory, slot):
+    """Extract a package for `ExtractProcessPool`, in a worker process."""
+
+    def progress_update_callback(fraction):
+        _extract_progress[slot] = fraction
+
+    rm_rf(destination_directory)
+    try:
+        if extract_file(
+            source_full_path, destination_directory, progress_update_callback
+        ):
+            return
+    except Exception as e:
+        log.debug("Could not stream %s: %r", source_full_path, e)
+    rm_rf(destination_directory)
+    extract_tarball(source_full_path, destination_directory)
+    progress_update_callback(1.0)
+
+
 def do_cleanup(actions):
     for action in actions:
         if action:
@@ -64,6 +64,7 @@ from ..models.records import (
     PrefixRecord,
 )
 from .envs_manager import get_user_environments_txt_file, register_env, unregister_env
+from .file_store import FileStore
 from .portability import _PaddingError, update_prefix
 from .prefix_data import PrefixData
 
@@ -1223,6 +1224,10 @@ class CacheUrlAction(PathAction):
         self.size = size
         self.md5 = md5
         self.hold_path = self.target_full_path + CONDA_TEMP_EXTENSION
+        # digests of the downloaded file by algorithm, computed while streaming
+        self.checksums = {}
+        # parallel Range requests to download with, see `download()`
+        self.segments = 1
 
     def verify(self):
         assert "::" not in self.url
@@ -1317,16 +1322,19 @@ class CacheUrlAction(PathAction):
         kwargs = {}
         if self.size is not None:
             kwargs["size"] = self.size
+        if self.segments > 1:
+            kwargs["segments"] = self.segments
         if self.sha256:
             kwargs["sha256"] = self.sha256
         elif self.md5:
             kwargs["md5"] = self.md5
-        download(
+        checksums = download(
             self.url,
             self.target_full_path,
             progress_update_callback=progress_update_callback,
             **kwargs,
         )
+        self.checksums = checksums if isinstance(checksums, dict) else {}
         target_package_cache._urls_data.add_url(self.url)
 
     def reverse(self):
@@ -1364,10 +1372,21 @@ class ExtractPackageAction(PathAction):
         self.sha256 = sha256
         self.size = size
         self.md5 = md5
+        # set when the package was extracted to stream_path while downloading,
+        # or by an extract worker process
+        self.streamed = False
 
     def verify(self):
         self._verified = True
 
+    def use_checksums(self, checksums):
+        """
+        Take missing ``sha256`` and ``md5`` from digests of the source tarball
+        computed while it was downloaded, instead of reading it again.
+        """
+        self.sha256 = self.sha256 or checksums.get("sha256")
+        self.md5 = self.md5 or checksums.get("md5")
+
     def execute(self, progress_update_callback=None):
         # I hate inline imports, but I guess it's ok since we're importing from the conda.core
         # The alternative is passing the the classes to ExtractPackageAction __init__
@@ -1380,11 +1399,17 @@ class ExtractPackageAction(PathAction):
         if lexists(self.target_full_path):
             rm_rf(self.target_full_path)
 
-        extract_tarball(
-            self.source_full_path,
-            self.target_full_path,
-            progress_update_callback=progress_update_callback,
-        )
+        if self.streamed:
+            backoff_rename(self.stream_path, self.target_full_path)
+        else:
+            extract_tarball(
+                self.source_full_path,
+                self.target_full_path,
+                progress_update_callback=progress_update_callback,
+            )
+
+        if context.package_file_store:
+            FileStore(self.target_pkgs_dir).add_package(self.target_full_path)
 
         try:
             raw_index_json = read_index_json(self.target_full_path)
@@ -1448,10 +1473,15 @@ class ExtractPackageAction(PathAction):
 
     def cleanup(self):
         rm_rf(self.hold_path)
+        rm_rf(self.stream_path)
 
     @property
     def target_full_path(self):
         return join(self.target_pkgs_dir, self.target_extracted_dirname)
 
+    @property
+    def stream_path(self):
+        return self.target_full_path + ".stream" + CONDA_TEMP_EXTENSION
+
     def __str__(self):
         return f"ExtractPackageAction<source_full_path={self.source_full_path!r}, target_full_path={self.target_full_path!r}>"
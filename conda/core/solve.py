@@ -5,6 +5,7 @@
 from __future__ import annotations
 
 import copy
+import os
 import sys
 from itertools import chain
 from logging import DEBUG, getLogger
@@ -24,14 +25,14 @@ from ..base.context import context
 from ..common.constants import NULL, TRACE
 from ..common.io import Spinner, dashlist, time_recorder
 from ..common.iterators import groupby_to_dict as groupby
-from ..common.path import get_major_minor_version, paths_equal
+from ..common.path import get_major_minor_version, paths_equal, url_to_path
 from ..exceptions import (
     PackagesNotFoundError,
     SpecsConfigurationConflictError,
     UnsatisfiableError,
 )
 from ..history import History
-from ..models.channel import Channel
+from ..models.channel import Channel, all_channel_urls
 from ..models.enums import NoarchType
 from ..models.match_spec import MatchSpec
 from ..models.prefix_graph import PrefixGraph
@@ -40,6 +41,7 @@ from ..resolve import Resolve
 from .index import _supplement_index_with_system, get_reduced_index
 from .link import PrefixSetup, UnlinkLinkTransaction
 from .prefix_data import PrefixData
+from .solve_cache import SolveCache
 from .subdir_data import SubdirData
 
 try:
@@ -357,6 +359,21 @@ class Solver:
                 # Return early, with a solution that should just be PrefixData().iter_records()
                 return IndexedSet(PrefixGraph(ssc.solution_precs).graph)
 
+        solve_cache = SolveCache() if context.solve_cache else None
+        solve_cache_key = solve_cache and self._solve_cache_key(ssc)
+        if solve_cache_key:
+            cached = solve_cache.get(solve_cache_key)
+            if cached:
+                log.debug("using cached solution %s", solve_cache_key)
+                records, neutered_specs = cached
+                self.neutered_specs = tuple(MatchSpec(spec) for spec in neutered_specs)
+                # keep the installed records, which know their files
+                installed = {prec: prec for prec in ssc.prefix_data.iter_records()}
+                ssc.solution_precs = IndexedSet(
+                    installed.get(prec, prec) for prec in records
+                )
+                return ssc.solution_precs
+
         if not ssc.r:
             with Spinner(
                 f"Collecting package metadata ({self._repodata_fn})",
@@ -434,8 +451,86 @@ class Solver:
             "\n    ".join(prec.dist_str() for prec in ssc.solution_precs),
         )
 
+        if solve_cache:
+            # the repodata is fresh now, if it was not before
+            solve_cache_key = solve_cache_key or self._solve_cache_key(ssc)
+            if solve_cache_key:
+                solve_cache.put(
+                    solve_cache_key, ssc.solution_precs, self.neutered_specs
+                )
+
         return ssc.solution_precs
 
+    def _solve_cache_key(self, ssc):
+        """
+        Fingerprint of everything the solution depends on, or None if the
+        cached repodata of a channel would be refreshed before solving.
+        """
+        channels = IndexedSet(self.channels)
+        for spec in self.specs_to_add:
+            channel = spec.get_exact_value("channel")
+            if channel:
+                channels.add(Channel(channel))
+
+        repodata = []
+        for url in all_channel_urls(channels, subdirs=self.subdirs):
+            if url.startswith("file://"):
+                # local channels are read directly on every load
+                for repodata_fn in dict.fromkeys((self._repodata_fn, REPODATA_FN)):
+                    try:
+                        stat = os.stat(join(url_to_path(url), repodata_fn))
+                    except OSError:
+                        continue
+                    state = [repodata_fn, stat.st_mtime_ns, stat.st_size]
+                    break
+                else:
+                    state = None
+            else:
+                cache = SubdirData(
+                    Channel(url), repodata_fn=self._repodata_fn
+                ).repo_cache
+                cache.load_state()
+                if not cache.state or (cache.stale() and not context.offline):
+                    return None
+                state = [
+                    cache.state.etag,
+                    cache.state.mod,
+                    cache.state.get("mtime_ns"),
+                    cache.state.get("size"),
+                ]
+            repodata.append([url, state])
+
+        virtual_index = {}
+        _supplement_index_with_system(virtual_index)
+        return SolveCache.key(
+            conda_version=CONDA_VERSION,
+            repodata_fn=self._repodata_fn,
+            repodata=repodata,
+            virtual_packages=sorted(prec.dist_str() for prec in virtual_index),
+            installed=sorted(
+                prec.dist_str() for prec in ssc.prefix_data.iter_records()
+            ),
+            pinned_specs=sorted(map(str, ssc.pinned_specs)),
+            history_specs=sorted(map(str, ssc.specs_from_history_map.values())),
+            specs_to_add=sorted(map(str, self.specs_to_add)),
+            specs_to_remove=sorted(map(str, self.specs_to_remove)),
+            update_modifier=str(ssc.update_modifier),
+            deps_modifier=str(ssc.deps_modifier),
+            prune=bool(ssc.prune),
+            settings=[
+                str(context.channel_priority),
+                sorted(context.track_features),
+                sorted(map(str, context.aggressive_update_packages)),
+                sorted(context.disallowed_packages),
+                context.auto_update_conda,
+                context.pip_interop_enabled,
+                context.solver_ignore_timestamps,
+                # these change the records read from unchanged repodata
+                context.use_only_tar_bz2,
+                context.add_pip_as_python_dependency,
+            ],
+        )
+
     def determine_constricting_specs(self, spec, solution_precs):
         highest_version = [
             VersionOrder(sp.version) for sp in solution_precs if sp.name == spec.name
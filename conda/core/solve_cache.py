@@ -0,0 +1,126 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+On-disk cache of classic solver results.
+
+``Solver.solve_final_state`` looks up a fingerprint of everything the solution
+depends on: the state of the channels' cached repodata, the virtual packages,
+the packages installed in the prefix, pinned and history specs, the requested
+specs and the solver settings. On a hit, the stored records are returned
+without collecting metadata or running the SAT solver. Entries live in
+``<pkgs_dir>/cache/solve`` as one JSON file per key. The least recently used
+entries are evicted beyond ``solve_cache_max_entries``, and
+``conda clean --solve-cache`` removes them all.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from logging import getLogger
+from os.path import isdir, join
+from typing import TYPE_CHECKING
+
+from ..base.constants import SOLVE_CACHE_DIR
+from ..base.context import context
+from ..gateways.disk import mkdir_p
+from ..gateways.disk.delete import rm_rf
+from ..models.records import PackageRecord
+from .package_cache_data import PackageCacheData
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable
+
+log = getLogger(__name__)
+
+
+def solve_cache_dir() -> str:
+    return join(PackageCacheData.first_writable().pkgs_dir, "cache", SOLVE_CACHE_DIR)
+
+
+class SolveCache:
+    """Solutions stored in ``path`` by key, at most ``max_entries`` of them."""
+
+    def __init__(self, path: str | None = None, max_entries: int | None = None):
+        self.path = path or solve_cache_dir()
+        self.max_entries = (
+            context.solve_cache_max_entries if max_entries is None else max_entries
+        )
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        """Stable digest of ``parts``, which must be JSON serializable."""
+        data = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return join(self.path, f"{key}.json")
+
+    def get(self, key: str) -> tuple[tuple[PackageRecord, ...], tuple[str, ...]] | None:
+        """Return the stored records and neutered specs, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path) as fh:
+                entry = json.load(fh)
+            records = tuple(PackageRecord(**record) for record in entry["records"])
+            neutered_specs = tuple(entry.get("neutered_specs", ()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.debug("Ignoring unreadable solve cache entry %s: %r", path, e)
+            rm_rf(path)
+            return None
+        try:
+            # eviction goes by modification time
+            os.utime(path)
+        except OSError:
+            pass
+        return records, neutered_specs
+
+    def put(
+        self,
+        key: str,
+        records: Iterable[PackageRecord],
+        neutered_specs: Iterable[str] = (),
+    ) -> None:
+        entry = {
+            "records": [
+                PackageRecord.from_objects(record).dump() for record in records
+            ],
+            "neutered_specs": [str(spec) for spec in neutered_specs],
+        }
+        path = self._entry_path(key)
+        temp_path = f"{path}.{os.urandom(2).hex()}.tmp"
+        try:
+            mkdir_p(self.path)
+            with open(temp_path, "w") as fh:
+                json.dump(entry, fh)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.debug("Could not write solve cache entry %s: %r", path, e)
+            rm_rf(temp_path)
+            return
+        self.evict()
+
+    def entries(self) -> list[str]:
+        """Paths of the stored entries, least recently used first."""
+        if not isdir(self.path):
+            return []
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    pass
+        return [path for _, path in sorted(entries)]
+
+    def evict(self) -> None:
+        """Remove the least recently used entries beyond ``max_entries``."""
+        entries = self.entries()
+        for path in entries[: max(len(entries) - self.max_entries, 0)]:
+            rm_rf(path)
+
+    def clear(self) -> None:
+        rm_rf(self.path)
@@ -7,6 +7,8 @@ from __future__ import annotations
 import json
 import pickle
 from collections import UserList, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
 from functools import partial
 from itertools import chain
 from logging import getLogger
@@ -19,17 +21,32 @@ from boltons.setutils import IndexedSet
 from genericpath import getmtime, isfile
 
 from ..auxlib.ish import dals
-from ..base.constants import CONDA_PACKAGE_EXTENSION_V1, REPODATA_FN
-from ..base.context import context
-from ..common.io import DummyExecutor, ThreadLimitedThreadPoolExecutor, dashlist
+from ..base.constants import (
+    CONDA_PACKAGE_EXTENSION_V1,
+    CONDA_PACKAGE_EXTENSION_V2,
+    REPODATA_FN,
+)
+from ..base.context import context, reset_context
+from ..common.io import (
+    DummyExecutor,
+    ThreadLimitedThreadPoolExecutor,
+    dashlist,
+    spawn_context,
+    time_recorder,
+)
 from ..common.iterators import groupby_to_dict as groupby
 from ..common.path import url_to_path
-from ..common.url import join_url
+from ..common.url import join_url, urlparse
 from ..deprecations import deprecated
 from ..exceptions import ChannelError, CondaUpgradeError, UnavailableInvalidChannel
+from ..gateways.connection import DEFAULT_POOLSIZE
+from ..gateways.connection.session import pooled_session
 from ..gateways.disk.delete import rm_rf
 from ..gateways.repodata import (
     CACHE_STATE_SUFFIX,
+    JLAP_PATCHED_KEY,
+    NOMINAL_HASH,
+    ON_DISK_HASH,
     CondaRepoInterface,
     RepodataFetch,
     RepodataState,
@@ -40,7 +57,11 @@ from ..gateways.repodata import (
 from ..gateways.repodata import (
     get_cache_control_max_age as _get_cache_control_max_age,
 )
+from ..gateways.repodata.daemon import IndexServerError, UnixSocketIndexInterface
+from ..gateways.repodata.index import INDEX_SUFFIX, RepodataIndex, write_index
+from ..gateways.repodata.stream import iter_repodata
 from ..models.channel import Channel, all_channel_urls
+from ..models.depends_table import DependsTable
 from ..models.match_spec import MatchSpec
 from ..models.records import PackageRecord
 
@@ -49,8 +70,10 @@ if TYPE_CHECKING:
 
 log = getLogger(__name__)
 
-REPODATA_PICKLE_VERSION = 30
+REPODATA_PICKLE_VERSION = 31
 MAX_REPODATA_VERSION = 2
+# overwritten by _normalize_record(); no need to store them in the index
+_NOT_INDEXED = {"arch", "channel", "platform", "schannel", "subdir", "url"}
 REPODATA_HEADER_RE = b'"(_etag|_mod|_cache_control)":[ ]?"(.*?[^\\\\])"[,}\\s]'  # NOQA
 
 
@@ -102,9 +125,107 @@ class PackageRecordList(UserList):
                 self.data[i] = record
             return record
 
+    def take(self, positions):
+        """Iterate over the records at ``positions``, e.g. from a names index."""
+        return map(self.__getitem__, positions)
+
+
+class LazyPackageRecordList(PackageRecordList):
+    """
+    Defer per-record normalization until a record is first accessed.
+
+    ``data`` holds raw repodata entries, which are left untouched;
+    ``normalize(raw)`` returns the keyword arguments for ``PackageRecord``.
+    """
+
+    def __init__(self, initlist=None, normalize=None, depends_table=None):
+        super().__init__(initlist)
+        self._normalize = normalize
+        self._records = {}
+        #: pre-parsed dependencies of raw entries with a ``_depends`` key
+        self.depends_table = depends_table
+
+    def raw(self, i) -> dict:
+        """Raw repodata entry for record ``i``, as stored in the index."""
+        return self.data[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PackageRecordList([self[j] for j in range(*i.indices(len(self)))])
+        i = range(len(self.data))[i]
+        try:
+            return self._records[i]
+        except KeyError:
+            record = self._records[i] = self._record(self.raw(i))
+            return record
+
+    def _record(self, info: dict) -> PackageRecord:
+        record = PackageRecord(**self._normalize(info))
+        ids = info.get("_depends")
+        if ids is not None and self.depends_table is not None:
+            record._depends_ref = (
+                self.depends_table,
+                ids,
+                record.depends,
+                record.constrains,
+            )
+        return record
+
+
+class IndexedPackageRecordList(LazyPackageRecordList):
+    """Lazily decode records from a memory-mapped ``RepodataIndex``."""
+
+    def __init__(self, index: RepodataIndex, normalize):
+        super().__init__(
+            [None] * len(index), normalize, DependsTable(entries=index.depends)
+        )
+        self._index = index
+
+    def raw(self, i) -> dict:
+        return self._index.record(i)
+
+    def take(self, positions):
+        if isinstance(positions, range) and positions.step == 1:
+            missing = [i for i in positions if i not in self._records]
+            if missing:
+                # a name's records are one contiguous shard; decode it at once
+                raws = self._index.records(missing[0], missing[-1] + 1)
+                for i, info in enumerate(raws, missing[0]):
+                    if i not in self._records:
+                        self._records[i] = self._record(info)
+        return super().take(positions)
+
+
+def _adds_pip(info: dict, add_pip: bool) -> bool:
+    return (
+        add_pip
+        and info["name"] == "python"
+        and info["version"].startswith(("2.", "3."))
+    )
+
+
+def _depends_ids(depends_table: DependsTable, info: dict, add_pip: bool):
+    """Add the merged dependencies of raw entry ``info`` to ``depends_table``."""
+    depends = info.get("depends", ())
+    if _adds_pip(info, add_pip):
+        depends = [*depends, "pip"]
+    return depends_table.add(depends, info.get("constrains", ()))
+
+
+def _normalize_record(info: dict, meta_in_common: dict, base_url: str, add_pip: bool):
+    info = dict(info)
+    if _adds_pip(info, add_pip):
+        info["depends"] = [*info["depends"], "pip"]
+    info.pop("_depends", None)
+    info.update(meta_in_common)
+    info["url"] = join_url(base_url, info["fn"])
+    return info
+
 
 class SubdirData(metaclass=SubdirDataType):
     _cache_ = {}
+    # client for the local index server; see repodata_index_socket
+    IndexInterface = UnixSocketIndexInterface
 
     @classmethod
     def clear_cached_local_channel_data(cls, exclude_file=True):
@@ -141,15 +262,25 @@ class SubdirData(metaclass=SubdirDataType):
             channel_urls = IndexedSet(grouped_urls.get(True, ()))
 
         check_allowlist(channel_urls)
+        if not isinstance(package_ref_or_match_spec, PackageRecord):
+            records = SubdirData._index_server_request(
+                "query_all",
+                str(MatchSpec(package_ref_or_match_spec)),
+                channel_urls,
+                repodata_fn,
+            )
+            if records is not None:
+                return tuple(records)
+        SubdirData._refresh_stale(channel_urls, repodata_fn)
+        SubdirData._load_in_processes(channel_urls, repodata_fn)
 
         def subdir_query(url):
-            return tuple(
-                SubdirData(Channel(url), repodata_fn=repodata_fn).query(
-                    package_ref_or_match_spec
-                )
-            )
+            subdir_data = SubdirData(Channel(url), repodata_fn=repodata_fn)
+            if not subdir_data._loaded:
+                # don't ask the index server again for each subdir
+                subdir_data.load()
+            return tuple(subdir_data.query(package_ref_or_match_spec))
 
-        # TODO test timing with ProcessPoolExecutor
         Executor = (
             DummyExecutor
             if context.debug or context.repodata_threads == 1
@@ -163,12 +294,173 @@ class SubdirData(metaclass=SubdirDataType):
             )
         return result
 
+    @classmethod
+    def _index_server_request(cls, method, *args):
+        """
+        Ask the local index server, if ``repodata_index_socket`` is set, to
+        answer ``method``. Return ``PackageRecord``s, or None when repodata
+        should be loaded in-process instead.
+        """
+        if not context.repodata_index_socket:
+            return None
+        interface = cls.IndexInterface(context.repodata_index_socket)
+        if not interface.available():
+            return None
+        try:
+            return [PackageRecord(**info) for info in getattr(interface, method)(*args)]
+        except (IndexServerError, OSError) as e:
+            log.debug(
+                "Index server could not answer %s, loading in-process: %s", method, e
+            )
+            return None
+
+    @staticmethod
+    def _refresh_stale(channel_urls, repodata_fn=REPODATA_FN):
+        """
+        Refresh every stale remote cache for ``channel_urls`` in one batch.
+
+        Subdirs are grouped by host. Each host gets one session whose
+        connection pool fits the group, and its conditional requests are
+        made concurrently over those keep-alive connections. Per-host timing
+        is reported through ``time_recorder``. Subdirs that fail here are
+        left for ``load()`` to fetch, and to report the error.
+        """
+        if context.offline:
+            return
+        hosts = defaultdict(list)
+        for url in channel_urls:
+            if url.startswith("file://"):
+                continue
+            subdir_data = SubdirData(Channel(url), repodata_fn=repodata_fn)
+            if subdir_data._loaded or subdir_data._refreshed:
+                continue
+            fetcher = subdir_data.repo_fetch
+            cache = fetcher.repo_cache
+            cache.load_state()
+            if not fetcher.should_use_cache(cache):
+                hosts[urlparse(url).netloc].append(subdir_data)
+        if not hosts:
+            return
+
+        max_workers = context.repodata_threads or DEFAULT_POOLSIZE
+        Executor = (
+            DummyExecutor
+            if context.debug or context.repodata_threads == 1
+            else partial(ThreadLimitedThreadPoolExecutor, max_workers=max_workers)
+        )
+
+        def refresh(subdir_data):
+            try:
+                while True:
+                    try:
+                        subdir_data.repo_fetch.fetch_latest_path()
+                        subdir_data._refreshed = True
+                        return
+                    except UnavailableInvalidChannel:
+                        # same fallback as _load()
+                        if subdir_data.repodata_fn == REPODATA_FN:
+                            raise
+                        subdir_data.repodata_fn = REPODATA_FN
+            except Exception:
+                log.debug(
+                    "Failed to refresh %s.",
+                    subdir_data.url_w_repodata_fn,
+                    exc_info=True,
+                )
+
+        # one pool of max_workers threads for all hosts; each host's subdirs
+        # share a session with room for that many concurrent connections
+        subdir_datas = list(chain.from_iterable(hosts.values()))
+        with ExitStack() as stack:
+            for host_subdir_datas in hosts.values():
+                session = stack.enter_context(
+                    pooled_session(
+                        host_subdir_datas[0].url_w_credentials,
+                        min(len(host_subdir_datas), max_workers),
+                    )
+                )
+                for subdir_data in host_subdir_datas:
+                    subdir_data._session = session
+            try:
+                with time_recorder("refresh_repodata"), Executor() as executor:
+                    for _ in executor.map(refresh, subdir_datas):
+                        pass
+            finally:
+                for subdir_data in subdir_datas:
+                    subdir_data._session = None
+
+    @staticmethod
+    def _load_in_processes(channel_urls, repodata_fn=REPODATA_FN):
+        """
+        Parse repodata for ``channel_urls`` in worker processes when
+        ``context.repodata_processes`` is set.
+
+        Each worker leaves its processed records in the index cache, which is
+        then memory-mapped here. Local channels, which are not indexed, and
+        subdirs whose worker fails are left to be loaded in this process.
+        """
+        if not context.repodata_processes or context.debug:
+            return
+        pending = {}
+        for url in channel_urls:
+            if url.startswith("file://"):
+                continue
+            subdir_data = SubdirData(Channel(url), repodata_fn=repodata_fn)
+            if subdir_data._loaded:
+                continue
+            # an up-to-date index is cheaper to map here than in a worker
+            fetcher = subdir_data.repo_fetch
+            cache = fetcher.repo_cache
+            cache.load_state()
+            if fetcher.should_use_cache(cache):
+                _internal_state = subdir_data._read_index(cache.state)
+                if _internal_state:
+                    subdir_data._set_internal_state(_internal_state)
+                    continue
+            pending[url] = subdir_data
+        if len(pending) < 2:
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(context.repodata_processes, len(pending)),
+            mp_context=spawn_context(),
+            initializer=_init_worker,
+            initargs=(tuple(context._search_path), dict(context._argparse_args)),
+        ) as executor:
+            futures = {
+                executor.submit(_load_in_worker, url, repodata_fn): subdir_data
+                for url, subdir_data in pending.items()
+            }
+            for future in as_completed(futures):
+                subdir_data = futures[future]
+                try:
+                    subdir_data.repodata_fn = future.result()
+                except Exception:
+                    log.debug(
+                        "Failed to load %s in a worker process.",
+                        subdir_data.url_w_repodata_fn,
+                        exc_info=True,
+                    )
+                    continue
+                _internal_state = subdir_data._read_index(
+                    subdir_data.repo_cache.load_state()
+                )
+                if _internal_state:
+                    subdir_data._set_internal_state(_internal_state)
+
     def query(self, package_ref_or_match_spec):
-        if not self._loaded:
-            self.load()
         param = package_ref_or_match_spec
         if isinstance(param, str):
             param = MatchSpec(param)  # type: ignore
+        if not self._loaded and isinstance(param, MatchSpec):
+            records = self._index_server_request(
+                "query", self.url_w_credentials, self.repodata_fn, str(param)
+            )
+            if records is not None:
+                yield from records
+                return
+        if not self._loaded:
+            self.load()
         if isinstance(param, MatchSpec):
             if param.get_exact_value("name"):
                 package_name = param.get_exact_value("name")
@@ -206,6 +498,10 @@ class SubdirData(metaclass=SubdirDataType):
         self.RepoInterface = RepoInterface
         self._loaded = False
         self._key_mgr = None
+        # shared with other subdirs on the same host while _refresh_stale() runs
+        self._session = None
+        # _refresh_stale() fetched the cache; load() need not ask again
+        self._refreshed = False
 
     @property
     def _repo(self) -> RepoInterface:
@@ -230,6 +526,7 @@ class SubdirData(metaclass=SubdirDataType):
             self.channel,
             self.repodata_fn,
             repo_interface_cls=self.RepoInterface,
+            session=self._session,
         )
 
     def reload(self):
@@ -264,11 +561,24 @@ class SubdirData(metaclass=SubdirDataType):
         )
 
     @property
+    @deprecated("24.9", "25.3", addendum="Use `SubdirData.cache_path_index` instead.")
     def cache_path_pickle(self):
         return self.cache_path_base + ("1" if context.use_only_tar_bz2 else "") + ".q"
 
+    @property
+    def cache_path_index(self):
+        """Memory-mapped index of processed records; see ``_write_index()``."""
+        return Path(
+            self.cache_path_base
+            + ("1" if context.use_only_tar_bz2 else "")
+            + INDEX_SUFFIX
+        )
+
     def load(self):
-        _internal_state = self._load()
+        self._set_internal_state(self._load())
+        return self
+
+    def _set_internal_state(self, _internal_state):
         if _internal_state.get("repodata_version", 0) > MAX_REPODATA_VERSION:
             raise CondaUpgradeError(
                 dals(
@@ -293,18 +603,21 @@ class SubdirData(metaclass=SubdirDataType):
         # Unused since early 2023:
         self._track_features_index = _internal_state["_track_features_index"]
         self._loaded = True
-        return self
 
     def iter_records(self):
         if not self._loaded:
+            records = self._index_server_request(
+                "iter_records", self.url_w_credentials, self.repodata_fn
+            )
+            if records is not None:
+                return iter(records)
             self.load()
         return iter(self._package_records)
         # could replace self._package_records with fully-converted UserList.data
         # after going through entire list
 
     def _iter_records_by_name(self, name):
-        for i in self._names_index[name]:
-            yield self._package_records[i]
+        yield from self._package_records.take(self._names_index[name])
 
     def _load(self):
         """
@@ -314,8 +627,39 @@ class SubdirData(metaclass=SubdirDataType):
         """
         try:
             fetcher = self.repo_fetch
-            repodata, state = fetcher.fetch_latest_parsed()
-            return self._process_raw_repodata(repodata, state)
+            cache = fetcher.repo_cache
+            cache.load_state()
+            # with local_repodata_ttl=0 or no max-age, a cache refreshed by
+            # _refresh_stale() moments ago is already stale again
+            use_cache = self._refreshed or fetcher.should_use_cache(cache)
+            self._refreshed = False
+            if use_cache:
+                _internal_state = self._read_index(cache.state)
+                if _internal_state:
+                    return _internal_state
+
+            if context.repodata_stream_parse:
+                if use_cache:
+                    path, state = fetcher.cache_path_json, cache.state
+                else:
+                    path, state = fetcher.fetch_latest_path()
+                _internal_state = self._process_raw_repodata_stream(path, state)
+            else:
+                if use_cache:
+                    raw_repodata, state = fetcher.read_cache()
+                    repodata = json.loads(raw_repodata)
+                else:
+                    repodata, state = fetcher.fetch_latest_parsed()
+                _internal_state = self._patch_index(repodata, state)
+                if _internal_state:
+                    return _internal_state
+                _internal_state = self._process_raw_repodata(repodata, state)
+            if not self.url_w_subdir.startswith("file://") and isfile(
+                self.cache_path_json
+            ):
+                # local channels are re-read on every load; don't index them
+                self._write_index()
+            return _internal_state
         except UnavailableInvalidChannel:
             if self.repodata_fn != REPODATA_FN:
                 self.repodata_fn = REPODATA_FN
@@ -323,6 +667,7 @@ class SubdirData(metaclass=SubdirDataType):
             else:
                 raise
 
+    @deprecated("24.9", "25.3", addendum="Use `SubdirData._write_index` instead.")
     def _pickle_me(self):
         try:
             log.debug(
@@ -335,17 +680,200 @@ class SubdirData(metaclass=SubdirDataType):
         except Exception:
             log.debug("Failed to dump pickled repodata.", exc_info=True)
 
+    def _write_index(self):
+        """
+        Save processed records as a memory-mapped index next to
+        ``cache_path_json``, so later loads can skip parsing repodata.
+        """
+        _internal_state = self._internal_state
+        header = {
+            key: _internal_state.get(key)
+            for key in (
+                "fn",
+                "_url",
+                "_schannel",
+                "_add_pip",
+                "_pickle_version",
+                "_cache_control",
+                "_mtime_ns",
+                "_size",
+                "_nominal_hash",
+                "base_url",
+                "repodata_version",
+            )
+        }
+        # normalize to match RepodataState.mod, RepodataState.etag
+        header["_mod"] = _internal_state.get("_mod") or ""
+        header["_etag"] = _internal_state.get("_etag") or ""
+        header["meta_in_common"] = {
+            key: value
+            for key, value in _internal_state["meta_in_common"].items()
+            if key not in ("channel", "schannel")
+        }
+        try:
+            log.debug(
+                "Saving repodata index for %s at %s",
+                self.url_w_repodata_fn,
+                self.cache_path_index,
+            )
+            depends_table = DependsTable()
+            records = []
+            for info in self._package_records.data:
+                ids = _depends_ids(depends_table, info, header["_add_pip"])
+                if ids is not None:
+                    # also used by the records loaded now
+                    info["_depends"] = ids
+                records.append(
+                    {
+                        key: value
+                        for key, value in info.items()
+                        if key not in _NOT_INDEXED
+                    }
+                )
+            self._package_records.depends_table = depends_table
+            write_index(
+                self.cache_path_index,
+                records,
+                self._names_index,
+                header,
+                depends_table.entries,
+            )
+        except Exception:
+            log.debug("Failed to write repodata index.", exc_info=True)
+
+    def _patch_index(self, repodata: dict, state: RepodataState):
+        """
+        Update the index for the package entries changed by a jlap patch,
+        instead of rebuilding it from all of ``repodata``.
+
+        Only possible when the patch touched nothing but ``packages`` and
+        ``packages.conda`` entries, and the index was built from the
+        repodata the patch was applied to. Return None otherwise.
+        """
+        patched = state.get(JLAP_PATCHED_KEY)
+        if (
+            not patched
+            or patched.get("to") != state.get(NOMINAL_HASH)
+            # the record describes the file that jlap wrote, not a later one
+            or not state.get(ON_DISK_HASH)
+            or patched.get(ON_DISK_HASH) != state.get(ON_DISK_HASH)
+            or not isfile(self.cache_path_index)
+        ):
+            return None
+        _tar_bz2 = CONDA_PACKAGE_EXTENSION_V1
+        _conda = CONDA_PACKAGE_EXTENSION_V2
+        stems = set()
+        for fn in chain(patched["packages"], patched["packages.conda"]):
+            if fn.endswith(_tar_bz2):
+                stems.add(fn[: -len(_tar_bz2)])
+            elif fn.endswith(_conda):
+                stems.add(fn[: -len(_conda)])
+            else:
+                return None
+
+        try:
+            index = RepodataIndex(self.cache_path_index)
+        except Exception:
+            log.debug("Failed to load repodata index.", exc_info=True)
+            return None
+        try:
+            header = index.header
+            checks = self._pickle_valid_checks(header, header["_mod"], header["_etag"])
+            if header.get("_nominal_hash") != patched["from"] or not all(
+                left == right for _, left, right in checks
+            ):
+                return None
+            log.debug(
+                "Patching repodata index for %s with %d changed packages",
+                self.url_w_repodata_fn,
+                len(stems),
+            )
+
+            # same selection as _process_raw_repodata(), for the changed entries
+            legacy_packages = repodata.get("packages", {})
+            conda_packages = (
+                {} if context.use_only_tar_bz2 else repodata.get("packages.conda", {})
+            )
+            # unchanged records keep their positions in the table
+            depends_table = DependsTable(index.depends())
+            added = defaultdict(list)
+            for stem in stems:
+                legacy = legacy_packages.get(stem + _tar_bz2)
+                info = conda_packages.get(stem + _conda)
+                if info is not None:
+                    info = {**info, "fn": stem + _conda}
+                    if legacy is not None:
+                        info["legacy_bz2_md5"] = legacy.get("md5")
+                        info["legacy_bz2_size"] = legacy.get("size")
+                elif legacy is not None:
+                    info = {**legacy, "fn": stem + _tar_bz2}
+                else:
+                    continue  # removed
+                if info.get("record_version", 0) > 1:
+                    continue
+                info = {k: v for k, v in info.items() if k not in _NOT_INDEXED}
+                ids = _depends_ids(depends_table, info, header["_add_pip"])
+                if ids is not None:
+                    info["_depends"] = ids
+                added[info["name"]].append(info)
+            replaced = {stem + ext for stem in stems for ext in (_tar_bz2, _conda)}
+            # filenames are <name>-<version>-<build>
+            touched_names = {stem.rsplit("-", 2)[0] for stem in stems}
+            touched_names.update(added)
+
+            # copy unchanged shards without decoding them
+            records = []
+            names = {}
+            for name, shard in index.names.items():
+                if name in touched_names:
+                    shard_records = [
+                        info
+                        for info in index.records(shard.start, shard.stop)
+                        if info["fn"] not in replaced
+                    ]
+                    shard_records.extend(added.pop(name, ()))
+                else:
+                    shard_records = list(map(index.raw_record, shard))
+                if shard_records:
+                    names[name] = range(len(records), len(records) + len(shard_records))
+                    records.extend(shard_records)
+            for name, shard_records in added.items():
+                names[name] = range(len(records), len(records) + len(shard_records))
+                records.extend(shard_records)
+        finally:
+            index.close()
+
+        header.update(
+            {
+                "_mod": state.mod,
+                "_etag": state.etag,
+                "_cache_control": state.get("_cache_control"),
+                "_mtime_ns": state.get("mtime_ns"),
+                "_size": state.get("size"),
+                "_nominal_hash": state.get(NOMINAL_HASH),
+            }
+        )
+        del header["names"]
+        try:
+            write_index(
+                self.cache_path_index, records, names, header, depends_table.entries
+            )
+        except Exception:
+            log.debug("Failed to write repodata index.", exc_info=True)
+            return None
+        return self._read_index(state)
+
     def _read_local_repodata(self, state: RepodataState):
-        # first try reading pickled data
-        _pickled_state = self._read_pickled(state)
-        if _pickled_state:
-            return _pickled_state
+        # first try reading the index
+        _indexed_state = self._read_index(state)
+        if _indexed_state:
+            return _indexed_state
 
         raw_repodata_str, state = self.repo_fetch.read_cache()
         _internal_state = self._process_raw_repodata_str(raw_repodata_str, state)
         # taken care of by _process_raw_repodata():
         assert self._internal_state is _internal_state
-        self._pickle_me()
+        self._write_index()
         return _internal_state
 
     def _pickle_valid_checks(self, pickled_state, mod, etag):
@@ -366,6 +894,7 @@ class SubdirData(metaclass=SubdirDataType):
         )
         yield "fn", pickled_state.get("fn"), self.repodata_fn
 
+    @deprecated("24.9", "25.3", addendum="Use `SubdirData._read_index` instead.")
     def _read_pickled(self, state: RepodataState):
         if not isinstance(state, RepodataState):
             state = RepodataState(
@@ -407,6 +936,82 @@ class SubdirData(metaclass=SubdirDataType):
 
         return _pickled_state
 
+    def _index_valid_checks(self, header, state: RepodataState):
+        """Throw away the index if these don't all match."""
+        yield from self._pickle_valid_checks(header, state.mod, state.etag)
+        # RepodataCache.load() zeroes size if repodata.json changed on disk
+        yield "_mtime_ns", header.get("_mtime_ns"), state.get("mtime_ns")
+        yield "_size", header.get("_size"), state.get("size")
+
+    def _read_index(self, state: RepodataState):
+        if not isinstance(state, RepodataState):
+            state = RepodataState(
+                self.cache_path_json,
+                self.cache_path_state,
+                self.repodata_fn,
+                dict=state,
+            )
+
+        if not isfile(self.cache_path_index) or not isfile(self.cache_path_json):
+            # Don't trust indexed data if there is no accompanying json data
+            return None
+
+        try:
+            log.debug("found index file %s", self.cache_path_index)
+            index = RepodataIndex(self.cache_path_index)
+        except Exception:
+            log.debug("Failed to load repodata index.", exc_info=True)
+            rm_rf(self.cache_path_index)
+            return None
+
+        header = index.header
+        if not all(
+            left == right for _, left, right in self._index_valid_checks(header, state)
+        ):
+            log.debug(
+                "Index load validation failed for %s at %s. %r",
+                self.url_w_repodata_fn,
+                self.cache_path_index,
+                tuple(self._index_valid_checks(header, state)),
+            )
+            index.close()
+            return None
+
+        base_url = header["base_url"]
+        if base_url == self.url_w_subdir:
+            base_url_w_credentials = self.url_w_credentials
+        else:
+            base_url_w_credentials = self._get_base_url(
+                {"info": {"base_url": base_url}}, with_credentials=True
+            )
+        meta_in_common = {
+            **header["meta_in_common"],
+            "channel": self.channel,
+            "schannel": self.channel.canonical_name,
+        }
+        _internal_state = {
+            **{key: value for key, value in header.items() if key != "names"},
+            "channel": self.channel,
+            "url_w_subdir": self.url_w_subdir,
+            "url_w_credentials": self.url_w_credentials,
+            "base_url_w_credentials": base_url_w_credentials,
+            "cache_path_base": self.cache_path_base,
+            "meta_in_common": meta_in_common,
+            "_package_records": IndexedPackageRecordList(
+                index,
+                partial(
+                    _normalize_record,
+                    meta_in_common=meta_in_common,
+                    base_url=base_url_w_credentials,
+                    add_pip=header["_add_pip"],
+                ),
+            ),
+            "_names_index": defaultdict(list, index.names),
+            "_track_features_index": defaultdict(list),
+        }
+        self._internal_state = _internal_state
+        return _internal_state
+
     def _process_raw_repodata_str(
         self,
         raw_repodata_str,
@@ -416,6 +1021,48 @@ class SubdirData(metaclass=SubdirDataType):
         json_obj = json.loads(raw_repodata_str or "{}")
         return self._process_raw_repodata(json_obj, state=state)
 
+    def _process_raw_repodata_stream(
+        self, path: Path, state: RepodataState | None = None
+    ):
+        """
+        Like ``_process_raw_repodata()``, but parse the file at ``path``
+        incrementally. ``.tar.bz2`` records superseded by a ``.conda``
+        counterpart are dropped as soon as both have been read.
+        """
+        repodata = {}
+        legacy_packages = repodata["packages"] = {}
+        conda_packages = repodata["packages.conda"] = {}
+        use_only_tar_bz2 = context.use_only_tar_bz2
+        _tar_bz2 = CONDA_PACKAGE_EXTENSION_V1
+        _conda = CONDA_PACKAGE_EXTENSION_V2
+
+        try:
+            fp = open(path)
+        except FileNotFoundError:
+            return self._process_raw_repodata({}, state)
+
+        with fp:
+            for key, fn, info in iter_repodata(fp):
+                if fn is None:
+                    repodata[key] = info
+                elif key == "packages.conda":
+                    if use_only_tar_bz2:
+                        continue
+                    legacy = legacy_packages.pop(fn[: -len(_conda)] + _tar_bz2, None)
+                    if legacy is not None:
+                        info["legacy_bz2_md5"] = legacy.get("md5")
+                        info["legacy_bz2_size"] = legacy.get("size")
+                    conda_packages[fn] = info
+                else:
+                    counterpart = conda_packages.get(fn[: -len(_tar_bz2)] + _conda)
+                    if counterpart is not None:
+                        counterpart["legacy_bz2_md5"] = info.get("md5")
+                        counterpart["legacy_bz2_size"] = info.get("size")
+                        continue
+                    legacy_packages[fn] = info
+
+        return self._process_raw_repodata(repodata, state)
+
     def _process_raw_repodata(self, repodata: dict, state: RepodataState | None = None):
         if not isinstance(state, RepodataState):
             state = RepodataState(
@@ -430,12 +1077,27 @@ class SubdirData(metaclass=SubdirDataType):
         add_pip = context.add_pip_as_python_dependency
         schannel = self.channel.canonical_name
 
-        self._package_records = _package_records = PackageRecordList()
         self._names_index = _names_index = defaultdict(list)
         self._track_features_index = _track_features_index = defaultdict(list)
         base_url = self._get_base_url(repodata, with_credentials=False)
         base_url_w_credentials = self._get_base_url(repodata, with_credentials=True)
 
+        meta_in_common = {  # just need to make this once, then apply with .update()
+            "arch": repodata.get("info", {}).get("arch"),
+            "channel": self.channel,
+            "platform": repodata.get("info", {}).get("platform"),
+            "schannel": schannel,
+            "subdir": subdir,
+        }
+        self._package_records = _package_records = LazyPackageRecordList(
+            normalize=partial(
+                _normalize_record,
+                meta_in_common=meta_in_common,
+                base_url=base_url_w_credentials,
+                add_pip=add_pip,
+            )
+        )
+
         _internal_state = {
             "channel": self.channel,
             "url_w_subdir": self.url_w_subdir,
@@ -455,6 +1117,10 @@ class SubdirData(metaclass=SubdirDataType):
             "_pickle_version": REPODATA_PICKLE_VERSION,
             "_schannel": schannel,
             "repodata_version": state.get("repodata_version", 0),
+            "_mtime_ns": state.get("mtime_ns"),
+            "_size": state.get("size"),
+            "_nominal_hash": state.get(NOMINAL_HASH),
+            "meta_in_common": meta_in_common,
         }
         if _internal_state["repodata_version"] > MAX_REPODATA_VERSION:
             raise CondaUpgradeError(
@@ -471,14 +1137,6 @@ class SubdirData(metaclass=SubdirDataType):
                 % self.url_w_subdir
             )
 
-        meta_in_common = {  # just need to make this once, then apply with .update()
-            "arch": repodata.get("info", {}).get("arch"),
-            "channel": self.channel,
-            "platform": repodata.get("info", {}).get("platform"),
-            "schannel": schannel,
-            "subdir": subdir,
-        }
-
         legacy_packages = repodata.get("packages", {})
         conda_packages = (
             {} if context.use_only_tar_bz2 else repodata.get("packages.conda", {})
@@ -489,40 +1147,30 @@ class SubdirData(metaclass=SubdirDataType):
             k[:-6] + _tar_bz2 for k in conda_packages.keys()
         }
 
+        # cheap pre-scan; the rest of the per-record work is deferred until
+        # LazyPackageRecordList.__getitem__ first touches the record
         for group, copy_legacy_md5 in (
             (conda_packages.items(), True),
             (((k, legacy_packages[k]) for k in use_these_legacy_keys), False),
         ):
             for fn, info in group:
-                if copy_legacy_md5:
-                    counterpart = fn.replace(".conda", ".tar.bz2")
-                    if counterpart in legacy_packages:
-                        info["legacy_bz2_md5"] = legacy_packages[counterpart].get("md5")
-                        info["legacy_bz2_size"] = legacy_packages[counterpart].get(
-                            "size"
-                        )
-                if (
-                    add_pip
-                    and info["name"] == "python"
-                    and info["version"].startswith(("2.", "3."))
-                ):
-                    info["depends"].append("pip")
-                info.update(meta_in_common)
                 if info.get("record_version", 0) > 1:
                     log.debug(
                         "Ignoring record_version %d from %s",
                         info["record_version"],
-                        info["url"],
+                        join_url(base_url, fn),
                     )
                     continue
-
-                # lazy
-                # package_record = PackageRecord(**info)
+                if copy_legacy_md5:
+                    counterpart = fn[:-6] + _tar_bz2
+                    if counterpart in legacy_packages:
+                        info["legacy_bz2_md5"] = legacy_packages[counterpart].get("md5")
+                        info["legacy_bz2_size"] = legacy_packages[counterpart].get(
+                            "size"
+                        )
                 info["fn"] = fn
-                info["url"] = join_url(base_url_w_credentials, fn)
                 _package_records.append(info)
-                record_index = len(_package_records) - 1
-                _names_index[info["name"]].append(record_index)
+                _names_index[info["name"]].append(len(_package_records) - 1)
 
         self._internal_state = _internal_state
         return _internal_state
@@ -581,3 +1229,18 @@ def make_feature_record(feature_name):
         build_number=0,
         fn=pkg_name,
     )
+
+
+def _init_worker(search_path, argparse_args):
+    # spawned workers start from a fresh interpreter; mirror the parent's context
+    reset_context(search_path, argparse_args)
+
+
+def _load_in_worker(url, repodata_fn):
+    """
+    Load ``url`` in a worker process, leaving its processed records in the
+    index cache. Return the repodata filename that was used, which may have
+    fallen back to ``repodata.json``.
+    """
+    subdir_data = SubdirData(Channel(url), repodata_fn=repodata_fn).load()
+    return subdir_data.repodata_fn
@@ -8,14 +8,18 @@ import hashlib
 import os
 import tempfile
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from logging import DEBUG, getLogger
 from os.path import basename, exists, join
 from pathlib import Path
+from threading import Event, Lock
+from typing import TYPE_CHECKING
 
 from ... import CondaError
 from ...auxlib.ish import dals
 from ...auxlib.logz import stringify
+from ...base.constants import CONDA_PARTIAL_EXTENSION
 from ...base.context import context
 from ...common.io import time_recorder
 from ...exceptions import (
@@ -39,11 +43,36 @@ from . import (
 )
 from .session import get_session
 
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from typing import Any, BinaryIO, Callable
+
+    from requests import Session
+
 log = getLogger(__name__)
 
 
 CHUNK_SIZE = 1 << 14
 
+#: checksums computed while downloading, see ``download_inner()``
+DOWNLOAD_CHECKSUMS = ("md5", "sha256")
+
+#: packages are split into Range requests of at least this many bytes
+SEGMENT_SIZE = 1 << 25
+#: most Range requests to download one package with
+MAX_SEGMENTS = 4
+
+
+class RangesNotSupported(Exception):
+    """The server did not answer a Range request with the requested bytes."""
+
+
+def segment_count(size: int | None) -> int:
+    """The number of parallel Range requests to download ``size`` bytes with."""
+    if not size:
+        return 1
+    return max(1, min(MAX_SEGMENTS, size // SEGMENT_SIZE))
+
 
 def disable_ssl_verify_warning():
     warnings.simplefilter("ignore", InsecureRequestWarning)
@@ -57,19 +86,47 @@ def download(
     sha256=None,
     size=None,
     progress_update_callback=None,
+    segments=1,
 ):
+    """
+    Download ``url`` to ``target_full_path``, verifying ``md5`` or ``sha256``
+    and ``size`` when given. Return the hex digests of the downloaded file by
+    algorithm, see ``DOWNLOAD_CHECKSUMS``.
+
+    With ``segments`` > 1, a new download of ``size`` bytes from a server that
+    accepts byte ranges is split into that many parallel Range requests.
+    """
     if exists(target_full_path):
         maybe_raise(BasicClobberError(target_full_path, url, context), context)
     if not context.ssl_verify:
         disable_ssl_verify_warning()
 
     with download_http_errors(url):
-        download_inner(
-            url, target_full_path, md5, sha256, size, progress_update_callback
+        return download_inner(
+            url,
+            target_full_path,
+            md5,
+            sha256,
+            size,
+            progress_update_callback,
+            segments=segments,
         )
 
 
-def download_inner(url, target_full_path, md5, sha256, size, progress_update_callback):
+def download_inner(
+    url,
+    target_full_path,
+    md5,
+    sha256,
+    size,
+    progress_update_callback,
+    segments=1,
+):
+    """
+    Stream ``url`` to a ``.partial`` file, hashing each chunk as it is
+    written, so the file is never read back to be verified. Return the hex
+    digests of the completed file.
+    """
     timeout = context.remote_connect_timeout_secs, context.remote_read_timeout_secs
     session = get_session(url)
 
@@ -79,15 +136,56 @@ def download_inner(url, target_full_path, md5, sha256, size, progress_update_cal
 
     streamed_bytes = 0
     size_builder = 0
+    checksums = {name: hashlib.new(name) for name in DOWNLOAD_CHECKSUMS}
+
+    def update_checksums(target):
+        target.seek(0)
+        while read := target.read(CHUNK_SIZE):
+            for hasher in checksums.values():
+                hasher.update(read)
 
     # Use `.partial` even for full downloads. Avoid creating incomplete files
     # with the final filename.
     with download_partial_file(
-        target_full_path, url=url, md5=md5, sha256=sha256, size=size
+        target_full_path,
+        url=url,
+        md5=md5,
+        sha256=sha256,
+        size=size,
+        checksums=checksums,
     ) as target:
         stat_result = os.fstat(target.fileno())
+        if stat_result.st_size:
+            # what an earlier attempt left; hashed once, here
+            update_checksums(target)
         if size is not None and stat_result.st_size >= size:
-            return  # moves partial onto target_path, checksum will be checked
+            # moves partial onto target_path, checksum will be checked
+            return {name: hasher.hexdigest() for name, hasher in checksums.items()}
+
+        if (
+            segments > 1
+            and size
+            and not stat_result.st_size
+            and accepts_ranges(session, url, size, timeout)
+        ):
+            try:
+                download_segments(
+                    session,
+                    url,
+                    target,
+                    size,
+                    segments,
+                    timeout,
+                    progress_update_callback,
+                    checksums,
+                )
+            except BaseException as e:
+                checksums.update((name, hashlib.new(name)) for name in checksums)
+                if not isinstance(e, RangesNotSupported):
+                    raise
+                log.debug("Downloading %s in one request: %s", url, e)
+            else:
+                return {name: hasher.hexdigest() for name, hasher in checksums.items()}
 
         headers = {}
         if partial and stat_result.st_size > 0:
@@ -105,6 +203,7 @@ def download_inner(url, target_full_path, md5, sha256, size, progress_update_cal
         if partial and resp.status_code != 206:
             target.seek(0)
             target.truncate()
+            checksums.update((name, hashlib.new(name)) for name in checksums)
 
         content_length = total_content_length = int(
             resp.headers.get("Content-Length", 0)
@@ -129,6 +228,8 @@ def download_inner(url, target_full_path, md5, sha256, size, progress_update_cal
             except OSError as e:
                 message = "Failed to write to %(target_path)s\n  errno: %(errno)d"
                 raise CondaError(message, target_path=target.name, errno=e.errno)
+            for hasher in checksums.values():
+                hasher.update(chunk)
             size_builder += len(chunk)
 
             if total_content_length and 0 <= streamed_bytes <= content_length:
@@ -156,20 +257,160 @@ def download_inner(url, target_full_path, md5, sha256, size, progress_update_cal
                 downloaded_bytes=streamed_bytes,
             )
     # exit context manager, renaming target to target_full_path
+    return {name: hasher.hexdigest() for name, hasher in checksums.items()}
+
+
+def accepts_ranges(session: Session, url: str, size: int, timeout) -> bool:
+    """Whether the server advertises byte ranges of ``url``, ``size`` bytes long."""
+    try:
+        resp = session.head(
+            url, proxies=session.proxies, timeout=timeout, allow_redirects=True
+        )
+        resp.raise_for_status()
+    except HTTPError as e:
+        log.debug("HEAD %s failed: %r", url, e)
+        return False
+    if resp.headers.get("Accept-Ranges", "").lower() != "bytes":
+        return False
+    try:
+        return int(resp.headers.get("Content-Length", -1)) == size
+    except ValueError:
+        return False
+
+
+def download_segments(
+    session: Session,
+    url: str,
+    target: BinaryIO,
+    size: int,
+    segments: int,
+    timeout,
+    progress_update_callback: Callable[[float], Any] | None = None,
+    checksums: dict[str, Any] | None = None,
+) -> None:
+    """
+    Download the ``size`` bytes of ``url`` into the empty ``target`` with
+    ``segments`` parallel Range requests. Raise ``RangesNotSupported`` if a
+    response isn't the requested range. On failure ``target`` is emptied
+    again: a resumed download expects it to hold the start of the file.
+
+    ``checksums`` are updated with the first segment as it streams, and with
+    each later one, read back, as soon as it and those before it are done, so
+    that hashing overlaps the rest of the download.
+    """
+    bounds = [size * i // segments for i in range(segments + 1)]
+    progress_lock = Lock()
+    stopped = Event()
+    downloaded = 0
+
+    def fetch(start: int, end: int) -> None:
+        nonlocal downloaded
+        byte_range = f"bytes {start}-{end - 1}/"
+        resp = session.get(
+            url,
+            stream=True,
+            headers={"Range": f"bytes={start}-{end - 1}"},
+            proxies=session.proxies,
+            timeout=timeout,
+        )
+        with resp:
+            resp.raise_for_status()
+            content_range = resp.headers.get("Content-Range", "")
+            if resp.status_code != 206 or not content_range.startswith(byte_range):
+                raise RangesNotSupported(
+                    f"asked for {byte_range}, got {resp.status_code} {content_range}"
+                )
+            received = 0
+            with open(target.name, "r+b") as segment:
+                segment.seek(start)
+                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                    if stopped.is_set():
+                        return
+                    received += len(chunk)
+                    if received > end - start:
+                        break
+                    try:
+                        segment.write(chunk)
+                    except OSError as e:
+                        message = (
+                            "Failed to write to %(target_path)s\n  errno: %(errno)d"
+                        )
+                        raise CondaError(
+                            message, target_path=target.name, errno=e.errno
+                        )
+                    if checksums and not start:
+                        for hasher in checksums.values():
+                            hasher.update(chunk)
+                    with progress_lock:
+                        downloaded += len(chunk)
+                        if progress_update_callback:
+                            progress_update_callback(downloaded / size)
+            if received != end - start:
+                # e.g. a content encoding changed the length
+                raise RangesNotSupported(
+                    f"asked for {byte_range}, received {received} bytes"
+                )
+
+    def hash_segment(start: int, end: int) -> None:
+        with open(target.name, "rb") as segment:
+            segment.seek(start)
+            remaining = end - start
+            while remaining and (read := segment.read(min(CHUNK_SIZE, remaining))):
+                remaining -= len(read)
+                for hasher in checksums.values():
+                    hasher.update(read)
+
+    def stop_on_failure(future: Future) -> None:
+        if future.cancelled() or future.exception():
+            stopped.set()
+
+    target.truncate(size)
+    try:
+        with ThreadPoolExecutor(segments) as executor:
+            futures = [
+                executor.submit(fetch, start, end)
+                for start, end in zip(bounds, bounds[1:])
+            ]
+            for future in futures:
+                future.add_done_callback(stop_on_failure)
+            for future, start, end in zip(futures, bounds, bounds[1:]):
+                future.result()
+                if stopped.is_set():
+                    break
+                if checksums and start:
+                    hash_segment(start, end)
+            # raise the failure that stopped the others
+            for future in futures:
+                future.result()
+    except BaseException:
+        stopped.set()
+        target.seek(0)
+        target.truncate()
+        raise
 
 
 @contextmanager
 def download_partial_file(
-    target_full_path: str | Path, *, url: str, sha256: str, md5: str, size: int
+    target_full_path: str | Path,
+    *,
+    url: str,
+    sha256: str,
+    md5: str,
+    size: int,
+    checksums: dict[str, Any] | None = None,
 ):
     """
     Create or open locked partial download file, moving onto target_full_path
     when finished. Preserve partial file on exception.
+
+    ``checksums`` are running hashers, by algorithm, that the caller updates
+    with the whole content of the partial file. The file is verified with
+    them instead of being read again.
     """
     target_full_path = Path(target_full_path)
     parent = target_full_path.parent
     name = Path(target_full_path).name
-    partial_name = f"{name}.partial"
+    partial_name = f"{name}{CONDA_PARTIAL_EXTENSION}"
     partial_path = parent / partial_name
 
     def check(target):
@@ -177,10 +418,12 @@ def download_partial_file(
         if md5 or sha256:
             checksum_type = "sha256" if sha256 else "md5"
             checksum = sha256 if sha256 else md5
-            hasher = hashlib.new(checksum_type)
-            target.seek(0)
-            while read := target.read(CHUNK_SIZE):
-                hasher.update(read)
+            hasher = (checksums or {}).get(checksum_type)
+            if hasher is None:
+                hasher = hashlib.new(checksum_type)
+                target.seek(0)
+                while read := target.read(CHUNK_SIZE):
+                    hasher.update(read)
 
             actual_checksum = hasher.hexdigest()
 
@@ -0,0 +1,204 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Schedule package downloads by host.
+
+With ``adaptive_fetch`` enabled, ``ProgressiveFetchExtract`` submits its
+downloads to a ``HostScheduler`` instead of a fixed thread pool. Each channel
+host gets a ``HostLimit``: the number of connections that may be open to it
+at once. A download split into parallel Range requests takes one for each.
+The limit starts at ``fetch_threads``. A failed download halves it. A download
+so slow that all of the host's connections would deliver less than one
+connection fewer did on average lowers it by one; any other raises it by one
+again, up to ``fetch_threads``. A slow or failing mirror then gets fewer
+connections without holding back the downloads from other hosts.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from logging import getLogger
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from ...common.url import urlparse
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from typing import Any, Callable
+
+log = getLogger(__name__)
+
+#: downloads smaller than this mostly measure latency, not throughput
+THROUGHPUT_MIN_BYTES = 1 << 20
+#: weight of the latest download in the throughput and error rate averages
+SMOOTHING = 0.3
+#: no more connections while the error rate is above this
+MAX_ERROR_RATE = 0.1
+
+
+class HostLimit:
+    """The number of concurrent connections allowed to one host."""
+
+    def __init__(self, host: str, maximum: int):
+        self.host = host
+        self.maximum = max(1, maximum)
+        self.limit = self.maximum
+        self.active = 0
+        #: average bytes per second of one connection to the host
+        self.throughput = None
+        self.error_rate = 0.0
+        self._lock = Lock()
+
+    def acquire(self, connections: int = 1) -> int:
+        """
+        Start a download with up to ``connections``, as far as the limit
+        allows. Return the number granted, or 0.
+        """
+        with self._lock:
+            granted = min(connections, self.limit - self.active)
+            if granted <= 0:
+                return 0
+            self.active += granted
+            return granted
+
+    def release(self, connections: int = 1) -> None:
+        with self._lock:
+            self.active -= connections
+
+    def record_success(
+        self,
+        nbytes: int | None,
+        seconds: float,
+        concurrency: int,
+        connections: int = 1,
+    ):
+        """
+        Adapt the limit to a download of ``nbytes`` over ``connections`` that
+        took ``seconds``, while ``concurrency`` connections to the host were
+        open.
+        """
+        with self._lock:
+            self.error_rate *= 1 - SMOOTHING
+            slower = False
+            # small downloads measure latency, not throughput
+            if nbytes and nbytes >= THROUGHPUT_MIN_BYTES and seconds > 0:
+                throughput = nbytes / seconds / connections
+                if self.throughput is None:
+                    self.throughput = throughput
+                else:
+                    # the last connection cost more than it brought
+                    slower = throughput * concurrency < self.throughput * (
+                        concurrency - 1
+                    )
+                    self.throughput += SMOOTHING * (throughput - self.throughput)
+            if slower:
+                self.limit = max(1, self.limit - 1)
+            elif self.error_rate <= MAX_ERROR_RATE:
+                self.limit = min(self.maximum, self.limit + 1)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.error_rate += SMOOTHING * (1 - self.error_rate)
+            self.limit = max(1, self.limit // 2)
+        log.debug("Download from %s failed; limit now %d", self.host, self.limit)
+
+
+class HostScheduler:
+    """
+    Run downloads on ``executor``, within the ``HostLimit`` of their host.
+    ``executor`` should have ``maximum`` threads for each host, so that no
+    host waits for threads taken by another.
+    """
+
+    def __init__(self, executor: Executor, maximum: int):
+        self.executor = executor
+        self.maximum = maximum
+        self.limits: dict[str, HostLimit] = {}
+        self._queues: dict[str, deque] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).netloc or ""
+
+    def submit(
+        self,
+        url: str,
+        size: int | None,
+        fn: Callable,
+        *args,
+        connections: int = 1,
+        **kwargs,
+    ) -> Future:
+        """
+        Schedule ``fn(*args, **kwargs)``, a download of ``size`` bytes from
+        ``url``. Return a future for its result.
+
+        A download that can use more than one connection asks for up to
+        ``connections``. It gets as many as the host's limit has free when it
+        starts, and ``fn`` is called with that number as ``connections``.
+        """
+        host = self.host(url)
+        future = Future()
+        with self._lock:
+            if host not in self.limits:
+                self.limits[host] = HostLimit(host, self.maximum)
+                self._queues[host] = deque()
+            self._queues[host].append((future, size, connections, fn, args, kwargs))
+        self._dispatch(host)
+        return future
+
+    def _dispatch(self, host: str) -> None:
+        limit = self.limits[host]
+        queue = self._queues[host]
+        while True:
+            with self._lock:
+                if not queue:
+                    return
+                future, size, connections, fn, args, kwargs = queue[0]
+                granted = limit.acquire(connections)
+                if not granted:
+                    return
+                queue.popleft()
+            if connections > 1:
+                kwargs = {**kwargs, "connections": granted}
+            try:
+                self.executor.submit(
+                    self._run, limit, granted, future, size, fn, args, kwargs
+                )
+            except RuntimeError:
+                # the executor was shut down
+                limit.release(granted)
+                future.cancel()
+
+    def _run(
+        self,
+        limit: HostLimit,
+        connections: int,
+        future: Future,
+        size: int | None,
+        fn: Callable,
+        args: tuple,
+        kwargs: dict[str, Any],
+    ) -> None:
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                if not isinstance(e, CancelledError):
+                    limit.record_failure()
+                future.set_exception(e)
+            else:
+                limit.record_success(
+                    size, time.monotonic() - start, limit.active, connections
+                )
+                future.set_result(result)
+        finally:
+            limit.release(connections)
+            self._dispatch(limit.host)
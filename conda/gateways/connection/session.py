@@ -4,10 +4,12 @@
 
 from __future__ import annotations
 
+from contextlib import contextmanager
 from fnmatch import fnmatch
 from functools import lru_cache
 from logging import getLogger
 from threading import local
+from typing import TYPE_CHECKING
 
 from ... import CondaError
 from ...auxlib.ish import dals
@@ -37,6 +39,9 @@ from .adapters.http import HTTPAdapter
 from .adapters.localfs import LocalFSAdapter
 from .adapters.s3 import S3Adapter
 
+if TYPE_CHECKING:
+    from typing import Iterable, Mapping
+
 log = getLogger(__name__)
 RETRIES = 3
 
@@ -79,6 +84,14 @@ def get_session(url: str):
     Function that determines the correct Session object to be returned
     based on the URL that is passed in.
     """
+    return get_session_for_settings(url, context.channel_settings)
+
+
+def get_session_for_settings(url: str, channel_settings: Iterable[Mapping]):
+    """
+    ``get_session(url)``, with ``channel_settings`` in place of the context's,
+    e.g. those of an index server's client. Not cached.
+    """
     channel_name = get_channel_name_from_url(url)
 
     # If for whatever reason a channel name can't be determined, (should be unlikely)
@@ -87,12 +100,12 @@ def get_session(url: str):
         return CondaSession()
 
     # We ensure here if there are duplicates defined, we choose the last one
-    channel_settings = {}
-    for settings in context.channel_settings:
+    matched_settings = {}
+    for settings in channel_settings:
         channel = settings.get("channel", "")
         if channel == channel_name:
             # First we check for exact match
-            channel_settings = settings
+            matched_settings = settings
             continue
 
         # If we don't have an exact match, we attempt to match a URL pattern
@@ -107,9 +120,9 @@ def get_session(url: str):
         url_without_schema = parsed_url.netloc + parsed_url.path
         pattern = parsed_setting.netloc + parsed_setting.path
         if fnmatch(url_without_schema, pattern):
-            channel_settings = settings
+            matched_settings = settings
 
-    auth_handler = channel_settings.get("auth", "").strip() or None
+    auth_handler = matched_settings.get("auth", "").strip() or None
 
     # Return default session object
     if auth_handler is None:
@@ -123,6 +136,44 @@ def get_session(url: str):
     return CondaSession(auth=auth_handler_cls(channel_name))
 
 
+@contextmanager
+def pooled_session(url: str, pool_size: int):
+    """
+    Yield ``get_session(url)``, with room in its connection pool for the url's
+    host to keep ``pool_size`` connections alive. Use when making that many
+    concurrent requests to the host through the one session. The session's
+    own adapter is restored on exit.
+    """
+    session = get_session(url)
+    parsed_url = urlparse(url)
+    adapter = session.get_adapter(url)
+    if not (
+        parsed_url.scheme in ("http", "https")
+        and isinstance(adapter, HTTPAdapter)
+        and adapter._pool_maxsize < pool_size
+    ):
+        yield session
+        return
+
+    prefix = f"{parsed_url.scheme}://{parsed_url.netloc}/"
+    mounted = session.adapters.get(prefix)
+    pooled = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=adapter.max_retries,
+        ssl_context=adapter._ssl_context,
+    )
+    session.mount(prefix, pooled)
+    try:
+        yield session
+    finally:
+        if mounted is None:
+            del session.adapters[prefix]
+        else:
+            session.mount(prefix, mounted)
+        pooled.close()
+
+
 def get_session_storage_key(auth) -> str:
     """
     Function that determines which storage key to use for our CondaSession object caching
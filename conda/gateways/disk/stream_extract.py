@@ -0,0 +1,308 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Extract a package while it is being downloaded.
+
+A ``.conda`` file is an uncompressed zip of ``metadata.json`` and the zstd
+compressed ``pkg-*`` and ``info-*`` tarballs, each preceded by a local header
+that gives its size. ``StreamingExtract`` reads the ``.partial`` file of a
+running download from the start, waits for the bytes that have not arrived
+yet, and extracts each tarball as it streams in. A ``.tar.bz2`` file is a
+single compressed stream and is extracted the same way. Archives that can't be
+read front to back, e.g. zip members that are compressed or whose sizes only
+follow their data, are left to ``extract_tarball`` once the download is done.
+``extract_file`` reads a downloaded package the same way, reporting the
+fraction of the file read as it goes.
+"""
+
+from __future__ import annotations
+
+import bz2
+import io
+import os
+import struct
+import zipfile
+from logging import getLogger
+from threading import Event, Thread
+from typing import TYPE_CHECKING
+
+from ...base.constants import CONDA_PACKAGE_EXTENSION_V1, CONDA_PACKAGE_EXTENSION_V2
+from .delete import rm_rf
+
+if TYPE_CHECKING:
+    from typing import BinaryIO, Callable
+
+log = getLogger(__name__)
+
+#: signature, version, flags, method, time, date, crc, sizes, name and extra lengths
+LOCAL_HEADER = struct.Struct("<4sHHHHHLLLHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+#: general purpose flag set when sizes follow the member data
+DATA_DESCRIPTOR_FLAG = 0x08
+ZIP64_EXTRA_ID = 0x0001
+ZIP64_LIMIT = 0xFFFFFFFF
+
+
+class GrowingFile(io.RawIOBase):
+    """
+    Read ``partial_path`` while a download writes it, until ``finish()`` is
+    called. A finished download has been renamed to ``target_path``.
+    """
+
+    def __init__(self, partial_path: str, target_path: str, poll_interval=0.05):
+        self.partial_path = partial_path
+        self.target_path = target_path
+        self.poll_interval = poll_interval
+        self._file = None
+        self._done = Event()
+        self._failed = False
+
+    def finish(self) -> None:
+        """The download is complete; the end of the file is the end of data."""
+        self._done.set()
+
+    def fail(self) -> None:
+        """The download failed; reading raises."""
+        self._failed = True
+        self._done.set()
+
+    def readable(self) -> bool:
+        return True
+
+    def _open(self, done: bool) -> None:
+        # a download that finished before the first read has been renamed
+        paths = (self.partial_path, self.target_path) if done else (self.partial_path,)
+        for path in paths:
+            try:
+                self._file = open(path, "rb", buffering=0)
+                return
+            except FileNotFoundError:
+                pass
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._failed:
+                raise OSError(f"download of {self.target_path} failed")
+            # checked before reading: bytes written before finish() are visible
+            done = self._done.is_set()
+            if self._file is None:
+                self._open(done)
+            if self._file is not None:
+                count = self._file.readinto(buffer)
+                if count or done:
+                    return count
+            elif done:
+                raise FileNotFoundError(self.target_path)
+            self._done.wait(self.poll_interval)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        super().close()
+
+
+class _MemberReader(io.RawIOBase):
+    """The next ``size`` bytes of ``fileobj``."""
+
+    def __init__(self, fileobj: BinaryIO, size: int):
+        self._fileobj = fileobj
+        self._remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[: self._remaining]
+        count = self._fileobj.readinto(view)
+        if not count:
+            raise EOFError("truncated zip member")
+        self._remaining -= count
+        return count
+
+    def skip(self) -> None:
+        """Read past what is left of the member."""
+        while self.read(1 << 16):
+            pass
+
+
+class _ProgressReader(io.RawIOBase):
+    """Read ``fileobj``, reporting the fraction of its ``size`` bytes read."""
+
+    def __init__(
+        self, fileobj: BinaryIO, size: int, progress_update_callback: Callable
+    ):
+        self._fileobj = fileobj
+        self._size = size
+        self._read = 0
+        self._progress_update_callback = progress_update_callback
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._fileobj.readinto(buffer)
+        self._read += count
+        if self._size:
+            self._progress_update_callback(min(1.0, self._read / self._size))
+        return count
+
+
+def _zip64_size(extra: bytes, size: int) -> int | None:
+    """The compressed size from a zip64 extra field, or None if there is none."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, offset)
+        if header_id == ZIP64_EXTRA_ID:
+            # the uncompressed size comes first, if it didn't fit the header
+            position = offset + 4 + (8 if size == ZIP64_LIMIT else 0)
+            if position + 8 <= offset + 4 + length:
+                return struct.unpack_from("<Q", extra, position)[0]
+            return None
+        offset += 4 + length
+    return None
+
+
+def _extract_tar(reader: BinaryIO, destination_directory: str) -> None:
+    from conda_package_streaming.extract import extract_stream
+    from conda_package_streaming.package_streaming import tar_generator
+
+    extract_stream(tar_generator(reader), destination_directory)
+
+
+def extract_conda_stream(fileobj: BinaryIO, destination_directory: str) -> bool:
+    """
+    Extract the ``info`` and ``pkg`` tarballs of the ``.conda`` file read from
+    ``fileobj``, front to back. Return False if the archive can't be streamed.
+    ``fileobj`` must be buffered, so that ``read(n)`` returns ``n`` bytes
+    until the end of the file.
+    """
+    from conda_package_streaming.package_streaming import zstd
+
+    if zstd is None:
+        return False
+    components = set()
+    while True:
+        header = fileobj.read(LOCAL_HEADER.size)
+        if len(header) < LOCAL_HEADER.size:
+            return False
+        (
+            signature,
+            _,
+            flags,
+            method,
+            _,
+            _,
+            _,
+            compress_size,
+            size,
+            name_length,
+            extra_length,
+        ) = LOCAL_HEADER.unpack(header)
+        if signature != LOCAL_HEADER_SIGNATURE:
+            # the central directory follows the last member
+            return components == {"info", "pkg"}
+        name = fileobj.read(name_length).decode("utf-8", "replace")
+        extra = fileobj.read(extra_length)
+        if flags & DATA_DESCRIPTOR_FLAG or method != zipfile.ZIP_STORED:
+            return False
+        if compress_size == ZIP64_LIMIT:
+            compress_size = _zip64_size(extra, size)
+            if compress_size is None:
+                return False
+        member = _MemberReader(fileobj, compress_size)
+        component, _, rest = name.partition("-")
+        if component in ("info", "pkg") and rest.endswith(".tar.zst"):
+            with zstd.open(member) as reader:
+                _extract_tar(reader, destination_directory)
+            components.add(component)
+        member.skip()
+
+
+def extract_stream(
+    fileobj: BinaryIO, filename: str, destination_directory: str
+) -> bool:
+    """
+    Extract the package ``filename``, read from ``fileobj``, into
+    ``destination_directory``. Return False if it can't be streamed.
+    """
+    if filename.endswith(CONDA_PACKAGE_EXTENSION_V2):
+        return extract_conda_stream(fileobj, destination_directory)
+    if filename.endswith(CONDA_PACKAGE_EXTENSION_V1):
+        with bz2.open(fileobj) as reader:
+            _extract_tar(reader, destination_directory)
+        return True
+    return False
+
+
+def extract_file(
+    tarball_full_path: str,
+    destination_directory: str,
+    progress_update_callback: Callable[[float], None] | None = None,
+) -> bool:
+    """
+    Extract the package ``tarball_full_path`` into ``destination_directory``
+    front to back, calling ``progress_update_callback`` with the fraction of
+    the file read. Return False if it can't be streamed.
+    """
+    with open(tarball_full_path, "rb", buffering=0) as fileobj:
+        if progress_update_callback:
+            size = os.fstat(fileobj.fileno()).st_size
+            fileobj = _ProgressReader(fileobj, size, progress_update_callback)
+        return extract_stream(
+            io.BufferedReader(fileobj), tarball_full_path, destination_directory
+        )
+
+
+class StreamingExtract:
+    """
+    Extract the package downloading to ``partial_path`` into
+    ``destination_directory`` on a background thread. ``finish()`` or
+    ``fail()`` must be called when the download ends.
+    """
+
+    def __init__(self, partial_path: str, target_path: str, destination_directory: str):
+        self.target_path = target_path
+        self.destination_directory = destination_directory
+        self.extracted = False
+        self._file = GrowingFile(partial_path, target_path)
+        self._thread = Thread(
+            target=self._run, name=f"extract {target_path}", daemon=True
+        )
+
+    def start(self) -> None:
+        # left over from an interrupted run
+        rm_rf(self.destination_directory)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            with self._file:
+                self.extracted = extract_stream(
+                    io.BufferedReader(self._file),
+                    self.target_path,
+                    self.destination_directory,
+                )
+        except Exception as e:
+            log.debug(
+                "Stopped extracting %s while downloading: %r", self.target_path, e
+            )
+
+    def finish(self) -> bool:
+        """
+        Wait for the extraction of the downloaded package. Return True if it
+        is complete; otherwise its directory is removed.
+        """
+        self._file.finish()
+        self._thread.join()
+        if not self.extracted:
+            rm_rf(self.destination_directory)
+        return self.extracted
+
+    def fail(self) -> None:
+        """Stop extracting and remove what was extracted."""
+        self._file.fail()
+        self._thread.join()
+        self.extracted = False
+        rm_rf(self.destination_directory)
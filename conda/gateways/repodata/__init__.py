@@ -13,6 +13,8 @@ import logging
 import os
 import pathlib
 import re
+import subprocess
+import sys
 import time
 import warnings
 from collections import UserDict
@@ -23,7 +25,8 @@ from typing import TYPE_CHECKING
 from ... import CondaError
 from ...auxlib.logz import stringify
 from ...base.constants import CONDA_HOMEPAGE_URL, REPODATA_FN
-from ...base.context import context
+from ...base.context import context, reset_context
+from ...common.compat import on_win
 from ...common.url import join_url, maybe_unquote
 from ...core.package_cache_data import PackageCacheData
 from ...exceptions import (
@@ -52,7 +55,7 @@ if TYPE_CHECKING:
     from pathlib import Path
     from typing import Any
 
-    from ..connection import Response
+    from ..connection import Response, Session
 
 log = logging.getLogger(__name__)
 stderrlog = logging.getLogger("conda.stderrlog")
@@ -61,11 +64,23 @@ stderrlog = logging.getLogger("conda.stderrlog")
 # if repodata.json.zst or repodata.jlap were unavailable, check again later.
 CHECK_ALTERNATE_FORMAT_INTERVAL = datetime.timedelta(days=7)
 
+# don't start another background refresh while one may still be running
+REVALIDATE_INTERVAL = datetime.timedelta(minutes=5)
+
 # repodata.info/state.json keys to keep up with the CEP
 LAST_MODIFIED_KEY = "mod"
 ETAG_KEY = "etag"
 CACHE_CONTROL_KEY = "cache_control"
 URL_KEY = "url"
+# hash of the upstream repodata.json that the cache is equivalent to (jlap)
+NOMINAL_HASH = "blake2_256_nominal"
+# hash of the cached repodata.json as written (jlap)
+ON_DISK_HASH = "blake2_256"
+# package entries changed by the most recent jlap update, and the ON_DISK_HASH
+# of the file it wrote; see conda.gateways.repodata.jlap.fetch.patched_packages()
+JLAP_PATCHED_KEY = "jlap_patched"
+# when a background refresh was last started; see RepodataCache.claim_revalidation()
+REVALIDATE_KEY = "revalidate_ns"
 CACHE_STATE_SUFFIX = ".info.json"
 
 # show some unparseable json in error
@@ -134,16 +149,24 @@ class CondaRepoInterface(RepoInterface):
     #: Filename of the repodata file; defaults to value of conda.base.constants.REPODATA_FN
     _repodata_fn: str
 
-    def __init__(self, url: str, repodata_fn: str | None, **kwargs) -> None:
+    def __init__(
+        self,
+        url: str,
+        repodata_fn: str | None,
+        *,
+        session: Session | None = None,
+        **kwargs,
+    ) -> None:
         log.debug("Using CondaRepoInterface")
         self._url = url
         self._repodata_fn = repodata_fn or REPODATA_FN
+        self._session = session
 
     def repodata(self, state: RepodataState) -> str | None:
         if not context.ssl_verify:
             warnings.simplefilter("ignore", InsecureRequestWarning)
 
-        session = get_session(self._url)
+        session = self._session or get_session(self._url)
 
         headers = {}
         etag = state.etag
@@ -590,8 +613,15 @@ class RepodataCache:
         return self.state
 
     def save(self, data: str):
-        """Write data to <repodata>.json cache path, synchronize state."""
+        """
+        Write data to <repodata>.json cache path, synchronize state.
+
+        ``data`` is a complete download, so the jlap hashes and patch record of
+        the previous file no longer describe it.
+        """
         temp_path = self.cache_dir / f"{self.name}.{os.urandom(2).hex()}.tmp"
+        for key in (NOMINAL_HASH, ON_DISK_HASH, JLAP_PATCHED_KEY):
+            self.state.pop(key, None)
 
         try:
             with temp_path.open("x") as temp:  # exclusive mode, error if exists
@@ -651,11 +681,7 @@ class RepodataCache:
         with self.cache_path_state.open(mode) as state_file, lock(state_file):
             yield state_file
 
-    def stale(self):
-        """
-        Compare state refresh_ns against cache control header and
-        context.local_repodata_ttl.
-        """
+    def _max_age_ns(self):
         if context.local_repodata_ttl > 1:
             max_age = context.local_repodata_ttl
         elif context.local_repodata_ttl == 1:
@@ -663,27 +689,59 @@ class RepodataCache:
         else:
             max_age = 0
 
-        max_age *= 10**9  # nanoseconds
+        return max_age * 10**9  # nanoseconds
+
+    def stale(self):
+        """
+        Compare state refresh_ns against cache control header and
+        context.local_repodata_ttl.
+        """
         now = time.time_ns()
         refresh = self.state.get("refresh_ns", 0)
-        return (now - refresh) > max_age
+        return (now - refresh) > self._max_age_ns()
 
     def timeout(self):
         """
         Return number of seconds until cache times out (<= 0 if already timed
         out).
         """
-        if context.local_repodata_ttl > 1:
-            max_age = context.local_repodata_ttl
-        elif context.local_repodata_ttl == 1:
-            max_age = get_cache_control_max_age(self.state.cache_control)
-        else:
-            max_age = 0
+        now = time.time_ns()
+        refresh = self.state.get("refresh_ns", 0)
+        return ((now - refresh) + self._max_age_ns()) / 1e9
 
-        max_age *= 10**9  # nanoseconds
+    def within_grace(self):
+        """
+        Return True if the cache has been stale for no longer than
+        context.local_repodata_stale_grace seconds.
+        """
         now = time.time_ns()
         refresh = self.state.get("refresh_ns", 0)
-        return ((now - refresh) + max_age) / 1e9
+        grace = context.local_repodata_stale_grace * 10**9
+        return (now - refresh) <= self._max_age_ns() + grace
+
+    def claim_revalidation(self):
+        """
+        Record, with the cache locked, that a background refresh is starting.
+
+        Return False if another process started one within
+        ``REVALIDATE_INTERVAL``, or if the cache state can't be updated.
+        """
+        now = time.time_ns()
+        interval = int(REVALIDATE_INTERVAL.total_seconds() * 10**9)
+        try:
+            with self.lock("r+") as state_file:
+                state = json.loads(state_file.read())
+                if now - state.get(REVALIDATE_KEY, 0) < interval:
+                    return False
+                state[REVALIDATE_KEY] = now
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps(state, indent=2))
+        except (OSError, json.JSONDecodeError):
+            log.debug("Could not claim revalidation of %s", self.cache_path_json)
+            return False
+        self.state[REVALIDATE_KEY] = now
+        return True
 
 
 class RepodataFetch:
@@ -710,10 +768,16 @@ class RepodataFetch:
         repodata_fn: str,
         *,
         repo_interface_cls,
+        session: Session | None = None,
     ):
+        """
+        :param session: shared by concurrent requests to the same host, e.g.
+            from ``pooled_session()``; defaults to ``get_session(url)``.
+        """
         self.cache_path_base = cache_path_base
         self.channel = channel
         self.repodata_fn = repodata_fn
+        self.session = session
 
         self.url_w_subdir = self.channel.url(with_credentials=False) or ""
         self.url_w_credentials = self.channel.url(with_credentials=True) or ""
@@ -744,9 +808,15 @@ class RepodataFetch:
         """
         Retrieve latest or latest-cached repodata; update cache.
 
+        Unlike ``fetch_latest()``, a usable cache is not read into memory.
+
         :return: (pathlib.Path to uncompressed repodata contents, RepodataState)
         """
-        _, state = self.fetch_latest()
+        cache = self.repo_cache
+        cache.load_state()
+        if self.should_use_cache(cache):
+            return self.cache_path_json, cache.state
+        _, state = self._fetch_latest(read=False)
         return self.cache_path_json, state
 
     @property
@@ -777,6 +847,7 @@ class RepodataFetch:
             self.url_w_credentials,
             repodata_fn=self.repodata_fn,
             cache=self.repo_cache,
+            session=self.session,
         )
 
     def fetch_latest(self) -> tuple[dict | str, RepodataState]:
@@ -785,6 +856,15 @@ class RepodataFetch:
         remote if cache has expired; return cached data if cache has not
         expired; return stale cached data or dummy data if in offline mode.
         """
+        return self._fetch_latest(read=True)
+
+    def _fetch_latest(self, read: bool) -> tuple[dict | str | None, RepodataState]:
+        """
+        ``fetch_latest()``; with ``read=False``, repodata that the repo
+        interface already wrote to ``cache_path_json`` (e.g. streamed and
+        decompressed from ``repodata.json.zst``) is not read back into memory,
+        and None may be returned in its place.
+        """
         cache = self.repo_cache
         cache.load_state()
 
@@ -810,27 +890,9 @@ class RepodataFetch:
                 )  # XXX basic properties like info, packages, packages.conda? instead of {}?
 
         else:
-            if context.use_index_cache:
-                log.debug(
-                    "Using cached repodata for %s at %s because use_cache=True",
-                    self.url_w_repodata_fn,
-                    self.cache_path_json,
-                )
-
-                _internal_state = self.read_cache()
-                return _internal_state
-
-            stale = cache.stale()
-            if (not stale or context.offline) and not self.url_w_subdir.startswith(
-                "file://"
-            ):
-                timeout = cache.timeout()
-                log.debug(
-                    "Using cached repodata for %s at %s. Timeout in %d sec",
-                    self.url_w_repodata_fn,
-                    self.cache_path_json,
-                    timeout,
-                )
+            if self.should_use_cache(cache):
+                if not read:
+                    return None, cache.state
                 _internal_state = self.read_cache()
                 return _internal_state
 
@@ -862,6 +924,9 @@ class RepodataFetch:
                 self.url_w_repodata_fn,
             )
             cache.refresh()
+            if not read:
+                cache.load_state()
+                return None, cache.state
             _internal_state = self.read_cache()
             return _internal_state
         else:
@@ -870,9 +935,10 @@ class RepodataFetch:
                     # this is handled very similar to a 304. Can the cases be merged?
                     # we may need to read_bytes() and compare a hash to the state, instead.
                     # XXX use self._repo_cache.load() or replace after passing temp path to jlap
-                    raw_repodata = self.cache_path_json.read_text()
-                    cache.state["size"] = len(raw_repodata)  # type: ignore
+                    raw_repodata = self.cache_path_json.read_text() if read else None
                     stat = self.cache_path_json.stat()
+                    # bytes, not characters, to match RepodataCache.load()
+                    cache.state["size"] = stat.st_size  # type: ignore
                     mtime_ns = stat.st_mtime_ns
                     cache.state["mtime_ns"] = mtime_ns  # type: ignore
                     cache.refresh()
@@ -900,6 +966,92 @@ class RepodataFetch:
 
             return raw_repodata, cache.state
 
+    def should_use_cache(self, cache: RepodataCache) -> bool:
+        """
+        Return True if existing cached repodata should be used without a
+        remote request. ``cache.state`` must already be loaded.
+        """
+        if not cache.cache_path_json.exists():
+            return False
+
+        if context.use_index_cache:
+            log.debug(
+                "Using cached repodata for %s at %s because use_cache=True",
+                self.url_w_repodata_fn,
+                self.cache_path_json,
+            )
+            return True
+
+        stale = cache.stale()
+        if (not stale or context.offline) and not self.url_w_subdir.startswith(
+            "file://"
+        ):
+            timeout = cache.timeout()
+            log.debug(
+                "Using cached repodata for %s at %s. Timeout in %d sec",
+                self.url_w_repodata_fn,
+                self.cache_path_json,
+                timeout,
+            )
+            return True
+
+        if (
+            context.local_repodata_stale_grace
+            and not self.url_w_subdir.startswith("file://")
+            and cache.within_grace()
+        ):
+            log.debug(
+                "Using stale cached repodata for %s at %s while it is refreshed",
+                self.url_w_repodata_fn,
+                self.cache_path_json,
+            )
+            if cache.claim_revalidation():
+                self.revalidate_in_background()
+            return True
+
+        return False
+
+    def revalidate_in_background(self):
+        """
+        Refresh the cache in a detached process, which keeps running after this
+        one exits. The refresh is coordinated with other processes by
+        ``RepodataCache.lock()``, like any other cache update.
+        """
+        args = {
+            "search_path": [str(path) for path in context._search_path],
+            "argparse_args": _json_argparse_args(),
+            "cache_path_base": str(self.cache_path_base),
+            "url": self.url_w_credentials,
+            "repodata_fn": self.repodata_fn,
+        }
+        if on_win:
+            detach = {
+                "creationflags": subprocess.DETACHED_PROCESS
+                | subprocess.CREATE_NEW_PROCESS_GROUP
+            }
+        else:
+            detach = {"start_new_session": True}
+        log.debug("Refreshing %s in the background", self.url_w_repodata_fn)
+        try:
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    "from conda.gateways.repodata import _revalidate; _revalidate()",
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                # the refresh itself must not be deferred again
+                env={**os.environ, "CONDA_LOCAL_REPODATA_STALE_GRACE": "0"},
+                **detach,
+            )
+            # credentials go through stdin rather than the command line
+            process.stdin.write(json.dumps(args).encode("utf-8"))
+            process.stdin.close()
+        except OSError:
+            log.debug("Could not start background refresh.", exc_info=True)
+
     def read_cache(self) -> tuple[str, RepodataState]:
         """
         Read repodata from disk, without trying to fetch a fresh version.
@@ -938,6 +1090,35 @@ except TypeError:  # pragma: no cover
         return hashlib.md5(data)
 
 
+def _json_argparse_args() -> dict[str, Any]:
+    """
+    The command line arguments of this process that can be sent to the
+    background refresh as JSON, so it sees the same settings, e.g.
+    ``--insecure``. Entries that aren't settings, like callables, are dropped.
+    """
+    argparse_args = {}
+    for key, value in dict(context._argparse_args).items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        argparse_args[key] = value
+    return argparse_args
+
+
+def _revalidate():
+    """Entry point of the process started by ``revalidate_in_background()``."""
+    args = json.load(sys.stdin)
+    reset_context(args["search_path"], args["argparse_args"])
+    fetcher = RepodataFetch(
+        pathlib.Path(args["cache_path_base"]),
+        Channel(args["url"]),
+        args["repodata_fn"],
+        repo_interface_cls=get_repo_interface(),
+    )
+    fetcher.fetch_latest_path()
+
+
 def cache_fn_url(url, repodata_fn=REPODATA_FN):
     # url must be right-padded with '/' to not invalidate any existing caches
     if not url.endswith("/"):
@@ -0,0 +1,151 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Client side of the local repodata index server.
+
+A long-running ``conda.core.index_server`` process keeps ``SubdirData`` loaded
+and answers queries over a Unix socket, so that concurrent ``conda``
+invocations on one machine share a single parsed copy of the repodata.
+
+The protocol is newline-delimited JSON. The client sends one request::
+
+    {"method": "query", "params": {...}}
+
+``params`` include the client's ``settings`` that change the records loaded
+from unchanged repodata, so that the server loads them as the client would.
+The server replies with a status line, ``{"ok": true, "count": N}`` or
+``{"error": "..."}``, followed by N dumped ``PackageRecord``s, one per line,
+then closes the connection. A response cut short is an error.
+"""
+
+from __future__ import annotations
+
+import abc
+import json
+import logging
+import os
+import socket
+from typing import TYPE_CHECKING
+
+from ...base.context import context
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable, Iterator
+
+log = logging.getLogger(__name__)
+
+METHODS = frozenset(("query", "query_all", "iter_records"))
+#: context settings that change the records loaded from unchanged repodata
+SETTINGS = ("use_only_tar_bz2", "add_pip_as_python_dependency", "channel_settings")
+
+
+class IndexServerError(Exception):
+    """The index server could not answer; load repodata in-process instead."""
+
+
+def client_settings() -> dict[str, Any]:
+    """This process's ``SETTINGS``, as sent with each request."""
+    return {
+        "use_only_tar_bz2": context.use_only_tar_bz2,
+        "add_pip_as_python_dependency": context.add_pip_as_python_dependency,
+        "channel_settings": [dict(settings) for settings in context.channel_settings],
+    }
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_response(lines: Iterable[bytes]) -> list[dict[str, Any]]:
+    """
+    Check the status line, and return the records that follow it. Raise
+    ``IndexServerError`` unless all of the records it counts arrived intact.
+    """
+    lines = iter(lines)
+    try:
+        status = json.loads(next(lines, b"{}") or b"{}")
+        if not status.get("ok"):
+            raise IndexServerError(status.get("error", "no response from index server"))
+        records = [json.loads(line) for line in lines if line.strip()]
+    except json.JSONDecodeError as e:
+        raise IndexServerError(f"truncated response from index server: {e}")
+    if len(records) != status.get("count"):
+        raise IndexServerError(
+            f"index server sent {len(records)} of {status.get('count')} records"
+        )
+    return records
+
+
+class IndexServerInterface(abc.ABC):
+    """
+    Send queries to an index server. ``SubdirData.IndexInterface`` names the
+    implementation; tests may replace it with one that answers in-process.
+    """
+
+    def __init__(self, address: str):
+        self._address = address
+
+    def available(self) -> bool:
+        """Whether a server appears to be listening; cheap to call."""
+        return True
+
+    @abc.abstractmethod
+    def request(self, method: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+        """
+        Return the records answering ``method``. Raise ``IndexServerError``, or
+        ``OSError`` for transport failures, if there is no answer.
+        """
+        ...
+
+    def query(self, url: str, repodata_fn: str, spec: str) -> Iterator[dict]:
+        return iter(
+            self.request(
+                "query",
+                {
+                    "url": url,
+                    "repodata_fn": repodata_fn,
+                    "spec": spec,
+                    "settings": client_settings(),
+                },
+            )
+        )
+
+    def query_all(
+        self, spec: str, channel_urls: Iterable[str], repodata_fn: str
+    ) -> Iterator[dict]:
+        return iter(
+            self.request(
+                "query_all",
+                {
+                    "spec": spec,
+                    "channel_urls": list(channel_urls),
+                    "repodata_fn": repodata_fn,
+                    "settings": client_settings(),
+                },
+            )
+        )
+
+    def iter_records(self, url: str, repodata_fn: str) -> Iterator[dict]:
+        return iter(
+            self.request(
+                "iter_records",
+                {"url": url, "repodata_fn": repodata_fn, "settings": client_settings()},
+            )
+        )
+
+
+class UnixSocketIndexInterface(IndexServerInterface):
+    """Talk to an index server listening on the Unix socket at ``address``."""
+
+    timeout = 60
+
+    def available(self) -> bool:
+        return hasattr(socket, "AF_UNIX") and os.path.exists(self._address)
+
+    def request(self, method: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self._address)
+            sock.sendall(encode_message({"method": method, "params": params}))
+            with sock.makefile("rb") as response:
+                return decode_response(response)
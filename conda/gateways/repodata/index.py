@@ -0,0 +1,193 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Memory-mapped, offset-indexed cache of processed repodata records.
+
+Replaces the old pickle cache. The file is laid out as::
+
+    preamble   magic, format version, record count, header length
+    header     JSON object: validation state, shared metadata, shard manifest
+    offsets    (line count + 1) little-endian uint64 line boundaries
+    records    one compact JSON object per line, sharded by package name
+    depends    one compact JSON line per dependency table entry, if any
+
+All records for a package name are stored next to each other, and the
+manifest in the header maps each name to its shard's ``[start, stop)`` record
+range. Only the small header is parsed when the index is opened; a shard is
+decoded from the mapped file, in a single call, the first time one of its
+records is requested. The dependency table, see
+``conda.models.depends_table``, is only decoded when first asked for.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Iterable, Mapping, Sequence
+
+log = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"CONDAIDX"
+INDEX_FORMAT_VERSION = 3
+INDEX_SUFFIX = ".idx"
+
+# magic, format version, record count, header length
+_PREAMBLE = struct.Struct("<8sIIQ")
+_OFFSET = struct.Struct("<Q")
+_RANGE = struct.Struct("<QQ")
+
+
+def _align(pos: int, alignment: int = _OFFSET.size) -> int:
+    return -pos % alignment
+
+
+def write_index(
+    path: Path,
+    records: Sequence[Mapping[str, Any] | bytes],
+    names: Mapping[str, Iterable[int]],
+    header: Mapping[str, Any],
+    depends: Sequence[Any] = (),
+) -> None:
+    """
+    Atomically write ``records`` to an index file at ``path``.
+
+    Records are reordered so that each name's records form one contiguous
+    shard; read ``RepodataIndex.names`` for their new positions.
+
+    :param records: JSON-serializable record dicts, or records already
+        encoded as compact JSON, e.g. from ``RepodataIndex.raw_record()``.
+    :param names: package name to record positions.
+    :param header: additional JSON-serializable metadata, e.g. cache
+        validation keys, returned as ``RepodataIndex.header`` when read.
+    :param depends: JSON-serializable dependency table entries, returned by
+        ``RepodataIndex.depends()``.
+    """
+    order = []
+    shards = {}
+    for name, idx in names.items():
+        start = len(order)
+        order.extend(idx)
+        shards[name] = [start, len(order)]
+    # records without a name are kept, after all shards
+    unsharded = set(range(len(records))).difference(order)
+    order.extend(sorted(unsharded))
+
+    header_bytes = json.dumps(
+        {**header, "names": shards, "depends": len(depends)}, separators=(",", ":")
+    ).encode("utf-8")
+    header_bytes += b" " * _align(_PREAMBLE.size + len(header_bytes))
+    count = len(order)
+    lines = count + len(depends)
+    table_pos = _PREAMBLE.size + len(header_bytes)
+
+    temp_path = path.with_name(f"{path.name}.{os.urandom(2).hex()}.tmp")
+    try:
+        with temp_path.open("xb") as fh:
+            fh.write(
+                _PREAMBLE.pack(
+                    INDEX_MAGIC, INDEX_FORMAT_VERSION, count, len(header_bytes)
+                )
+            )
+            fh.write(header_bytes)
+            # reserve the offsets table; filled in once records are written
+            fh.write(bytes(_OFFSET.size * (lines + 1)))
+            offsets = [fh.tell()]
+            for i in order:
+                record = records[i]
+                if not isinstance(record, bytes):
+                    # ensure_ascii leaves no raw newlines inside a record
+                    record = json.dumps(record, separators=(",", ":")).encode("utf-8")
+                fh.write(record)
+                fh.write(b"\n")
+                offsets.append(fh.tell())
+            for entry in depends:
+                fh.write(json.dumps(entry, separators=(",", ":")).encode("utf-8"))
+                fh.write(b"\n")
+                offsets.append(fh.tell())
+            fh.seek(table_pos)
+            fh.write(struct.pack(f"<{lines + 1}Q", *offsets))
+        os.replace(temp_path, path)
+    finally:
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+
+
+class RepodataIndex:
+    """Read-only view of an index file written by ``write_index()``."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"{path} is not a repodata index")
+            if version != INDEX_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported repodata index version {version} in {path}"
+                )
+            self._count = count
+            self._table_pos = _PREAMBLE.size + header_len
+            self.header: dict[str, Any] = json.loads(
+                self._mmap[_PREAMBLE.size : self._table_pos]
+            )
+            self._lines = count + self.header.get("depends", 0)
+            if self._table_pos + _OFFSET.size * (self._lines + 1) > len(self._mmap):
+                raise ValueError(f"Truncated repodata index {path}")
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def names(self) -> dict[str, range]:
+        """Package name to the positions of its shard."""
+        return {name: range(*shard) for name, shard in self.header["names"].items()}
+
+    def record(self, i: int) -> dict[str, Any]:
+        """Decode the record at position ``i``."""
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start, end = _RANGE.unpack_from(self._mmap, self._table_pos + _OFFSET.size * i)
+        return json.loads(self._mmap[start:end])
+
+    def raw_record(self, i: int) -> bytes:
+        """Encoded record at position ``i``, to copy into another index."""
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start, end = _RANGE.unpack_from(self._mmap, self._table_pos + _OFFSET.size * i)
+        return self._mmap[start : end - 1]
+
+    def records(self, start: int, stop: int) -> list[dict[str, Any]]:
+        """Decode the contiguous records ``[start, stop)``, e.g. one shard."""
+        if not 0 <= start <= stop <= self._count:
+            raise IndexError(slice(start, stop))
+        return self._decode_lines(start, stop)
+
+    def depends(self) -> list[Any]:
+        """Decode the dependency table entries."""
+        return self._decode_lines(self._count, self._lines)
+
+    def _decode_lines(self, start: int, stop: int) -> list[Any]:
+        if start == stop:
+            return []
+        (begin,) = _OFFSET.unpack_from(
+            self._mmap, self._table_pos + _OFFSET.size * start
+        )
+        (end,) = _OFFSET.unpack_from(self._mmap, self._table_pos + _OFFSET.size * stop)
+        lines = self._mmap[begin : end - 1].replace(b"\n", b",")
+        return json.loads(b"[" + lines + b"]")
+
+    def close(self) -> None:
+        self._mmap.close()
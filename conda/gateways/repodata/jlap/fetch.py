@@ -21,7 +21,14 @@ from requests import HTTPError
 from conda.common.url import mask_anaconda_token
 
 from ....base.context import context
-from .. import ETAG_KEY, LAST_MODIFIED_KEY, RepodataState
+from .. import (
+    ETAG_KEY,
+    JLAP_PATCHED_KEY,
+    LAST_MODIFIED_KEY,
+    NOMINAL_HASH,
+    ON_DISK_HASH,
+    RepodataState,
+)
 from .core import JLAP
 
 if TYPE_CHECKING:
@@ -38,8 +45,6 @@ DIGEST_SIZE = 32  # 256 bits
 
 JLAP_KEY = "jlap"
 HEADERS = "headers"
-NOMINAL_HASH = "blake2_256_nominal"
-ON_DISK_HASH = "blake2_256"
 LATEST = "latest"
 
 # save these headers. at least etag, last-modified, cache-control plus a few
@@ -185,6 +190,26 @@ def apply_patches(data, apply):
         data = jsonpatch.JsonPatch(patch["patch"]).apply(data, in_place=True)
 
 
+def patched_packages(apply) -> dict[str, list[str]] | None:
+    """
+    Return the filenames changed by the patches in ``apply``, keyed by
+    ``packages`` and ``packages.conda``, or None if any patch changes another
+    part of repodata.json.
+    """
+    touched = {"packages": set(), "packages.conda": set()}
+    for patch in apply:
+        for operation in patch["patch"]:
+            for path in (operation["path"], operation.get("from")):
+                if path is None:
+                    continue
+                # JSON pointer "/packages/<fn>[/<field>...]"
+                _, *parts = path.split("/")
+                if len(parts) < 2 or parts[0] not in touched:
+                    return None
+                touched[parts[0]].add(parts[1].replace("~1", "/").replace("~0", "~"))
+    return {key: sorted(fns) for key, fns in touched.items()}
+
+
 def withext(url, ext):
     return re.sub(r"(\.\w+)$", ext, url)
 
@@ -346,6 +371,8 @@ def request_url_jlap_state(
         # was not re-hashed if 304 not modified
         if response.status_code == 200:
             state[NOMINAL_HASH] = state[ON_DISK_HASH] = hasher.hexdigest()
+            # a complete download; no patch led to it
+            state.pop(JLAP_PATCHED_KEY, None)
 
         have = state[NOMINAL_HASH]
 
@@ -447,6 +474,7 @@ def request_url_jlap_state(
                         log.warn("repodata cache changed during jlap fetch.")
                         return None
 
+                patched = patched_packages(apply)
                 apply_patches(repodata_json, apply)
 
                 with timeme("Write changed "), temp_path.open("wb") as repodata:
@@ -461,6 +489,18 @@ def request_url_jlap_state(
                     # hash of equivalent upstream json
                     state[NOMINAL_HASH] = want
 
+                    if patched is None:
+                        state.pop(JLAP_PATCHED_KEY, None)
+                    else:
+                        # lets SubdirData update its index instead of
+                        # rebuilding it, for as long as this file is cached
+                        state[JLAP_PATCHED_KEY] = {
+                            "from": have,
+                            "to": want,
+                            ON_DISK_HASH: state[ON_DISK_HASH],
+                            **patched,
+                        }
+
                     # avoid duplicate parsing
                     return repodata_json
             else:
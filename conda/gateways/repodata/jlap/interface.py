@@ -25,6 +25,7 @@ from .. import (
 from . import fetch
 
 if TYPE_CHECKING:
+    from ...connection import Session
     from .. import RepodataCache
 
 log = logging.getLogger(__name__)
@@ -37,11 +38,13 @@ class JlapRepoInterface(RepoInterface):
         repodata_fn: str | None,
         *,
         cache: RepodataCache,
+        session: Session | None = None,
         **kwargs,
     ) -> None:
         log.debug("Using %s", self.__class__.__name__)
 
         self._cache = cache
+        self._session = session
 
         self._url = url
         self._repodata_fn = repodata_fn
@@ -67,7 +70,7 @@ class JlapRepoInterface(RepoInterface):
         When repodata is not updated, it doesn't matter whether this function or
         the caller reads from a file.
         """
-        session = get_session(self._url)
+        session = self._session or get_session(self._url)
 
         if not context.ssl_verify:
             disable_ssl_verify_warning()
@@ -0,0 +1,123 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Incremental repodata.json parser.
+
+Reads a file in chunks and decodes one package record at a time, so the raw
+text and the full parsed document never have to be in memory at once.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Iterator, TextIO
+
+#: top-level keys whose values are decoded entry by entry
+STREAMED_KEYS = frozenset(("packages", "packages.conda"))
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size: int) -> bool:
+        """Read at least ``size`` more characters; return False at EOF."""
+        if self.eof:
+            return False
+        # discard consumed text to keep the buffer small
+        self.buf = self.buf[self.pos :]
+        self.pos = 0
+        chunk = self.fp.read(max(size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or "" at EOF."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self.fill(self.chunk_size):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f"Expecting one of {chars!r}", self.buf, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # incomplete value; double the buffer to stay linear
+                if not self.fill(len(self.buf) - self.pos):
+                    raise
+                continue
+            # a number may continue past the end of the buffer
+            if end == len(self.buf) and self.fill(self.chunk_size):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_repodata(
+    fp: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[tuple[str, str | None, Any]]:
+    """
+    Incrementally parse a repodata.json document.
+
+    Yield ``(key, None, value)`` for ordinary top-level keys, and
+    ``(key, filename, record)`` for each entry of ``packages`` and
+    ``packages.conda``.
+    """
+    reader = _Reader(fp, chunk_size)
+    if not reader.peek():
+        return  # empty file, same as "{}"
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key in STREAMED_KEYS and reader.peek() == "{":
+            reader.expect("{")
+            if reader.peek() == "}":
+                reader.expect("}")
+            else:
+                while True:
+                    fn = reader.value()
+                    reader.expect(":")
+                    yield key, fn, reader.value()
+                    if reader.expect(",}") == "}":
+                        break
+        else:
+            yield key, None, reader.value()
+        if reader.expect(",}") == "}":
+            break
+    if reader.peek():
+        raise json.JSONDecodeError("Extra data", reader.buf, reader.pos)
@@ -0,0 +1,126 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Pre-parsed dependencies of the records in a repodata index.
+
+``PackageRecord.combined_depends`` merges a record's ``depends`` and
+``constrains`` into ``MatchSpec`` objects, which the solver asks for every
+record it considers, on every solve. Instead, ``SubdirData`` does this once
+when it writes its repodata index. Each distinct merged spec is stored once in
+the index, and each record refers to its specs by position. Records loaded
+from the index share the ``MatchSpec`` objects parsed from that table.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .match_spec import MatchSpec
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Sequence
+
+    #: a merged spec as stored in the index: spec string and ``optional``
+    SpecEntry = tuple[str, bool]
+
+
+def combine_depends(
+    depends: Iterable[str], constrains: Iterable[str]
+) -> tuple[MatchSpec, ...]:
+    """Merge ``depends`` and ``constrains``, the latter as optional specs."""
+    result = {ms.name: ms for ms in MatchSpec.merge(depends)}
+    for spec in constrains or ():
+        ms = MatchSpec(spec)
+        result[ms.name] = MatchSpec(ms, optional=(ms.name not in result))
+    return tuple(result.values())
+
+
+def _entry(ms: MatchSpec) -> SpecEntry | None:
+    """A spec entry that parses back to ``ms``, or None if there is none."""
+    for spec_str in (ms.original_spec_str, str(ms)):
+        if spec_str and MatchSpec(spec_str, optional=ms.optional) == ms:
+            return spec_str, ms.optional
+    return None
+
+
+class DependsTable:
+    """
+    Distinct merged dependency specs of one repodata index.
+
+    ``entries`` is a sequence of ``(spec_str, optional)`` pairs, or a callable
+    returning one, to defer reading the table until a record first needs it.
+    """
+
+    def __init__(self, entries: Sequence[SpecEntry] | Callable[[], Sequence] = ()):
+        if callable(entries):
+            self._load = entries
+            self._entries = None
+        else:
+            self._load = None
+            self._entries = [tuple(entry) for entry in entries]
+        self._ids = None
+        self._match_specs = {}
+        self._added = {}
+
+    @property
+    def entries(self) -> list[SpecEntry]:
+        if self._entries is None:
+            self._entries = [tuple(entry) for entry in self._load()]
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getstate__(self):
+        # the loader may read from a memory-mapped file
+        return {"entries": self.entries}
+
+    def __setstate__(self, state):
+        self.__init__(state["entries"])
+
+    def add(
+        self, depends: Iterable[str], constrains: Iterable[str]
+    ) -> list[int] | None:
+        """
+        Return the positions of the merged specs of a record with these
+        ``depends`` and ``constrains``, adding new specs to the table.
+
+        Return None if the specs can't be stored, e.g. they don't merge or
+        don't parse back to the same specs; those records are merged when
+        asked, as if they had no table.
+        """
+        key = tuple(depends), tuple(constrains or ())
+        try:
+            return self._added[key]
+        except KeyError:
+            pass
+        if self._ids is None:
+            self._ids = {entry: i for i, entry in enumerate(self.entries)}
+        try:
+            entries = [_entry(ms) for ms in combine_depends(*key)]
+        except Exception:
+            entries = [None]
+        if None in entries:
+            ids = None
+        else:
+            ids = []
+            for entry in entries:
+                i = self._ids.get(entry)
+                if i is None:
+                    i = self._ids[entry] = len(self.entries)
+                    self.entries.append(entry)
+                ids.append(i)
+        self._added[key] = ids
+        return ids
+
+    def match_specs(self, ids: Iterable[int]) -> tuple[MatchSpec, ...]:
+        """The merged specs at positions ``ids``."""
+        match_specs = self._match_specs
+        result = []
+        for i in ids:
+            ms = match_specs.get(i)
+            if ms is None:
+                spec_str, optional = self.entries[i]
+                ms = match_specs[i] = MatchSpec(spec_str, optional=optional)
+            result.append(ms)
+        return tuple(result)
@@ -22,6 +22,7 @@ from ..base.context import context
 from ..common.compat import isiterable
 from ..common.io import dashlist
 from ..common.iterators import groupby_to_dict as groupby
+from ..common.lru import LRUCache
 from ..common.path import expand, is_package_file, strip_pkg_extension, url_to_path
 from ..common.url import is_url, path_to_url, unquote
 from ..exceptions import InvalidMatchSpec, InvalidSpec
@@ -181,7 +182,7 @@ class MatchSpec(metaclass=MatchSpecType):
         "fn",
     )
     FIELD_NAMES_SET = frozenset(FIELD_NAMES)
-    _MATCHER_CACHE = {}
+    _MATCHER_CACHE = LRUCache("MatchSpec._make_component", maxsize=1 << 16)
 
     def __init__(self, optional=False, target=None, **kwargs):
         self._optional = optional
@@ -592,7 +593,7 @@ def _parse_channel(channel_val):
     return channel_name, chn.subdir
 
 
-_PARSE_CACHE = {}
+_PARSE_CACHE = LRUCache("MatchSpec._parse_spec_str", maxsize=1 << 16)
 
 
 def _parse_spec_str(spec_str):
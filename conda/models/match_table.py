@@ -0,0 +1,123 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Match a ``MatchSpec`` against a whole group of records at once.
+
+A large group, e.g. every ``python`` or ``numpy`` record on conda-forge, has
+thousands of records but far fewer distinct versions, build numbers, build
+strings and channels. ``MatchTable`` stores each field as a column of ids
+into its distinct values. To match a spec, each component is evaluated once
+per distinct value, and the per-value results are broadcast back over the
+column. NumPy is used for the broadcast when it is installed; it is
+imported when the first table is built, not with this module.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from itertools import compress
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Sequence
+
+    from .match_spec import MatchSpec
+    from .records import PackageRecord
+
+#: groups smaller than this are matched record by record
+MIN_TABLE_SIZE = 16
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy, or None if it isn't installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class _Column:
+    __slots__ = ("ids", "firsts")
+
+    def __init__(self, ids: Any, firsts: list[int]):
+        #: per record, the id of its distinct value
+        self.ids = ids
+        #: per distinct value, the position of the first record having it
+        self.firsts = firsts
+
+
+class MatchTable:
+    """Columnar view of ``records``, built lazily one field at a time."""
+
+    def __init__(self, records: Sequence[PackageRecord], use_numpy: bool = True):
+        self.records = tuple(records)
+        self._np = _numpy() if use_numpy else None
+        self._columns: dict[str, _Column | None] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _column(self, field_name: str) -> _Column | None:
+        try:
+            return self._columns[field_name]
+        except KeyError:
+            pass
+        value_ids = {}
+        firsts = []
+        ids = []
+        try:
+            for i, record in enumerate(self.records):
+                value = getattr(record, field_name)
+                value_id = value_ids.get(value)
+                if value_id is None:
+                    value_id = value_ids[value] = len(firsts)
+                    firsts.append(i)
+                ids.append(value_id)
+        except TypeError:
+            # unhashable values; match record by record
+            column = None
+        else:
+            if self._np is not None:
+                ids = self._np.array(ids, dtype=self._np.intp)
+            column = _Column(ids, firsts)
+        self._columns[field_name] = column
+        return column
+
+    def match(self, spec: MatchSpec) -> tuple[PackageRecord, ...]:
+        """Records matching ``spec``, in their original order."""
+        records = self.records
+        xp = self._np
+        if xp is not None:
+            mask = xp.ones(len(records), dtype=bool)
+        else:
+            positions = range(len(records))
+        for field_name, component in spec._match_components.items():
+            column = self._column(field_name)
+            if column is None:
+                hits = [
+                    bool(spec._match_individual(record, field_name, component))
+                    for record in records
+                ]
+                if xp is not None:
+                    mask &= xp.array(hits, dtype=bool)
+                else:
+                    positions = [i for i in positions if hits[i]]
+                continue
+            per_value = [
+                bool(spec._match_individual(records[i], field_name, component))
+                for i in column.firsts
+            ]
+            if all(per_value):
+                continue
+            if not any(per_value):
+                return ()
+            if xp is not None:
+                mask &= xp.array(per_value, dtype=bool)[column.ids]
+            else:
+                ids = column.ids
+                positions = [i for i in positions if per_value[ids[i]]]
+        if xp is not None:
+            return tuple(compress(records, mask.tolist()))
+        return tuple(records[i] for i in positions)
@@ -34,6 +34,7 @@ from ..base.context import context
 from ..common.compat import isiterable
 from ..exceptions import PathNotFoundError
 from .channel import Channel
+from .depends_table import combine_depends
 from .enums import FileMode, LinkType, NoarchType, PackageType, PathType, Platform
 from .match_spec import MatchSpec
 
@@ -354,15 +355,17 @@ class PackageRecord(DictSafeMixin, Entity):
 
     timestamp = TimestampField()
 
+    #: ``(table, ids, depends, constrains)`` for records loaded from a repodata
+    #: index, whose merged specs are pre-parsed in a ``DependsTable``
+    _depends_ref = None
+
     @property
     def combined_depends(self):
-        from .match_spec import MatchSpec
-
-        result = {ms.name: ms for ms in MatchSpec.merge(self.depends)}
-        for spec in self.constrains or ():
-            ms = MatchSpec(spec)
-            result[ms.name] = MatchSpec(ms, optional=(ms.name not in result))
-        return tuple(result.values())
+        ref = self._depends_ref
+        # unless depends or constrains were replaced since
+        if ref is not None and ref[2] is self.depends and ref[3] is self.constrains:
+            return ref[0].match_specs(ref[1])
+        return combine_depends(self.depends, self.constrains)
 
     # the canonical code abbreviation for PackageRecord is `prec`, not to be confused with
     # PackageCacheRecord (`pcrec`) or PrefixRecord (`prefix_rec`)
@@ -16,6 +16,7 @@ import re
 from itertools import zip_longest
 from logging import getLogger
 
+from ..common.lru import LRUCache
 from ..exceptions import InvalidVersionSpec
 
 log = getLogger(__name__)
@@ -35,16 +36,59 @@ version_split_re = re.compile("([0-9]+|[*]+|[^0-9*]+)")
 version_cache = {}
 
 
+# sorts after a component or subcomponent that compares below the implicit
+# fill value, and before one that compares above it
+_PAD_KEY = (1,)
+
+
+def _run_key(items, sign_and_key):
+    """
+    Encode ``items``, compared element-wise with missing elements treated as
+    the fill value, as a tuple that compares the same way natively.
+
+    Each run of fill-value-equal items is folded into the item that ends it,
+    so that trailing fill values vanish and e.g. '1.1' and '1.1.0' get the
+    same key.
+    """
+    key = []
+    fills = 0
+    for item in items:
+        sign, item_key = sign_and_key(item)
+        if not sign:
+            fills += 1
+        elif sign < 0:
+            # the more fill values before it, the larger
+            key.append((0, fills, item_key))
+            fills = 0
+        else:
+            # the more fill values before it, the smaller
+            key.append((2, -fills, item_key))
+            fills = 0
+    key.append(_PAD_KEY)
+    return tuple(key)
+
+
+def _subcomponent_sign_and_key(c):
+    # strings sort before the fill value 0, positive numbers after it
+    if isinstance(c, str):
+        return -1, c
+    return (1 if c else 0), c
+
+
+def _component_sign_and_key(component):
+    key = _run_key(component, _subcomponent_sign_and_key)
+    return key[0][0] - 1, key
+
+
 class SingleStrArgCachingType(type):
     def __call__(cls, arg):
         if isinstance(arg, cls):
             return arg
         elif isinstance(arg, str):
-            try:
-                return cls._cache_[arg]
-            except KeyError:
+            val = cls._cache_.get(arg)
+            if val is None:
                 val = cls._cache_[arg] = super().__call__(arg)
-                return val
+            return val
         else:
             return super().__call__(arg)
 
@@ -154,7 +198,7 @@ class VersionOrder(metaclass=SingleStrArgCachingType):
       1.0.1_ < 1.0.1a =>  True   # ensure correct ordering for openssl
     """
 
-    _cache_ = {}
+    _cache_ = LRUCache("VersionOrder", maxsize=1 << 17)
 
     def __init__(self, vstr: str):
         # version comparison is case-insensitive
@@ -244,6 +288,12 @@ class VersionOrder(metaclass=SingleStrArgCachingType):
                     # strings in phase => prepend fillvalue
                     v[k] = [self.fillvalue] + c
 
+        # comparing these natively gives the order documented above
+        self.sort_key = (
+            _run_key(self.version, _component_sign_and_key),
+            _run_key(self.local, _component_sign_and_key),
+        )
+
     def __str__(self) -> str:
         return self.norm_version
 
@@ -260,9 +310,7 @@ class VersionOrder(metaclass=SingleStrArgCachingType):
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, VersionOrder):
             return False
-        return self._eq(self.version, other.version) and self._eq(
-            self.local, other.local
-        )
+        return self.sort_key == other.sort_key
 
     def startswith(self, other: object) -> bool:
         if not isinstance(other, VersionOrder):
@@ -296,22 +344,7 @@ class VersionOrder(metaclass=SingleStrArgCachingType):
     def __lt__(self, other: object) -> bool:
         if not isinstance(other, VersionOrder):
             return False
-        for t1, t2 in zip([self.version, self.local], [other.version, other.local]):
-            for v1, v2 in zip_longest(t1, t2, fillvalue=[]):
-                for c1, c2 in zip_longest(v1, v2, fillvalue=self.fillvalue):
-                    if c1 == c2:
-                        continue
-                    elif isinstance(c1, str):
-                        if not isinstance(c2, str):
-                            # str < int
-                            return True
-                    elif isinstance(c2, str):
-                        # not (int < str)
-                        return False
-                    # c1 and c2 have the same type
-                    return c1 < c2
-        # self == other
-        return False
+        return self.sort_key < other.sort_key
 
     def __gt__(self, other: object) -> bool:
         return other < self
@@ -517,7 +550,7 @@ class BaseSpec:
 
 
 class VersionSpec(BaseSpec, metaclass=SingleStrArgCachingType):
-    _cache_ = {}
+    _cache_ = LRUCache("VersionSpec", maxsize=1 << 15)
 
     def __init__(self, vspec):
         vspec_str, matcher, is_exact = self.get_matcher(vspec)
@@ -629,7 +662,7 @@ VersionMatch = VersionSpec
 
 
 class BuildNumberMatch(BaseSpec, metaclass=SingleStrArgCachingType):
-    _cache_ = {}
+    _cache_ = LRUCache("BuildNumberMatch", maxsize=1 << 10)
 
     def __init__(self, vspec):
         vspec_str, matcher, is_exact = self.get_matcher(vspec)
@@ -7,6 +7,7 @@ See conda.core.solver.Solver for the high-level API.
 
 from __future__ import annotations
 
+import atexit
 import copy
 import itertools
 from collections import defaultdict, deque
@@ -23,10 +24,12 @@ from .common.io import dashlist, time_recorder
 from .common.iterators import groupby_to_dict as groupby
 from .common.logic import (
     TRUE,
+    BDDEncoding,
     Clauses,
     PycoSatSolver,
     PyCryptoSatSolver,
     PySatSolver,
+    SatPortfolio,
     minimal_unsatisfiable_subset,
 )
 from .common.toposort import toposort
@@ -39,6 +42,7 @@ from .exceptions import (
 from .models.channel import Channel, MultiChannel
 from .models.enums import NoarchType, PackageType
 from .models.match_spec import MatchSpec
+from .models.match_table import MIN_TABLE_SIZE, MatchTable
 from .models.records import PackageRecord
 from .models.version import VersionOrder
 
@@ -50,6 +54,11 @@ except ImportError:
 log = getLogger(__name__)
 stdoutlog = getLogger("conda.stdoutlog")
 
+# gen_clauses() results kept by Resolve.base_clauses()
+BASE_CLAUSES_CACHE_SIZE = 4
+# get_reduced_index() pruning results kept per channel priority and features
+PRUNED_CACHE_SIZE = 8
+
 # used in conda build
 Unsatisfiable = UnsatisfiableError
 ResolvePackageNotFound = ResolvePackageNotFound
@@ -61,19 +70,20 @@ _sat_solvers = {
 }
 
 
+def _try_out_solver(sat_solver):
+    c = Clauses(sat_solver=sat_solver)
+    required = {c.new_var(), c.new_var()}
+    c.Require(c.And, *required)
+    solution = set(c.sat())
+    if not required.issubset(solution):
+        raise RuntimeError(f"Wrong SAT solution: {solution}. Required: {required}")
+
+
 @lru_cache(maxsize=None)
 def _get_sat_solver_cls(sat_solver_choice=SatSolverChoice.PYCOSAT):
-    def try_out_solver(sat_solver):
-        c = Clauses(sat_solver=sat_solver)
-        required = {c.new_var(), c.new_var()}
-        c.Require(c.And, *required)
-        solution = set(c.sat())
-        if not required.issubset(solution):
-            raise RuntimeError(f"Wrong SAT solution: {solution}. Required: {required}")
-
     sat_solver = _sat_solvers[sat_solver_choice]
     try:
-        try_out_solver(sat_solver)
+        _try_out_solver(sat_solver)
     except Exception as e:
         log.warning(
             "Could not run SAT solver through interface '%s'.", sat_solver_choice
@@ -84,7 +94,7 @@ def _get_sat_solver_cls(sat_solver_choice=SatSolverChoice.PYCOSAT):
         return sat_solver
     for sat_solver in _sat_solvers.values():
         try:
-            try_out_solver(sat_solver)
+            _try_out_solver(sat_solver)
         except Exception as e:
             log.debug(
                 "Attempted SAT interface '%s' but unavailable due to: %s",
@@ -99,6 +109,23 @@ def _get_sat_solver_cls(sat_solver_choice=SatSolverChoice.PYCOSAT):
     )
 
 
+@lru_cache(maxsize=None)
+def _get_sat_portfolio(processes):
+    """A portfolio of ``processes`` workers over every SAT solver interface that runs."""
+    sat_solvers = []
+    for sat_solver in _sat_solvers.values():
+        try:
+            _try_out_solver(sat_solver)
+        except Exception as e:
+            log.debug("Leaving SAT interface '%s' out of portfolio: %s", sat_solver, e)
+        else:
+            sat_solvers.append(sat_solver)
+    log.debug("Using SAT solver portfolio of %s", ", ".join(sat_solvers))
+    portfolio = SatPortfolio(processes, sat_solvers)
+    atexit.register(portfolio.close)
+    return portfolio
+
+
 def exactness_and_number_of_deps(resolve_obj, ms):
     """Sorting key to emphasize packages that have more strict
     requirements. More strict means the reduced index can be reduced
@@ -143,8 +170,12 @@ class Resolve:
         self.groups = groups  # dict[package_name, list[PackageRecord]]
         self.trackers = trackers  # dict[track_feature, set[PackageRecord]]
         self._cached_find_matches = {}  # dict[MatchSpec, set[PackageRecord]]
+        self._match_tables = {}  # dict[package_name, MatchTable]
         self.ms_depends_ = {}  # dict[PackageRecord, list[MatchSpec]]
         self._reduced_index_cache = {}
+        # dict[(strict, features), dict[frozenset[MatchSpec], dict[PackageRecord, str]]]
+        self._pruned_cache = {}
+        self._base_clauses_cache = {}
         self._pool_cache = {}
         self._strict_channel_cache = {}
 
@@ -413,18 +444,182 @@ class Resolve:
         return tuple(f for f in matches if f.channel.name == sole_source_channel_name)
 
     def find_conflicts(self, specs, specs_to_add=None, history_specs=None):
+        strict_channel_priority = context.channel_priority == ChannelPriority.STRICT
         if context.unsatisfiable_hints:
-            if not context.json:
-                print(
-                    "\nFound conflicts! Looking for incompatible packages.\n"
-                    "This can take several minutes.  Press CTRL-C to abort."
+            chains = self.quick_conflicts(set(specs) | set(specs_to_add or ()))
+            bad_deps = (
+                self._classify_bad_deps(
+                    chains, specs_to_add, history_specs, strict_channel_priority
                 )
-            bad_deps = self.build_conflict_map(specs, specs_to_add, history_specs)
+                if chains
+                else {}
+            )
+            if not any(bad_deps.values()):
+                if not context.json:
+                    print(
+                        "\nFound conflicts! Looking for incompatible packages.\n"
+                        "This can take several minutes.  Press CTRL-C to abort."
+                    )
+                bad_deps = self.build_conflict_map(specs, specs_to_add, history_specs)
         else:
             bad_deps = {}
-        strict_channel_priority = context.channel_priority == ChannelPriority.STRICT
         raise UnsatisfiableError(bad_deps, strict=strict_channel_priority)
 
+    def quick_conflicts(self, specs):
+        """
+        Look for a conflict among ``specs`` by unit propagation over package
+        names, without solving.
+
+        A spec requires its name. If every candidate left for a required name
+        depends on another name, that name is required too, and restricted to
+        what those dependencies match; if they all constrain it, it is only
+        restricted. Candidates with a dependency that matches nothing allowed
+        are dropped. A required name without candidates, e.g. a missing
+        package, disjoint version ranges, or a virtual package the system
+        doesn't provide, makes ``specs`` unsatisfiable.
+
+        This catches the common conflicts, but not all of them: None means
+        none was found. Otherwise, return the dependency chains that explain
+        the conflict, starting from a subset of ``specs`` that can't be made
+        any smaller.
+        """
+        specs = [MatchSpec(spec) for spec in specs]
+        found = self._propagate_conflict(specs)
+        if found is None:
+            return None
+        chains, roots = found
+        roots = [spec for spec in specs if spec in roots]
+        for spec in tuple(roots):
+            if len(roots) > 1:
+                smaller = self._propagate_conflict([s for s in roots if s != spec])
+                if smaller is not None:
+                    chains, smaller_roots = smaller
+                    roots = [s for s in roots if s in smaller_roots]
+        # a chain that only leads into a longer one explains nothing more
+        chains = [
+            chain
+            for chain in chains
+            if not any(
+                len(other) > len(chain) and other[: len(chain)] == chain
+                for other in chains
+            )
+        ]
+        # and what the system provides in place of a virtual package
+        virtual_names = {chain[-1].name for chain in chains}
+        chains.extend(
+            (prec.to_match_spec(),)
+            for prec in self._system_precs
+            if prec.name in virtual_names
+        )
+        explained = {chain[0] for chain in chains}
+        return [*chains, *((spec,) for spec in roots if spec not in explained)]
+
+    def _propagate_conflict(self, specs):
+        """
+        Unit propagation for ``quick_conflicts()``. Return the chains that
+        restricted the name left without candidates and the specs they start
+        from, or None.
+        """
+        allowed = {}  # dict[package_name, set[PackageRecord]]
+        required = {}  # dict[package_name, chain]
+        chains = defaultdict(list)  # dict[package_name, list[chain]]
+        roots = defaultdict(frozenset)  # dict[package_name, frozenset[MatchSpec]]
+        dependents = defaultdict(set)  # dict[package_name, set[package_name]]
+        pending = deque()
+
+        def restrict(name, matches, chain, chain_roots, require):
+            candidates = allowed.get(name)
+            if candidates is None:
+                candidates = allowed[name] = set(self.groups.get(name, ()))
+            changed = not candidates.issubset(matches)
+            if changed:
+                candidates.intersection_update(matches)
+            if require and name not in required:
+                required[name] = chain
+                changed = True
+            if changed:
+                chains[name].append(chain)
+                roots[name] |= chain_roots
+                if name in required:
+                    pending.append(name)
+                pending.extend(dependents[name])
+
+        for spec in specs:
+            if spec.name != "*":
+                restrict(
+                    spec.name,
+                    self.find_matches(spec),
+                    (spec,),
+                    frozenset((spec,)),
+                    not spec.optional,
+                )
+
+        while pending:
+            name = pending.popleft()
+            candidates = allowed[name]
+            viable = []
+            blockers = defaultdict(set)  # dict[package_name, set[MatchSpec]]
+            for prec in candidates:
+                for ms in self.ms_depends(prec):
+                    if ms.optional or ms.name == "*":
+                        continue
+                    dep_candidates = allowed.get(ms.name)
+                    matches = self.find_matches(ms)
+                    if not (
+                        matches
+                        if dep_candidates is None
+                        else dep_candidates.intersection(matches)
+                    ):
+                        blockers[ms.name].add(ms)
+                        break
+                else:
+                    viable.append(prec)
+            if blockers:
+                candidates.intersection_update(viable)
+                for blocker, blocker_specs in blockers.items():
+                    chains[name].append(
+                        (*required[name], self._union_spec(blocker, blocker_specs))
+                    )
+                    chains[name].extend(chains[blocker])
+                    roots[name] |= roots[blocker]
+            if not candidates:
+                return list(dict.fromkeys(chains[name])), roots[name]
+
+            dep_specs = defaultdict(set)  # dict[package_name, set[MatchSpec]]
+            num_specs = defaultdict(int)
+            num_required = defaultdict(int)
+            for prec in candidates:
+                # at most one merged spec per name
+                for ms in self.ms_depends(prec):
+                    if ms.name != "*":
+                        dep_specs[ms.name].add(ms)
+                        num_specs[ms.name] += 1
+                        num_required[ms.name] += not ms.optional
+            for dep_name, specs_for_dep in dep_specs.items():
+                dependents[dep_name].add(name)
+                if num_specs[dep_name] < len(candidates):
+                    continue
+                restrict(
+                    dep_name,
+                    set().union(*map(self.find_matches, specs_for_dep)),
+                    (*required[name], self._union_spec(dep_name, specs_for_dep)),
+                    roots[name],
+                    num_required[dep_name] == len(candidates),
+                )
+        return None
+
+    @staticmethod
+    def _union_spec(name, specs):
+        """One spec standing for ``specs`` of ``name`` in a dependency chain."""
+        specs = {MatchSpec(spec, optional=False) for spec in specs}
+        if len(specs) > 1:
+            try:
+                (union,) = MatchSpec.union(specs)
+            except ValueError:
+                return MatchSpec(name)
+            return union
+        return specs.pop()
+
     def breadth_first_search_for_dep_graph(
         self, root_spec, target_name, dep_graph, num_targets=1
     ):
@@ -684,6 +879,17 @@ class Resolve:
             prec: False if val else "feature not enabled"
             for prec, val in self.default_filter(features).items()
         }
+        # A package pruned for some of these specs can't be in a solution for
+        # all of them either. Start from what earlier requests with the same
+        # features pruned; everything they kept is checked again.
+        pruned_by_specs = self._pruned_cache.setdefault(
+            (strict_channel_priority, frozenset(features)), {}
+        )
+        spec_set = frozenset(explicit_specs)
+        for specs in [specs for specs in pruned_by_specs if specs <= spec_set]:
+            # most recently used last
+            pruned = pruned_by_specs[specs] = pruned_by_specs.pop(specs)
+            filter_out.update(pruned)
         snames = set()
         top_level_spec = None
         cp_filter_applied = set()  # values are package names
@@ -723,7 +929,7 @@ class Resolve:
             for prec in group:
                 if not filter_out.setdefault(prec, False):
                     nold += 1
-                    if (not self.match_any(_specs, prec)) or (
+                    if not self.match_any(_specs, prec) or (
                         explicit_spec_package_pool.get(name)
                         and prec not in explicit_spec_package_pool[name]
                     ):
@@ -804,6 +1010,14 @@ class Resolve:
                     slist.append(s)
                 else:
                     pruned_to_zero.add(s)
+        # this result covers those it started from
+        for specs in [specs for specs in pruned_by_specs if specs <= spec_set]:
+            del pruned_by_specs[specs]
+        pruned_by_specs[spec_set] = {
+            prec: reason for prec, reason in filter_out.items() if reason
+        }
+        while len(pruned_by_specs) > PRUNED_CACHE_SIZE:
+            del pruned_by_specs[next(iter(pruned_by_specs))]
 
         if pruned_to_zero and exit_on_conflict:
             return {}
@@ -912,6 +1126,12 @@ class Resolve:
         spec_name = spec.get_exact_value("name")
         if spec_name:
             candidate_precs = self.groups.get(spec_name, ())
+            if len(candidate_precs) >= MIN_TABLE_SIZE:
+                table = self._match_tables.get(spec_name)
+                if table is None:
+                    table = self._match_tables[spec_name] = MatchTable(candidate_precs)
+                res = self._cached_find_matches[spec] = table.match(spec)
+                return res
         elif spec.get_exact_value("track_features"):
             feature_names = spec.get_exact_value("track_features")
             candidate_precs = itertools.chain.from_iterable(
@@ -938,7 +1158,8 @@ class Resolve:
             channel.name, 1
         )  # TODO: ask @mcg1969 why the default value is 1 here  # NOQA
         valid = 1 if channel_priority < MAX_CHANNEL_PRIORITY else 0
-        version_comparator = VersionOrder(prec.get("version", ""))
+        # compares like VersionOrder, without calling back into Python
+        version_comparator = VersionOrder(prec.get("version", "")).sort_key
         build_number = prec.get("build_number", 0)
         build_string = prec.get("build")
         noarch = -int(prec.subdir == "noarch")
@@ -1064,6 +1285,31 @@ class Resolve:
             )
         return C
 
+    def base_clauses(self, index):
+        """
+        Return a ``Resolve`` for ``index`` and its ``gen_clauses()``.
+
+        Retried solves, e.g. with a frozen and then an unfrozen environment,
+        and the conflict check before a solve often reduce to the same index.
+        The generated clauses are kept and restored to their ``gen_clauses()``
+        state for each caller, who only adds its own spec constraints and
+        objectives on top.
+        """
+        key = frozenset(index)
+        try:
+            r2, C, saved_state = self._base_clauses_cache[key]
+        except KeyError:
+            r2 = Resolve(index, True, channels=self.channels)
+            C = r2.gen_clauses()
+            saved_state = C.save_state()
+            if len(self._base_clauses_cache) >= BASE_CLAUSES_CACHE_SIZE:
+                # drop the oldest
+                del self._base_clauses_cache[next(iter(self._base_clauses_cache))]
+            self._base_clauses_cache[key] = r2, C, saved_state
+        else:
+            C.restore_state(saved_state)
+        return r2, C
+
     def generate_spec_constraints(self, C, specs):
         result = [(self.push_MatchSpec(C, ms),) for ms in specs]
         if log.isEnabledFor(DEBUG):
@@ -1239,8 +1485,7 @@ class Resolve:
         for prec in installed:
             sat_name_map[self.to_sat_name(prec)] = prec
             specs.append(MatchSpec(f"{prec.name} {prec.version} {prec.build}"))
-        r2 = Resolve({prec: prec for prec in installed}, True, channels=self.channels)
-        C = r2.gen_clauses()
+        r2, C = self.base_clauses({prec: prec for prec in installed})
         constraints = r2.generate_spec_constraints(C, specs)
         solution = C.sat(constraints)
         return bool(solution)
@@ -1258,17 +1503,20 @@ class Resolve:
             return C.sat(constraints, add_if)
 
         if reduced_index:
-            r2 = Resolve(reduced_index, True, channels=self.channels)
-            C = r2.gen_clauses()
+            r2, C = self.base_clauses(reduced_index)
             solution = mysat(all_specs, True)
         else:
             solution = None
 
         if solution:
             final_unsat_specs = ()
+        elif context.unsatisfiable_hints and (
+            # much cheaper than the unsatisfiable core below, when it finds one
+            chains := self.quick_conflicts(all_specs)
+        ):
+            final_unsat_specs = tuple(dict.fromkeys(chain[0] for chain in chains))
         elif context.unsatisfiable_hints:
-            r2 = Resolve(self.index, True, channels=self.channels)
-            C = r2.gen_clauses()
+            r2, C = self.base_clauses(self.index)
             # This first result is just a single unsatisfiable core. There may be several.
             final_unsat_specs = tuple(
                 minimal_unsatisfiable_subset(
@@ -1503,8 +1751,12 @@ class Resolve:
                 return True
             return False
 
-        r2 = Resolve(reduced_index, True, channels=self.channels)
-        C = r2.gen_clauses()
+        r2, C = self.base_clauses(reduced_index)
+        C.portfolio = (
+            _get_sat_portfolio(context.sat_portfolio_processes)
+            if context.sat_portfolio_processes
+            else None
+        )
         solution = mysat(specs, True)
         if not solution:
             if should_retry_solve:
@@ -1541,13 +1793,16 @@ class Resolve:
             solution, obj7 = C.minimize(eq_optional_c, solution)
             log.debug("Package removal metric: %d", obj7)
 
+        def encoding(metric):
+            return context.sat_objective_encodings.get(metric, BDDEncoding)
+
         # Requested packages: maximize versions
         log.debug("Solve: maximize versions of requested packages")
         eq_req_c, eq_req_v, eq_req_b, eq_req_a, eq_req_t = r2.generate_version_metrics(
             C, specr
         )
-        solution, obj3a = C.minimize(eq_req_c, solution)
-        solution, obj3 = C.minimize(eq_req_v, solution)
+        solution, obj3a = C.minimize(eq_req_c, solution, encoding=encoding("channel"))
+        solution, obj3 = C.minimize(eq_req_v, solution, encoding=encoding("version"))
         log.debug("Initial package channel/version metric: %d/%d", obj3a, obj3)
 
         # Track features: minimize feature count
@@ -1569,12 +1824,12 @@ class Resolve:
 
         # Requested packages: maximize builds
         log.debug("Solve: maximize build numbers of requested packages")
-        solution, obj4 = C.minimize(eq_req_b, solution)
+        solution, obj4 = C.minimize(eq_req_b, solution, encoding=encoding("build"))
         log.debug("Initial package build metric: %d", obj4)
 
         # prefer arch packages where available for requested specs
         log.debug("Solve: prefer arch over noarch for requested packages")
-        solution, noarch_obj = C.minimize(eq_req_a, solution)
+        solution, noarch_obj = C.minimize(eq_req_a, solution, encoding=encoding("arch"))
         log.debug("Noarch metric: %d", noarch_obj)
 
         # Optional installations: minimize count
@@ -1596,10 +1851,10 @@ class Resolve:
             "Prefer arch over noarch where equivalent."
         )
         eq_c, eq_v, eq_b, eq_a, eq_t = r2.generate_version_metrics(C, speca)
-        solution, obj5a = C.minimize(eq_c, solution)
-        solution, obj5 = C.minimize(eq_v, solution)
-        solution, obj6 = C.minimize(eq_b, solution)
-        solution, obj6a = C.minimize(eq_a, solution)
+        solution, obj5a = C.minimize(eq_c, solution, encoding=encoding("channel"))
+        solution, obj5 = C.minimize(eq_v, solution, encoding=encoding("version"))
+        solution, obj6 = C.minimize(eq_b, solution, encoding=encoding("build"))
+        solution, obj6a = C.minimize(eq_a, solution, encoding=encoding("arch"))
         log.debug(
             "Additional package channel/version/build/noarch metrics: %d/%d/%d/%d",
             obj5a,
@@ -1617,7 +1872,7 @@ class Resolve:
         if not is_converged(solution):
             # Maximize timestamps
             eq_t.update(eq_req_t)
-            solution, obj6t = C.minimize(eq_t, solution)
+            solution, obj6t = C.minimize(eq_t, solution, encoding=encoding("timestamp"))
             log.debug("Timestamp metric: %d", obj6t)
 
         log.debug("Looking for alternate solutions")
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import json
+import os
 from datetime import datetime
+from hashlib import sha256
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -13,8 +15,10 @@ from conda.base.constants import (
     CONDA_LOGS_DIR,
     CONDA_PACKAGE_EXTENSIONS,
     CONDA_TEMP_EXTENSIONS,
+    SOLVE_CACHE_DIR,
 )
-from conda.cli.main_clean import _get_size
+from conda.cli.main_clean import _get_size, find_pkgs, rm_pkgs, rm_stored_files
+from conda.core.file_store import FileStore
 from conda.core.subdir_data import create_cache_dir
 from conda.gateways.logging import set_verbosity
 
@@ -184,6 +188,26 @@ def test_clean_index_cache(
     assert not _get_index_cache()
 
 
+# conda clean --solve-cache
+def test_clean_solve_cache(
+    clear_cache,
+    conda_cli: CondaCLIFixture,
+    tmp_pkgs_dir: Path,
+):
+    solve_cache = Path(tmp_pkgs_dir, "cache", SOLVE_CACHE_DIR)
+    solve_cache.mkdir(parents=True)
+    (solve_cache / "0123abcd.json").write_text("{}")
+    repodata = Path(tmp_pkgs_dir, "cache", "abcd0123.json")
+    repodata.write_text("{}")
+
+    stdout, _, _ = conda_cli("clean", "--solve-cache", "--yes", "--json")
+    assert json.loads(stdout)["solve_cache"]["files"] == [str(solve_cache)]
+
+    # solutions removed, index cache kept
+    assert not solve_cache.exists()
+    assert repodata.exists()
+
+
 # conda clean --tempfiles
 def test_clean_tempfiles(
     clear_cache,
@@ -395,3 +419,36 @@ def test_get_size_list():
     with pytest.raises(NotImplementedError):
         _get_size("not-a-file", warnings=warnings)
     assert warnings
+
+
+def test_find_pkgs_file_store(tmp_path: Path, mocker: MockerFixture):
+    pkgs_dir = tmp_path / "pkgs"
+    store = FileStore(str(pkgs_dir))
+    for name in ("a-1-0", "a-1-1"):
+        files = {"lib/shared": b"shared", f"lib/{name}": name.encode()}
+        for path, data in files.items():
+            (pkgs_dir / name / path).parent.mkdir(parents=True, exist_ok=True)
+            (pkgs_dir / name / path).write_bytes(data)
+        paths = [
+            {"_path": path, "path_type": "hardlink", "sha256": sha256(data).hexdigest()}
+            for path, data in files.items()
+        ]
+        (pkgs_dir / name / "info").mkdir()
+        (pkgs_dir / name / "info" / "paths.json").write_text(
+            json.dumps({"paths_version": 1, "paths": paths})
+        )
+        store.add_package(str(pkgs_dir / name))
+    # a-1-0 is linked into an environment
+    (tmp_path / "env").mkdir()
+    os.link(pkgs_dir / "a-1-0" / "lib" / "a-1-0", tmp_path / "env" / "a-1-0")
+
+    mocker.patch("conda.cli.main_clean.find_pkgs_dirs", return_value=[str(pkgs_dir)])
+    pkgs = find_pkgs()
+    assert pkgs["pkgs_dirs"] == {str(pkgs_dir): ("a-1-1",)}
+
+    mocker.patch("conda.cli.common.confirm_yn")
+    rm_pkgs(**pkgs, quiet=True, verbose=False, dry_run=False, name="package(s)")
+    rm_stored_files(quiet=True, verbose=False, dry_run=False)
+    assert sorted(Path(entry.path).name[:64] for entry in store.entries()) == sorted(
+        sha256(data).hexdigest() for data in (b"shared", b"a-1-0")
+    )
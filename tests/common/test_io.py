@@ -4,7 +4,12 @@ import sys
 from io import StringIO
 from logging import DEBUG, NOTSET, WARN, getLogger
 
-from conda.common.io import CaptureTarget, attach_stderr_handler, captured
+from conda.common.io import (
+    CaptureTarget,
+    attach_stderr_handler,
+    captured,
+    spawn_context,
+)
 
 
 def test_captured():
@@ -80,3 +85,7 @@ def test_attach_stderr_handler():
     assert c.stdout == ""
     assert "test message" in c.stderr
     assert debug_message in c.stderr
+
+
+def test_spawn_context():
+    assert spawn_context().get_start_method() == "spawn"
@@ -0,0 +1,63 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conda.common.lru import LRUCache, caches
+from conda.models.match_spec import MatchSpec
+from conda.models.version import VersionOrder
+
+
+def test_lru_cache():
+    cache = LRUCache("test_lru_cache", maxsize=2)
+    assert caches["test_lru_cache"] is cache
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+    # "b" is now the least recently used
+    cache["c"] = 3
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert cache["a"] == 1
+    assert cache["c"] == 3
+    with pytest.raises(KeyError):
+        cache["b"]
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_interned(monkeypatch):
+    monkeypatch.setattr(VersionOrder._cache_, "maxsize", 2)
+    VersionOrder._cache_.clear()
+    for version in ("1.0", "1.1", "1.2", "1.3"):
+        VersionOrder(version)
+    assert len(VersionOrder._cache_) == 2
+    assert VersionOrder("1.3") is VersionOrder("1.3")
+    assert VersionOrder._cache_.hits == 2
+
+    parsed = caches["MatchSpec._parse_spec_str"]
+    MatchSpec("numpy >=1.7,<2")
+    hits = parsed.hits
+    assert MatchSpec("numpy >=1.7,<2", optional=True).optional
+    assert not MatchSpec("numpy >=1.7,<2").optional
+    assert parsed.hits == hits + 2
+
+
+def test_lru_cache_threads():
+    cache = LRUCache("test_lru_cache_threads", maxsize=8)
+
+    def churn(offset):
+        for i in range(2000):
+            key = (offset + i) % 16
+            if cache.get(key) is None:
+                cache[key] = key
+            assert cache.get(key, key) == key
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(churn, range(4)))
+    assert len(cache) <= 8
@@ -0,0 +1,95 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from conda.core.file_store import FileStore
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def make_package(pkgs_dir: Path, name: str, files: dict[str, bytes]) -> Path:
+    package = pkgs_dir / name
+    paths = []
+    for path, data in files.items():
+        (package / path).parent.mkdir(parents=True, exist_ok=True)
+        (package / path).write_bytes(data)
+        paths.append(
+            {
+                "_path": path,
+                "path_type": "hardlink",
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "size_in_bytes": len(data),
+            }
+        )
+    (package / "info").mkdir(parents=True, exist_ok=True)
+    (package / "info" / "paths.json").write_text(
+        json.dumps({"paths_version": 1, "paths": paths})
+    )
+    return package
+
+
+def inode(path: Path) -> int:
+    return path.stat().st_ino
+
+
+def test_add_package(tmp_path: Path):
+    store = FileStore(str(tmp_path))
+    files = {"lib/shared.so": b"shared", "lib/a.py": b"import b"}
+    first = make_package(tmp_path, "a-1-0", {**files, "lib/first": b"first"})
+    second = make_package(tmp_path, "a-1-1", {**files, "lib/second": b"second"})
+
+    assert store.add_package(str(first)) == 0
+    assert store.add_package(str(second)) == 1
+
+    assert inode(first / "lib/shared.so") == inode(second / "lib/shared.so")
+    assert (second / "lib/shared.so").read_bytes() == b"shared"
+    assert (first / "lib/shared.so").stat().st_nlink == 3
+    # python sources keep their own files
+    assert inode(first / "lib/a.py") != inode(second / "lib/a.py")
+    assert len(list(store.entries())) == 3
+
+
+@pytest.mark.skipif(os.name == "nt", reason="no executable bit on Windows")
+def test_add_package_mode(tmp_path: Path):
+    store = FileStore(str(tmp_path))
+    first = make_package(tmp_path, "a-1-0", {"bin/tool": b"tool"})
+    second = make_package(tmp_path, "a-1-1", {"bin/tool": b"tool"})
+    (second / "bin/tool").chmod(0o755)
+
+    store.add_package(str(first))
+    assert store.add_package(str(second)) == 0
+    assert inode(first / "bin/tool") != inode(second / "bin/tool")
+
+
+def test_add_package_checksum_mismatch(tmp_path: Path):
+    store = FileStore(str(tmp_path))
+    package = make_package(tmp_path, "a-1-0", {"lib/file": b"file"})
+    (package / "lib/file").write_bytes(b"changed")
+
+    store.add_package(str(package))
+    assert not list(store.entries())
+
+
+def test_prune(tmp_path: Path):
+    store = FileStore(str(tmp_path))
+    first = make_package(tmp_path, "a-1-0", {"lib/shared": b"shared", "lib/a": b"a"})
+    second = make_package(tmp_path, "a-1-1", {"lib/shared": b"shared"})
+    store.add_package(str(first))
+    store.add_package(str(second))
+
+    assert store.prune() == []
+    for path in first.rglob("*"):
+        if path.is_file():
+            path.unlink()
+    removed = store.prune()
+    assert len(removed) == 1
+    assert (second / "lib/shared").read_bytes() == b"shared"
+    assert len(list(store.entries())) == 1
@@ -0,0 +1,230 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import socket
+import tempfile
+import threading
+from os.path import join
+
+import pytest
+
+from conda.base.context import conda_tests_ctxt_mgmt_def_pol, context
+from conda.common.compat import on_win
+from conda.common.io import env_var
+from conda.core.index_server import IndexServer, IndexService
+from conda.core.subdir_data import SubdirData
+from conda.exports import url_path
+from conda.gateways.repodata.daemon import (
+    IndexServerError,
+    IndexServerInterface,
+    UnixSocketIndexInterface,
+    client_settings,
+    decode_response,
+    encode_message,
+)
+from conda.models.channel import Channel
+from conda.testing.helpers import TEST_DATA_DIR
+
+CHANNEL = url_path(join(TEST_DATA_DIR, "conda_format_repo"))
+SUBDIRS = ("linux-64", "noarch")
+
+
+class LocalIndexInterface(IndexServerInterface):
+    """Stand-in that answers from an in-process ``IndexService``."""
+
+    service = IndexService()
+    requests = []
+
+    def request(self, method, params):
+        self.requests.append(method)
+        return decode_response(
+            self.service.respond(encode_message({"method": method, "params": params}))
+        )
+
+
+def fns(records):
+    return sorted(record.fn for record in records)
+
+
+@pytest.fixture
+def in_process():
+    """Expected results, loaded without an index server."""
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    expected = fns(SubdirData.query_all("libgcc-ng", [CHANNEL], SUBDIRS))
+    assert expected
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    yield expected
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+def test_local_index_interface(in_process, tmp_path, monkeypatch):
+    subdir_data = SubdirData(Channel(f"{CHANNEL}/linux-64"))
+    expected_query = fns(subdir_data.query("libgcc-ng"))
+    expected_records = fns(subdir_data.iter_records())
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+    monkeypatch.setattr(SubdirData, "IndexInterface", LocalIndexInterface)
+    monkeypatch.setattr(LocalIndexInterface, "service", IndexService())
+    monkeypatch.setattr(LocalIndexInterface, "requests", [])
+    with env_var(
+        "CONDA_REPODATA_INDEX_SOCKET",
+        str(tmp_path / "index.sock"),
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert fns(SubdirData.query_all("libgcc-ng", [CHANNEL], SUBDIRS)) == in_process
+        client = SubdirData(Channel(f"{CHANNEL}/linux-64"))
+        assert fns(client.query("libgcc-ng")) == expected_query
+        assert fns(client.iter_records()) == expected_records
+        assert LocalIndexInterface.requests == ["query_all", "query", "iter_records"]
+        # everything was answered by the server
+        assert not client._loaded
+        assert LocalIndexInterface.service._subdir_datas
+
+
+def test_index_server_client_settings(in_process, tmp_path, monkeypatch):
+    """The server loads repodata with each client's settings, not its own."""
+    service = IndexService()
+    monkeypatch.setattr(SubdirData, "IndexInterface", LocalIndexInterface)
+    monkeypatch.setattr(LocalIndexInterface, "service", service)
+    monkeypatch.setattr(LocalIndexInterface, "requests", [])
+    url = f"{CHANNEL}/linux-64"
+
+    def client_query():
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        return fns(SubdirData(Channel(url)).query("zlib"))
+
+    with env_var(
+        "CONDA_REPODATA_INDEX_SOCKET",
+        str(tmp_path / "index.sock"),
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert client_query() == ["zlib-1.2.11-h7b6447c_3.conda"]
+        with env_var(
+            "CONDA_USE_ONLY_TAR_BZ2",
+            "true",
+            stack_callback=conda_tests_ctxt_mgmt_def_pol,
+        ):
+            assert client_query() == ["zlib-1.2.11-h7b6447c_3.tar.bz2"]
+        assert client_query() == ["zlib-1.2.11-h7b6447c_3.conda"]
+    assert LocalIndexInterface.requests == ["query"] * 3
+    assert len(service._subdir_datas) == 2
+    # the server's own settings are back in place
+    assert not context.use_only_tar_bz2
+
+
+def test_index_server_query_locked(in_process, monkeypatch):
+    """Queries finish before another connection can reload the subdir."""
+    service = IndexService()
+    query = SubdirData.query
+    locked = []
+
+    def locked_query(self, spec):
+        locked.append(any(lock.locked() for lock in service._locks.values()))
+        yield from query(self, spec)
+
+    monkeypatch.setattr(SubdirData, "query", locked_query)
+    records = service.dispatch(
+        "query", {"url": f"{CHANNEL}/linux-64", "spec": "libgcc-ng"}
+    )
+    assert isinstance(records, list)
+    assert fns(records) == in_process
+    assert locked == [True]
+
+
+@pytest.mark.skipif(on_win, reason="Unix sockets only")
+def test_unix_socket_index_server(in_process):
+    # Unix socket paths are limited to ~100 characters
+    with tempfile.TemporaryDirectory() as tmp:
+        address = join(tmp, "index.sock")
+        server = IndexServer(address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            interface = UnixSocketIndexInterface(address)
+            assert interface.available()
+            records = list(
+                interface.query_all("libgcc-ng", [f"{CHANNEL}/linux-64"], "")
+            )
+            assert records
+            assert all(record["name"] == "libgcc-ng" for record in records)
+
+            with env_var(
+                "CONDA_REPODATA_INDEX_SOCKET",
+                address,
+                stack_callback=conda_tests_ctxt_mgmt_def_pol,
+            ):
+                assert fns(SubdirData.query_all("libgcc-ng", [CHANNEL], SUBDIRS)) == (
+                    in_process
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_index_server_error():
+    service = IndexService()
+    response = service.respond(encode_message({"method": "nope", "params": {}}))
+    with pytest.raises(IndexServerError, match="Unknown index server method"):
+        decode_response(response)
+
+
+def test_index_server_truncated(in_process, tmp_path, monkeypatch):
+    records = [{"name": "a"}, {"name": "b"}]
+    lines = [encode_message({"ok": True, "count": 2}), *map(encode_message, records)]
+    assert decode_response(lines) == records
+    # the server died after a complete line
+    with pytest.raises(IndexServerError, match="1 of 2"):
+        decode_response(lines[:2])
+    # or in the middle of one
+    with pytest.raises(IndexServerError, match="truncated"):
+        decode_response([*lines[:2], lines[2][:5]])
+
+    class TruncatingInterface(LocalIndexInterface):
+        def request(self, method, params):
+            raise IndexServerError("truncated response from index server")
+
+    # the client loads in-process instead
+    monkeypatch.setattr(SubdirData, "IndexInterface", TruncatingInterface)
+    with env_var(
+        "CONDA_REPODATA_INDEX_SOCKET",
+        str(tmp_path / "index.sock"),
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert fns(SubdirData.query_all("libgcc-ng", [CHANNEL], SUBDIRS)) == in_process
+
+
+def test_index_server_client_context():
+    service = IndexService()
+    own = client_settings()
+    other = {**own, "use_only_tar_bz2": not own["use_only_tar_bz2"]}
+    # loads with the server's own settings don't wait for each other
+    with service.client_context(own), service.client_context(own):
+        assert context.use_only_tar_bz2 == own["use_only_tar_bz2"]
+    with service.client_context(other):
+        assert context.use_only_tar_bz2 == other["use_only_tar_bz2"]
+    assert context.use_only_tar_bz2 == own["use_only_tar_bz2"]
+
+
+@pytest.mark.skipif(on_win, reason="Unix sockets only")
+def test_index_server_absent(in_process, tmp_path, mocker):
+    address = str(tmp_path / "index.sock")
+    request = mocker.spy(UnixSocketIndexInterface, "request")
+    with env_var(
+        "CONDA_REPODATA_INDEX_SOCKET",
+        address,
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert fns(SubdirData.query_all("libgcc-ng", [CHANNEL], SUBDIRS)) == in_process
+        assert not request.called
+
+        # a socket file with no server behind it
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(address)
+        except OSError:
+            pytest.skip("Unix socket path too long")
+        sock.close()
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        assert fns(SubdirData.query_all("libgcc-ng", [CHANNEL], SUBDIRS)) == in_process
+        assert request.called
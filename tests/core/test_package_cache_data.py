@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: BSD-3-Clause
 import datetime
 import json
+import os
+import time
 from os.path import abspath, basename, dirname, join
 from pathlib import Path
 
@@ -16,18 +18,24 @@ from conda.common.compat import on_win
 from conda.core import package_cache_data
 from conda.core.index import get_index
 from conda.core.package_cache_data import (
+    ExtractProcessPool,
     PackageCacheData,
+    PackageCacheIndex,
     PackageCacheRecord,
     PackageRecord,
     ProgressiveFetchExtract,
+    do_cache_action,
+    do_extract_action,
 )
-from conda.core.path_actions import CacheUrlAction
+from conda.core.path_actions import CacheUrlAction, ExtractPackageAction
 from conda.exports import MatchSpec, url_path
 from conda.gateways.disk.create import copy
 from conda.gateways.disk.permissions import make_read_only
 from conda.gateways.disk.read import isfile, listdir, yield_lines
 from conda.testing.helpers import CHANNEL_DIR_V1
 
+from .. import http_test_server
+
 assert CHANNEL_DIR_V1 == abspath(
     join(dirname(__file__), "..", "data", "conda_format_repo")
 )
@@ -544,6 +552,196 @@ def test_cover_extract_bad_package(tmp_path):
     PackageCacheData.first_writable()._make_single_record(str(fullpath))
 
 
+@pytest.mark.skipif(on_win, reason="not supported on Windows")
+def test_extract_while_downloading(tmp_path: Path, mocker):
+    import conda_package_handling.api
+
+    source = tmp_path / "source"
+    (source / "info").mkdir(parents=True)
+    (source / "info" / "index.json").write_text(
+        json.dumps({"name": "a", "version": "1", "build": "0", "build_number": 0})
+    )
+    (source / "lib").mkdir()
+    (source / "lib" / "a.txt").write_text("a")
+    conda_package_handling.api.create(
+        str(source), ["info/index.json", "lib/a.txt"], "a-1-0.conda", str(tmp_path)
+    )
+
+    url = "https://repo.example.com/noarch/a-1-0.conda"
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    cache_action = CacheUrlAction(url, str(pkgs_dir), "a-1-0.conda")
+    extract_action = ExtractPackageAction(
+        cache_action.target_full_path,
+        str(pkgs_dir),
+        "a-1-0",
+        MatchSpec(url=url),
+        None,
+        None,
+        None,
+    )
+
+    def download(*args, **kwargs):
+        partial = Path(cache_action.target_full_path + ".partial")
+        with partial.open("ab") as fh:
+            for byte in (tmp_path / "a-1-0.conda").read_bytes():
+                fh.write(bytes((byte,)))
+        partial.rename(cache_action.target_full_path)
+        return {}
+
+    mocker.patch("conda.core.path_actions.download", side_effect=download)
+    mocker.patch(
+        "conda.base.context.Context.extract_while_downloading",
+        new_callable=mocker.PropertyMock,
+        return_value=True,
+    )
+    extract_tarball = mocker.patch("conda.core.path_actions.extract_tarball")
+
+    do_cache_action(
+        url,
+        cache_action,
+        mocker.MagicMock(),
+        cancelled=lambda: False,
+        extract_action=extract_action,
+    )
+    assert extract_action.streamed
+    do_extract_action(url, extract_action, mocker.MagicMock())
+
+    assert not extract_tarball.called
+    assert (pkgs_dir / "a-1-0" / "lib" / "a.txt").read_text() == "a"
+    assert (pkgs_dir / "a-1-0" / "info" / "repodata_record.json").exists()
+    assert not Path(extract_action.stream_path).exists()
+
+
+@pytest.mark.parametrize("fetch_threads", [1, 4])
+def test_adaptive_fetch(tmp_pkgs_dir: Path, mocker, fetch_threads):
+    mocker.patch(
+        "conda.base.context.Context.adaptive_fetch",
+        new_callable=mocker.PropertyMock,
+        return_value=True,
+    )
+    mocker.patch(
+        "conda.base.context.Context.fetch_threads",
+        new_callable=mocker.PropertyMock,
+        return_value=fetch_threads,
+    )
+    mocker.patch("conda.gateways.connection.download.SEGMENT_SIZE", 50_000)
+    scheduler = mocker.spy(package_cache_data.HostScheduler, "submit")
+
+    http = http_test_server.run_test_server(CHANNEL_DIR_V1, accept_ranges=True)
+    try:
+        host, port = http.socket.getsockname()[:2]
+        url = f"http://{host}:{port}/{subdir}/{zlib_tar_bz2_fn}"
+        prec = PackageRecord.from_objects(zlib_tar_bz2_prec, url=url)
+        ProgressiveFetchExtract((prec,)).execute()
+    finally:
+        http.shutdown()
+
+    assert scheduler.call_count == 1
+    assert scheduler.call_args.kwargs["connections"] == 2
+    if fetch_threads > 1:
+        # 131285 bytes in two ranges
+        assert sorted(http.ranges) == [(0, 65641), (65642, 131284)]
+    else:
+        # the host limit leaves one connection
+        assert http.ranges == []
+    assert (tmp_pkgs_dir / zlib_tar_bz2_fn).stat().st_size == zlib_tar_bz2_prec.size
+    assert (tmp_pkgs_dir / zlib_base_fn / "info" / "repodata_record.json").exists()
+
+
+def test_extract_process_pool(tmp_path: Path):
+    source = join(CHANNEL_DIR_V1, subdir, zlib_tar_bz2_fn)
+    extract_action = ExtractPackageAction(
+        source, str(tmp_path), zlib_base_fn, zlib_tar_bz2_prec, None, None, None
+    )
+    progress = []
+    with ExtractProcessPool(1) as extract_pool:
+        extract_pool.extract(extract_action, progress.append)
+
+    assert progress[-1] == 1
+    assert (Path(extract_action.stream_path) / "info" / "index.json").exists()
+
+
+def test_extract_processes(tmp_pkgs_dir: Path, mocker):
+    mocker.patch(
+        "conda.base.context.Context.extract_processes",
+        new_callable=mocker.PropertyMock,
+        return_value=1,
+    )
+    mocker.patch.object(package_cache_data, "EXTRACT_PROCESS_MIN_SIZE", 100_000)
+    extract = mocker.spy(ExtractProcessPool, "extract")
+
+    ProgressiveFetchExtract((zlib_tar_bz2_prec,)).execute()
+
+    assert extract.call_count == 1
+    extracted = tmp_pkgs_dir / zlib_base_fn
+    assert (extracted / "info" / "repodata_record.json").exists()
+    assert not list(tmp_pkgs_dir.glob("*.stream*"))
+
+
 def test_conda_build_alias():
     """conda-build wants to use an old import."""
     assert conda.core.package_cache.ProgressiveFetchExtract
+
+
+def test_package_cache_index(tmp_path: Path, mocker):
+    mocker.patch(
+        "conda.base.context.Context.package_cache_index",
+        new_callable=mocker.PropertyMock,
+        return_value=True,
+    )
+    pkgs_dir = tmp_path / "pkgs"
+
+    def add_package(name):
+        info = pkgs_dir / f"{name}-1-0" / "info"
+        info.mkdir(parents=True)
+        record = {"name": name, "version": "1", "build": "0", "build_number": 0}
+        (info / "index.json").write_text(json.dumps(record))
+        (info / "repodata_record.json").write_text(
+            json.dumps({**record, "channel": "defaults", "subdir": "noarch"})
+        )
+
+    # the index only trusts modification times that are not too recent
+    settled_ns = time.time_ns() - 10**10
+    changes = 0
+
+    def settle():
+        nonlocal changes
+        for path in (*pkgs_dir.iterdir(), *pkgs_dir.glob("*/info")):
+            os.utime(path, ns=(settled_ns, settled_ns))
+        # a new modification time for each change of the pkgs_dir
+        changes += 1
+        os.utime(pkgs_dir, ns=(settled_ns + changes, settled_ns + changes))
+
+    pkgs_dir.mkdir()
+    (pkgs_dir / PACKAGE_CACHE_MAGIC_FILE).touch()
+    add_package("a")
+    settle()
+    cache = PackageCacheData(str(pkgs_dir))
+    make_single_record = mocker.spy(cache, "_make_single_record")
+
+    cache.load()
+    assert make_single_record.call_count == 1
+    # writing the index created cache/; checking again needs no reads
+    settle()
+    cache.load()
+    assert make_single_record.call_count == 1
+    index = PackageCacheIndex(str(pkgs_dir)).read()
+    assert index["mtime_ns"] == pkgs_dir.stat().st_mtime_ns
+
+    # unchanged pkgs_dir: only the index is read
+    cache.load()
+    assert make_single_record.call_count == 1
+    assert [rec.name for rec in cache.iter_records()] == ["a"]
+
+    # only the new package is read
+    add_package("b")
+    settle()
+    cache.load()
+    assert make_single_record.call_count == 2
+    assert sorted(rec.name for rec in cache.iter_records()) == ["a", "b"]
+
+    record = cache.get(next(r for r in cache.iter_records() if r.name == "b"))
+    cache.insert(PackageCacheRecord.from_objects(record, md5="0" * 32))
+    entries = PackageCacheIndex(str(pkgs_dir)).read()["entries"]
+    assert entries["b-1-0"]["record"]["md5"] == "0" * 32
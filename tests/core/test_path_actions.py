@@ -25,8 +25,10 @@ from conda.common.path import (
     win_path_ok,
 )
 from conda.core.path_actions import (
+    CacheUrlAction,
     CompileMultiPycAction,
     CreatePythonEntryPointAction,
+    ExtractPackageAction,
     LinkPathAction,
 )
 from conda.gateways.disk.create import create_link, mkdir_p
@@ -37,6 +39,7 @@ from conda.gateways.disk.read import compute_sum
 from conda.gateways.disk.test import softlink_supported
 from conda.models.channel import Channel
 from conda.models.enums import LinkType, NoarchType, PathType
+from conda.models.match_spec import MatchSpec
 from conda.models.package_info import Noarch, PackageInfo, PackageMetadata
 from conda.models.records import PackageRecord, PathData, PathDataV1, PathsData
 from conda.testing import PathFactoryFixture
@@ -514,3 +517,26 @@ def test_create_file_link_actions(tmp_path):
 
     assert TARGET_SITE_PACKAGES not in file_link_actions[0].target_short_path
     assert TARGET_SITE_PACKAGES not in file_link_actions[1].target_short_path
+
+
+def test_extract_uses_download_checksums(mocker, tmp_path):
+    checksums = {"md5": "m" * 32, "sha256": "s" * 64}
+    cache_action = CacheUrlAction(
+        "https://repo.example.com/noarch/a-1-0.tar.bz2", str(tmp_path), "a-1-0.tar.bz2"
+    )
+    mocker.patch("conda.core.path_actions.download", return_value=checksums)
+    cache_action._execute_channel(mocker.MagicMock())
+    assert cache_action.checksums == checksums
+
+    extract_action = ExtractPackageAction(
+        cache_action.target_full_path,
+        str(tmp_path),
+        "a-1-0",
+        MatchSpec(url=cache_action.url),
+        None,
+        None,
+        "given",
+    )
+    extract_action.use_checksums(cache_action.checksums)
+    assert extract_action.sha256 == checksums["sha256"]
+    assert extract_action.md5 == "given"
@@ -0,0 +1,115 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from conda.base.context import conda_tests_ctxt_mgmt_def_pol, context
+from conda.common.io import env_vars
+from conda.core.solve import Solver
+from conda.core.solve_cache import SolveCache
+from conda.models.match_spec import MatchSpec
+from conda.testing.helpers import convert_to_dist_str, get_index_r_1, get_solver
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def test_solve_cache_eviction(tmp_path: Path):
+    _, r = get_index_r_1()
+    records = r.solve([MatchSpec("numpy 1.7*")])
+    cache = SolveCache(str(tmp_path / "solve"), max_entries=2)
+    assert cache.get("a") is None
+
+    for mtime, key in enumerate("abc"):
+        cache.put(key, records, [MatchSpec("python 2.7*")])
+        os.utime(cache._entry_path(key), ns=(mtime, mtime))
+        if key == "b":
+            # a hit makes "a" the most recently used
+            cached_records, neutered_specs = cache.get("a")
+            assert cached_records == tuple(records)
+            assert neutered_specs == ("python=2.7",)
+
+    assert len(cache.entries()) == 2
+    assert cache.get("a") and cache.get("c")
+    assert cache.get("b") is None
+
+    with open(cache._entry_path("c"), "w") as fh:
+        fh.write("{")
+    assert cache.get("c") is None
+    assert not os.path.exists(cache._entry_path("c"))
+
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_solve_final_state_cached(tmpdir, tmp_path: Path, mocker: MockerFixture):
+    mocker.patch("conda.core.solve_cache.solve_cache_dir", return_value=str(tmp_path))
+    specs = (MatchSpec("numpy"),)
+    with env_vars(
+        {"CONDA_SOLVER": "classic", "CONDA_SOLVE_CACHE": "true"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert context.solve_cache
+        with get_solver(tmpdir, specs) as solver:
+            final_state = solver.solve_final_state()
+            assert len(list(tmp_path.glob("*.json"))) == 1
+
+            # the same request, with the exported channels unchanged
+            solver = Solver(solver.prefix, solver.channels, solver.subdirs, specs)
+            collect_all_metadata = mocker.spy(solver, "_collect_all_metadata")
+            run_sat = mocker.spy(solver, "_run_sat")
+            cached_state = solver.solve_final_state()
+            assert convert_to_dist_str(cached_state) == convert_to_dist_str(final_state)
+            assert not collect_all_metadata.called
+            assert not run_sat.called
+
+            solver = Solver(
+                solver.prefix, solver.channels, solver.subdirs, [MatchSpec("python=2")]
+            )
+            run_sat = mocker.spy(solver, "_run_sat")
+            solver.solve_final_state()
+            assert run_sat.called
+            assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+@pytest.mark.parametrize(
+    "setting", ["CONDA_USE_ONLY_TAR_BZ2", "CONDA_ADD_PIP_AS_PYTHON_DEPENDENCY"]
+)
+def test_solve_cache_settings(
+    tmpdir, tmp_path: Path, mocker: MockerFixture, setting: str
+):
+    mocker.patch("conda.core.solve_cache.solve_cache_dir", return_value=str(tmp_path))
+    specs = (MatchSpec("numpy"),)
+    with env_vars(
+        {"CONDA_SOLVER": "classic", "CONDA_SOLVE_CACHE": "true", setting: "false"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        with get_solver(tmpdir, specs) as solver:
+            solver.solve_final_state()
+            prefix, channels, subdirs = solver.prefix, solver.channels, solver.subdirs
+
+        # the records read from the same repodata differ
+        with env_vars({setting: "true"}, stack_callback=conda_tests_ctxt_mgmt_def_pol):
+            solver = Solver(prefix, channels, subdirs, specs)
+            run_sat = mocker.spy(solver, "_run_sat")
+            solver.solve_final_state()
+            assert run_sat.called
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_solve_cache_disabled(tmpdir, tmp_path: Path, mocker: MockerFixture):
+    mocker.patch("conda.core.solve_cache.solve_cache_dir", return_value=str(tmp_path))
+    with env_vars(
+        {"CONDA_SOLVER": "classic"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert not context.solve_cache
+        with get_solver(tmpdir, (MatchSpec("numpy"),)) as solver:
+            solver.solve_final_state()
+    assert not list(tmp_path.glob("*.json"))
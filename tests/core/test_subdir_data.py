@@ -2,31 +2,47 @@
 # SPDX-License-Identifier: BSD-3-Clause
 from __future__ import annotations
 
+import copy
+import json
+import tracemalloc
 from logging import getLogger
 from os.path import join
 from pathlib import Path
 from time import sleep
 
+import jsonpatch
 import pytest
 
 from conda import CondaError
 from conda.base.context import conda_tests_ctxt_mgmt_def_pol, context
-from conda.common.io import env_var, env_vars
+from conda.common.io import ThreadLimitedThreadPoolExecutor, env_var, env_vars
 from conda.core.index import get_index
-from conda.core.subdir_data import SubdirData, cache_fn_url
+from conda.core.subdir_data import (
+    IndexedPackageRecordList,
+    LazyPackageRecordList,
+    SubdirData,
+    cache_fn_url,
+)
 from conda.exceptions import CondaUpgradeError
 from conda.exports import url_path
 from conda.gateways.repodata import (
+    JLAP_PATCHED_KEY,
+    NOMINAL_HASH,
+    ON_DISK_HASH,
     CondaRepoInterface,
     RepodataCache,
     RepodataFetch,
     get_repo_interface,
 )
+from conda.gateways.repodata.jlap.fetch import patched_packages
 from conda.models.channel import Channel
+from conda.models.depends_table import combine_depends
 from conda.models.records import PackageRecord
-from conda.testing.helpers import CHANNEL_DIR_V1, CHANNEL_DIR_V2
+from conda.testing.helpers import CHANNEL_DIR_V1, CHANNEL_DIR_V2, TEST_DATA_DIR
 from conda.testing.integration import make_temp_env
 
+from .. import http_test_server
+
 log = getLogger(__name__)
 
 # some test dependencies are unavailable on newer platforsm
@@ -380,4 +396,437 @@ def test_subdir_data_dict_state(platform=OVERRIDE_PLATFORM):
     """SubdirData can accept a dict instead of a RepodataState, for compatibility."""
     local_channel = Channel(join(CHANNEL_DIR_V1, platform))
     sd = SubdirData(channel=local_channel)
-    sd._read_pickled({})  # type: ignore
+    sd._read_index({})  # type: ignore
+    with pytest.deprecated_call():
+        sd._read_pickled({})  # type: ignore
+
+
+def test_subdir_data_index(platform=OVERRIDE_PLATFORM):
+    """Records read back from the memory-mapped index match parsed repodata."""
+    local_channel = Channel(join(CHANNEL_DIR_V1, platform))
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=local_channel).load()
+    expected = sorted(
+        (record.dump() for record in sd.iter_records()), key=lambda r: r["fn"]
+    )
+    zlib = [record.dump() for record in sd.query("zlib")]
+    sd._write_index()
+    assert sd.cache_path_index.exists()
+
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=local_channel)
+    state = sd.repo_cache.load_state()
+    _internal_state = sd._read_index(state)
+    assert _internal_state
+    assert isinstance(_internal_state["_package_records"], IndexedPackageRecordList)
+    records = _internal_state["_package_records"]
+    assert sorted((r.dump() for r in records), key=lambda r: r["fn"]) == expected
+
+    # records are sharded by name; a query decodes just its name's shard
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=local_channel)
+    sd._set_internal_state(sd._read_index(state))
+    assert [record.dump() for record in sd.query("zlib")] == zlib
+    assert sorted(sd._package_records._records) == list(sd._names_index["zlib"])
+
+    # invalidated when the cache headers change
+    state.etag = "different"
+    assert sd._read_index(state) is None
+
+    # corrupt index is discarded
+    sd.cache_path_index.write_bytes(b"not an index")
+    assert sd._read_index(sd.repo_cache.load_state()) is None
+    assert not sd.cache_path_index.exists()
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+def test_subdir_data_index_depends(platform=OVERRIDE_PLATFORM):
+    """Records read from the index share pre-parsed dependencies."""
+    local_channel = Channel(join(CHANNEL_DIR_V1, platform))
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=local_channel).load()
+    sd._write_index()
+    # records loaded from repodata use the table just written
+    assert sd._package_records.depends_table
+
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=local_channel)
+    sd._set_internal_state(sd._read_index(sd.repo_cache.load_state()))
+    records = list(sd.iter_records())
+    assert all(record._depends_ref for record in records)
+    by_spec = {}
+    for record in records:
+        combined_depends = record.combined_depends
+        assert combined_depends == combine_depends(record.depends, record.constrains)
+        for ms in combined_depends:
+            assert by_spec.setdefault((str(ms), ms.optional), ms) is ms
+
+    # replaced dependencies are merged again
+    record = next(record for record in records if record.depends)
+    record.depends = []
+    assert record.combined_depends == combine_depends((), record.constrains)
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+def test_subdir_data_patch_index():
+    """A jlap patch that only changes package entries updates the index in place."""
+    local_channel = Channel(join(CHANNEL_DIR_V1, "linux-64"))
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=local_channel)
+    state = sd.repo_cache.load_state()
+    repodata = json.loads(sd.cache_path_json.read_text())
+    state[NOMINAL_HASH] = "0" * 64
+    sd._process_raw_repodata(copy.deepcopy(repodata), state)
+    sd._write_index()
+
+    zlib = repodata["packages.conda"]["zlib-1.2.11-h7b6447c_3.conda"]
+    patch = [
+        {
+            "op": "replace",
+            "path": "/packages.conda/zlib-1.2.11-h7b6447c_3.conda/depends",
+            "value": [],
+        },
+        {
+            "op": "add",
+            "path": "/packages/zlib-1.2.12-0.tar.bz2",
+            "value": {**zlib, "version": "1.2.12", "build": "0"},
+        },
+        {
+            "op": "add",
+            "path": "/packages.conda/six-1.16.0-0.conda",
+            "value": {**zlib, "name": "six", "version": "1.16.0", "build": "0"},
+        },
+        {"op": "remove", "path": "/packages/libgcc-ng-8.2.0-hdf63c60_1.tar.bz2"},
+    ]
+    patched = jsonpatch.apply_patch(repodata, patch)
+    state[NOMINAL_HASH] = "1" * 64
+    state[ON_DISK_HASH] = "2" * 64
+    state[JLAP_PATCHED_KEY] = {
+        "from": "0" * 64,
+        "to": "1" * 64,
+        ON_DISK_HASH: "2" * 64,
+        **patched_packages([{"patch": patch}]),
+    }
+    expected = sorted(
+        (
+            record.dump()
+            for record in sd._process_raw_repodata(copy.deepcopy(patched), state)[
+                "_package_records"
+            ]
+        ),
+        key=lambda r: r["fn"],
+    )
+
+    _internal_state = sd._patch_index(copy.deepcopy(patched), state)
+    assert _internal_state
+    records = _internal_state["_package_records"]
+    assert isinstance(records, IndexedPackageRecordList)
+    assert sorted((r.dump() for r in records), key=lambda r: r["fn"]) == expected
+    assert sorted(_internal_state["_names_index"]) == ["six", "zlib"]
+    assert _internal_state["_nominal_hash"] == "1" * 64
+    for record in records:
+        assert record._depends_ref
+        assert record.combined_depends == combine_depends(
+            record.depends, record.constrains
+        )
+
+    # the index no longer matches the repodata this patch applies to
+    assert sd._patch_index(copy.deepcopy(patched), state) is None
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+def test_subdir_data_patch_index_full_download(tmp_pkgs_dir: Path):
+    """A complete download after a jlap patch isn't taken for the patched file."""
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    sd = SubdirData(channel=Channel(join(CHANNEL_DIR_V1, "linux-64")))
+    repodata = json.loads(Path(CHANNEL_DIR_V1, "linux-64", "repodata.json").read_text())
+    cache = sd.repo_cache
+    cache.save(json.dumps(repodata))
+    state = cache.state
+    # the index is at the hash that jlap patched from
+    state[NOMINAL_HASH] = "0" * 64
+    sd._process_raw_repodata(copy.deepcopy(repodata), state)
+    sd._write_index()
+    patch = [
+        {
+            "op": "replace",
+            "path": "/packages.conda/zlib-1.2.11-h7b6447c_3.conda/depends",
+            "value": [],
+        }
+    ]
+    state[NOMINAL_HASH] = "1" * 64
+    state[ON_DISK_HASH] = "2" * 64
+    state[JLAP_PATCHED_KEY] = {
+        "from": "0" * 64,
+        "to": "1" * 64,
+        ON_DISK_HASH: "2" * 64,
+        **patched_packages([{"patch": patch}]),
+    }
+
+    # then a complete download, without jlap, replaces the patched file
+    full = copy.deepcopy(repodata)
+    del full["packages"]["libgcc-ng-8.2.0-hdf63c60_1.tar.bz2"]
+    cache.save(json.dumps(full))
+    state = cache.load_state()
+    assert JLAP_PATCHED_KEY not in state
+    assert NOMINAL_HASH not in state
+    assert sd._patch_index(copy.deepcopy(full), state) is None
+
+    # a patch record left by another writer doesn't match the file either
+    state[NOMINAL_HASH] = "1" * 64
+    state[JLAP_PATCHED_KEY] = {
+        "from": "0" * 64,
+        "to": "1" * 64,
+        ON_DISK_HASH: "2" * 64,
+        **patched_packages([{"patch": patch}]),
+    }
+    assert sd._patch_index(copy.deepcopy(full), state) is None
+
+    fns = {
+        record.fn
+        for record in sd._process_raw_repodata(full, state)["_package_records"]
+    }
+    assert "libgcc-ng-8.2.0-hdf63c60_1.tar.bz2" not in fns
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+def test_subdir_data_lazy_normalization(platform=OVERRIDE_PLATFORM):
+    """Records are only normalized when first accessed; raw entries are kept."""
+    local_channel = Channel(join(CHANNEL_DIR_V1, platform))
+    sd = SubdirData(channel=local_channel)
+    python = {
+        "name": "python",
+        "version": "3.12.0",
+        "build": "0",
+        "build_number": 0,
+        "depends": [],
+    }
+    repodata = {
+        "info": {"subdir": platform},
+        "packages": {
+            "python-3.12.0-0.tar.bz2": {**python, "md5": "a" * 32, "size": 1},
+            "zlib-1.3-0.tar.bz2": {
+                "name": "zlib",
+                "version": "1.3",
+                "build": "0",
+                "build_number": 0,
+            },
+        },
+        "packages.conda": {"python-3.12.0-0.conda": {**python, "md5": "b" * 32}},
+    }
+    with env_vars(
+        {"CONDA_ADD_PIP_AS_PYTHON_DEPENDENCY": "true", "CONDA_USE_ONLY_TAR_BZ2": ""},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        _internal_state = sd._process_raw_repodata(repodata)
+
+    records = _internal_state["_package_records"]
+    assert isinstance(records, LazyPackageRecordList)
+    assert len(records) == 2
+    assert not records._records
+
+    (prec,) = sd._iter_records_by_name("python")
+    assert prec.fn == "python-3.12.0-0.conda"
+    assert prec.url.endswith(f"/{platform}/python-3.12.0-0.conda")
+    assert prec.depends == ("pip",)
+    assert prec.legacy_bz2_md5 == "a" * 32
+    assert next(sd._iter_records_by_name("python")) is prec
+    assert list(records._records) == list(_internal_state["_names_index"]["python"])
+
+    # raw entries are left untouched for the index
+    (i,) = _internal_state["_names_index"]["python"]
+    assert records.raw(i)["depends"] == []
+    assert "url" not in records.raw(i)
+
+
+def _r_linux_64_with_conda_packages(conda_first: bool) -> dict:
+    repodata = json.loads(
+        Path(TEST_DATA_DIR, "repodata", "r_linux-64.json").read_text()
+    )
+    packages = repodata.pop("packages")
+    conda_packages = {
+        fn[: -len(".tar.bz2")] + ".conda": {**info, "md5": "0" * 32}
+        for fn, info in list(packages.items())[::2]
+    }
+    sections = {"packages": packages, "packages.conda": conda_packages}
+    for key in sorted(sections, reverse=conda_first):
+        repodata[key] = sections[key]
+    return repodata
+
+
+@pytest.mark.parametrize("conda_first", [False, True])
+def test_subdir_data_stream_parse(tmp_path: Path, conda_first: bool):
+    """Incremental parsing produces the same records as json.loads()."""
+    repodata = _r_linux_64_with_conda_packages(conda_first)
+    path = tmp_path / "repodata.json"
+    path.write_text(json.dumps(repodata, indent=2))
+
+    sd = SubdirData(channel=Channel(join(CHANNEL_DIR_V1, "linux-64")))
+
+    def records_by_name(_internal_state):
+        # legacy record order is arbitrary; compare by name and filename
+        records = _internal_state["_package_records"]
+        return {
+            name: sorted((records[i].fn, records[i].dump()) for i in idx)
+            for name, idx in _internal_state["_names_index"].items()
+        }
+
+    expected = records_by_name(sd._process_raw_repodata(json.loads(path.read_text())))
+    assert records_by_name(sd._process_raw_repodata_stream(path)) == expected
+    assert any(
+        record.get("legacy_bz2_md5")
+        for records in expected.values()
+        for _, record in records
+    )
+
+    # missing cache behaves like empty repodata
+    assert not sd._process_raw_repodata_stream(tmp_path / "missing.json")[
+        "_package_records"
+    ]
+
+
+@pytest.mark.benchmark
+def test_subdir_data_stream_parse_memory(tmp_path: Path):
+    """Streaming keeps peak memory below loading the whole file."""
+    path = tmp_path / "repodata.json"
+    path.write_text(json.dumps(_r_linux_64_with_conda_packages(False), indent=2))
+    sd = SubdirData(channel=Channel(join(CHANNEL_DIR_V1, "linux-64")))
+
+    def peak(func):
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    loaded = peak(lambda: sd._process_raw_repodata_str(path.read_text()))
+    streamed = peak(lambda: sd._process_raw_repodata_stream(path))
+    log.info("peak memory: json.loads %d, streamed %d", loaded, streamed)
+    assert streamed < loaded
+
+
+def test_subdir_data_stream_parse_setting(mocker, platform=OVERRIDE_PLATFORM):
+    local_channel = Channel(join(CHANNEL_DIR_V1, platform))
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    expected = [record.dump() for record in SubdirData(local_channel).query("zlib")]
+
+    stream = mocker.spy(SubdirData, "_process_raw_repodata_stream")
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    with env_var(
+        "CONDA_REPODATA_STREAM_PARSE",
+        "true",
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        records = [record.dump() for record in SubdirData(local_channel).query("zlib")]
+    assert stream.call_count == 1
+    assert records == expected
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+@pytest.mark.integration
+def test_subdir_data_process_pool(platform=OVERRIDE_PLATFORM):
+    """Repodata parsed in worker processes matches repodata loaded in threads."""
+    http = http_test_server.run_test_server(CHANNEL_DIR_V1)
+    try:
+        channel = "http://127.0.0.1:%d" % http.socket.getsockname()[1]
+        subdirs = (platform, "noarch")
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        expected = sorted(
+            record.dump()["fn"]
+            for record in SubdirData.query_all("zlib", [channel], subdirs)
+        )
+        assert expected
+
+        # start from an empty cache so each subdir is parsed by a worker
+        for subdir in subdirs:
+            sd = SubdirData(Channel(f"{channel}/{subdir}"))
+            for path in (sd.cache_path_json, sd.cache_path_state, sd.cache_path_index):
+                path.unlink(missing_ok=True)
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        with env_var(
+            "CONDA_REPODATA_PROCESSES",
+            "2",
+            stack_callback=conda_tests_ctxt_mgmt_def_pol,
+        ):
+            records = sorted(
+                record.dump()["fn"]
+                for record in SubdirData.query_all("zlib", [channel], subdirs)
+            )
+            for subdir in subdirs:
+                sd = SubdirData(Channel(f"{channel}/{subdir}"))
+                assert sd._loaded
+                assert isinstance(sd._package_records, IndexedPackageRecordList)
+        assert records == expected
+    finally:
+        http.shutdown()
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
+def test_subdir_data_refresh_stale(mocker, platform=OVERRIDE_PLATFORM):
+    """Stale subdirs on one host are refreshed together through one session."""
+    http = http_test_server.run_test_server(CHANNEL_DIR_V1)
+    try:
+        channel = "http://127.0.0.1:%d" % http.socket.getsockname()[1]
+        channel_urls = [f"{channel}/{platform}", f"{channel}/noarch"]
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        for url in channel_urls:
+            sd = SubdirData(Channel(url))
+            for path in (sd.cache_path_json, sd.cache_path_state, sd.cache_path_index):
+                path.unlink(missing_ok=True)
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+        # every cache is stale as soon as it is written
+        with env_var(
+            "CONDA_LOCAL_REPODATA_TTL",
+            "0",
+            stack_callback=conda_tests_ctxt_mgmt_def_pol,
+        ):
+            sessions = set()
+            fetch_latest_path = RepodataFetch.fetch_latest_path
+
+            def record_session(fetcher):
+                sessions.add(fetcher.session)
+                return fetch_latest_path(fetcher)
+
+            mocker.patch.object(
+                RepodataFetch,
+                "fetch_latest_path",
+                autospec=True,
+                side_effect=record_session,
+            )
+            executor = mocker.patch(
+                "conda.core.subdir_data.ThreadLimitedThreadPoolExecutor",
+                wraps=ThreadLimitedThreadPoolExecutor,
+            )
+            SubdirData._refresh_stale(channel_urls)
+
+            # a single pool of threads, not one per host
+            assert executor.call_count == 1
+
+            subdir_datas = [SubdirData(Channel(url)) for url in channel_urls]
+            assert len(sessions) == 1
+            assert None not in sessions
+            for sd in subdir_datas:
+                assert sd.cache_path_json.exists()
+                assert not sd._loaded
+                # the batch session is not kept
+                assert sd._session is None
+
+            fetch_latest = mocker.spy(RepodataFetch, "_fetch_latest")
+            records = sorted(
+                record.dump()["fn"]
+                for record in SubdirData.query_all(
+                    "zlib", [channel], (platform, "noarch")
+                )
+            )
+            assert records
+            # load() used what the batch fetched, without asking again
+            assert not fetch_latest.called
+
+            # later loads check the cache as usual
+            subdir_datas[0].reload()
+            assert fetch_latest.called
+    finally:
+        http.shutdown()
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
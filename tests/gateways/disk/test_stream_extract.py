@@ -0,0 +1,107 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import os
+import zipfile
+from pathlib import Path
+from threading import Thread
+
+import pytest
+
+from conda.gateways.disk.create import extract_tarball
+from conda.gateways.disk.stream_extract import StreamingExtract, extract_file
+
+FILES = {
+    "info/index.json": b'{"name": "a", "version": "1", "build": "0"}',
+    "lib/big.bin": os.urandom(1 << 20),
+    "lib/small.txt": b"small",
+}
+
+
+def make_package(tmp_path: Path, filename: str) -> Path:
+    import conda_package_handling.api
+
+    source = tmp_path / "source"
+    for name, data in FILES.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_bytes(data)
+    conda_package_handling.api.create(
+        str(source), list(FILES), filename, out_folder=str(tmp_path)
+    )
+    return tmp_path / filename
+
+
+def download(source: Path, target: Path, chunk_size=1 << 14):
+    """Write ``source`` to ``target``'s ``.partial`` in chunks, then rename it."""
+    partial = Path(f"{target}.partial")
+    with source.open("rb") as src, partial.open("ab") as dst:
+        while chunk := src.read(chunk_size):
+            dst.write(chunk)
+            dst.flush()
+    partial.rename(target)
+
+
+def tree(path: Path) -> dict[str, bytes]:
+    return {
+        str(child.relative_to(path)): child.read_bytes()
+        for child in path.rglob("*")
+        if child.is_file()
+    }
+
+
+@pytest.mark.parametrize("filename", ["a-1-0.conda", "a-1-0.tar.bz2"])
+def test_streaming_extract(tmp_path: Path, filename: str):
+    source = make_package(tmp_path, filename)
+    target = tmp_path / "pkgs" / filename
+    target.parent.mkdir()
+    streaming = StreamingExtract(
+        f"{target}.partial", str(target), str(tmp_path / "streamed")
+    )
+    streaming.start()
+    writer = Thread(target=download, args=(source, target))
+    writer.start()
+    writer.join()
+    assert streaming.finish()
+
+    extract_tarball(str(source), str(tmp_path / "extracted"))
+    assert tree(tmp_path / "streamed") == tree(tmp_path / "extracted")
+    assert tree(tmp_path / "streamed")["lib/big.bin"] == FILES["lib/big.bin"]
+
+
+@pytest.mark.parametrize("filename", ["a-1-0.conda", "a-1-0.tar.bz2"])
+def test_extract_file(tmp_path: Path, filename: str):
+    source = make_package(tmp_path, filename)
+    progress = []
+    assert extract_file(str(source), str(tmp_path / "streamed"), progress.append)
+    assert progress == sorted(progress)
+    assert progress[-1] == 1
+
+    extract_tarball(str(source), str(tmp_path / "extracted"))
+    assert tree(tmp_path / "streamed") == tree(tmp_path / "extracted")
+
+
+def test_streaming_extract_fail(tmp_path: Path):
+    source = make_package(tmp_path, "a-1-0.conda")
+    target = tmp_path / "a-1-0.conda"
+    Path(f"{target}.partial").write_bytes(source.read_bytes()[:1000])
+    streaming = StreamingExtract(
+        f"{target}.partial", str(target), str(tmp_path / "streamed")
+    )
+    streaming.start()
+    streaming.fail()
+    assert not streaming.extracted
+    assert not (tmp_path / "streamed").exists()
+
+
+def test_streaming_extract_unsupported(tmp_path: Path):
+    # compressed members can't be read front to back
+    target = tmp_path / "a-1-0.conda"
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("metadata.json", "{}")
+    streaming = StreamingExtract(
+        f"{target}.partial", str(target), str(tmp_path / "streamed")
+    )
+    streaming.start()
+    assert not streaming.finish()
+    assert not (tmp_path / "streamed").exists()
@@ -22,6 +22,7 @@ from conda.gateways.connection.session import (
     get_channel_name_from_url,
     get_session,
     get_session_storage_key,
+    pooled_session,
 )
 from conda.gateways.disk.delete import rm_rf
 from conda.plugins.types import ChannelAuthBase
@@ -413,7 +414,25 @@ def test_accept_range_none(package_server, tmp_path):
     complete_file.unlink()
     partial_file.write_text("wrong content")
 
-    download_inner(url, complete_file, None, expected_sha256, len(test_content), None)
+    checksums = download_inner(
+        url, complete_file, None, expected_sha256, len(test_content), None
+    )
 
     assert complete_file.read_text() == test_content
+    # hashers restart with the truncated file
+    assert checksums["sha256"] == expected_sha256
     assert not partial_file.exists()
+
+
+def test_pooled_session():
+    url = "https://repo.example.com/channel/noarch/repodata.json"
+    shared = get_session(url).get_adapter(url)
+    with pooled_session(url, 32) as session:
+        assert session is get_session(url)
+        adapter = session.get_adapter(url)
+        assert adapter._pool_maxsize == 32
+        # already large enough; left in place
+        with pooled_session(url, 4) as again:
+            assert again.get_adapter(url) is adapter
+    # the shared session gets its own adapter back
+    assert session.get_adapter(url) is shared
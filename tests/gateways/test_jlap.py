@@ -32,6 +32,7 @@ from conda.gateways.repodata import (
     URL_KEY,
     CondaRepoInterface,
     RepodataCache,
+    RepodataFetch,
     RepodataOnDisk,
     RepodataState,
     Response304ContentUnchanged,
@@ -777,6 +778,47 @@ def test_jlap_zst_not_zst(package_server, package_repository_base: Path, tmp_pat
     assert len(json.loads(cache.cache_path_json.read_text())["packages"])
 
 
+def test_fetch_latest_path_zst(
+    package_server, package_repository_base: Path, tmp_path: Path, mocker
+):
+    """
+    repodata.json.zst is decompressed straight into the cache and not read back
+    into memory; the cache state records its size in bytes.
+    """
+    subdir = package_repository_base / "linux-ppc64le"
+    subdir.mkdir(exist_ok=True)
+    repodata = {
+        "info": {"subdir": "linux-ppc64le"},
+        "packages": {
+            "a-1.0-0.tar.bz2": {
+                "name": "a",
+                "version": "1.0",
+                "build": "0",
+                "build_number": 0,
+                "description": "ünïcödé",
+            }
+        },
+    }
+    raw = json.dumps(repodata, ensure_ascii=False).encode("utf-8")
+    (subdir / "repodata.json.zst").write_bytes(zstandard.ZstdCompressor().compress(raw))
+
+    host, port = package_server.getsockname()
+    fetcher = RepodataFetch(
+        tmp_path / "cache",
+        Channel(f"http://{host}:{port}/test/linux-ppc64le"),
+        "repodata.json",
+        repo_interface_cls=interface.ZstdRepoInterface,
+    )
+    read_text = mocker.spy(Path, "read_text")
+    path, state = fetcher.fetch_latest_path()
+
+    assert not [call for call in read_text.call_args_list if call.args[0] == path]
+    assert path.read_bytes() == raw
+    assert state["size"] == len(raw) == path.stat().st_size
+    # not mistaken for a modified cache, which would force a new download
+    assert fetcher.repo_cache.load_state()["size"] == len(raw)
+
+
 def test_jlap_core(tmp_path: Path):
     """Code paths not excercised by other tests."""
     with pytest.raises(ValueError):
@@ -922,3 +964,31 @@ def test_request_url_jlap_state(tmp_path, package_server, package_repository_bas
     )
 
     assert result is None
+
+
+def test_patched_packages():
+    """Only patches limited to package entries are reported as such."""
+    apply = [
+        {"patch": [{"op": "remove", "path": "/packages/a-1.0-0.tar.bz2"}]},
+        {
+            "patch": [
+                {"op": "add", "path": "/packages.conda/b-1.0-0.conda", "value": {}},
+                {
+                    "op": "move",
+                    "from": "/packages/c~1d-1.0-0.tar.bz2/md5",
+                    "path": "/packages/a-1.0-0.tar.bz2/md5",
+                },
+            ]
+        },
+    ]
+    assert fetch.patched_packages(apply) == {
+        "packages": ["a-1.0-0.tar.bz2", "c/d-1.0-0.tar.bz2"],
+        "packages.conda": ["b-1.0-0.conda"],
+    }
+
+    apply.append({"patch": [{"op": "add", "path": "/info/x", "value": 1}]})
+    assert fetch.patched_packages(apply) is None
+    assert (
+        fetch.patched_packages([{"patch": [{"op": "remove", "path": "/packages"}]}])
+        is None
+    )
@@ -7,6 +7,7 @@ Strongly related to subdir_data / test_subdir_data.
 from __future__ import annotations
 
 import datetime
+import io
 import json
 import math
 import sys
@@ -16,6 +17,7 @@ from typing import TYPE_CHECKING
 
 import pytest
 
+from conda.auxlib.collection import AttrDict
 from conda.base.constants import REPODATA_FN
 from conda.base.context import conda_tests_ctxt_mgmt_def_pol, context
 from conda.common.io import env_vars
@@ -39,10 +41,13 @@ from conda.gateways.repodata import (
     RepodataFetch,
     RepodataIsEmpty,
     RepodataState,
+    _revalidate,
     conda_http_errors,
     get_cache_control_max_age,
 )
+from conda.gateways.repodata.index import RepodataIndex, write_index
 from conda.gateways.repodata.jlap.interface import JlapRepoInterface
+from conda.gateways.repodata.stream import iter_repodata
 from conda.models.channel import Channel
 
 if TYPE_CHECKING:
@@ -172,6 +177,78 @@ def test_stale(tmp_path):
     assert state.mod == "some"
 
 
+def test_stale_while_revalidate(tmp_path, mocker):
+    """Stale repodata within the grace period is used while it is refreshed."""
+    fetch = RepodataFetch(
+        tmp_path / "swr",
+        Channel("https://repo.example.com/conda/noarch"),
+        REPODATA_FN,
+        repo_interface_cls=CondaRepoInterface,
+    )
+    cache = fetch.repo_cache
+    cache.save("{}")
+    revalidate = mocker.patch.object(RepodataFetch, "revalidate_in_background")
+
+    with env_vars(
+        {
+            "CONDA_LOCAL_REPODATA_TTL": "60",
+            "CONDA_LOCAL_REPODATA_STALE_GRACE": "600",
+        },
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        cache.state["refresh_ns"] = time.time_ns() - 120 * 10**9
+        assert cache.stale()
+        assert fetch.should_use_cache(cache)
+        assert revalidate.call_count == 1
+
+        # a refresh was already started; don't start another
+        assert fetch.should_use_cache(cache)
+        assert revalidate.call_count == 1
+
+        # past the grace period
+        cache.state["refresh_ns"] = time.time_ns() - 3600 * 10**9
+        assert not fetch.should_use_cache(cache)
+
+    with env_vars(
+        {"CONDA_LOCAL_REPODATA_TTL": "60"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        cache.state["refresh_ns"] = time.time_ns() - 120 * 10**9
+        assert not fetch.should_use_cache(cache)
+    assert revalidate.call_count == 1
+
+
+def test_revalidate_in_background(tmp_path, mocker):
+    """The detached refresh gets its arguments on stdin and fetches repodata."""
+    channel = Channel("https://repo.example.com/t/secret-token/conda/noarch")
+    fetch = RepodataFetch(
+        tmp_path / "swr",
+        channel,
+        REPODATA_FN,
+        repo_interface_cls=CondaRepoInterface,
+    )
+    popen = mocker.patch("conda.gateways.repodata.subprocess.Popen")
+    mocker.patch.object(context, "_argparse_args", AttrDict(insecure=True, func=print))
+    fetch.revalidate_in_background()
+
+    (command,), kwargs = popen.call_args
+    assert command[0] == sys.executable
+    assert "secret-token" not in " ".join(command)
+    assert kwargs["env"]["CONDA_LOCAL_REPODATA_STALE_GRACE"] == "0"
+    (payload,), _ = popen.return_value.stdin.write.call_args
+    args = json.loads(payload)
+    assert args["url"] == channel.url(with_credentials=True)
+    assert args["repodata_fn"] == REPODATA_FN
+    assert args["argparse_args"] == {"insecure": True}
+
+    reset_context = mocker.patch("conda.gateways.repodata.reset_context")
+    fetch_latest_path = mocker.patch.object(RepodataFetch, "fetch_latest_path")
+    mocker.patch("sys.stdin", io.StringIO(payload.decode("utf-8")))
+    _revalidate()
+    reset_context.assert_called_once_with(args["search_path"], {"insecure": True})
+    fetch_latest_path.assert_called_once()
+
+
 def test_repodata_state_has_format():
     # wrong has_zst format
     state = RepodataState(
@@ -408,3 +485,83 @@ def test_get_cache_control_max_age():
     """
     assert get_cache_control_max_age('cache_control = "public, max-age=30"') == 30
     assert get_cache_control_max_age(None) == 0
+
+
+def test_repodata_index(tmp_path):
+    """
+    Index records are decoded from the memory-mapped file, singly or by shard.
+    """
+    path = tmp_path / "repodata.idx"
+    records = [
+        {"name": "a", "version": "1.0", "fn": "a-1.0-0.tar.bz2"},
+        {"name": "b", "version": "2.0", "fn": "b-2.0-0.tar.bz2"},
+        {"name": "a", "version": "1.1", "fn": "a-1.1-0.tar.bz2"},
+    ]
+    write_index(path, records, {"a": [0, 2], "b": [1]}, {"_etag": "abc"})
+
+    index = RepodataIndex(path)
+    try:
+        assert len(index) == 3
+        assert index.header["_etag"] == "abc"
+        # each name's records are stored as one contiguous shard
+        assert index.names == {"a": range(0, 2), "b": range(2, 3)}
+        sharded = [records[0], records[2], records[1]]
+        assert [index.record(i) for i in range(len(index))] == sharded
+        assert index.records(0, 2) == sharded[:2]
+        assert index.records(1, 3) == sharded[1:]
+        assert index.records(3, 3) == []
+        with pytest.raises(IndexError):
+            index.record(3)
+        with pytest.raises(IndexError):
+            index.records(2, 4)
+    finally:
+        index.close()
+
+    depends = [["a >=1", False], ["b", True]]
+    write_index(path, records, {"a": [0, 2], "b": [1]}, {}, depends)
+    index = RepodataIndex(path)
+    try:
+        assert len(index) == 3
+        assert index.records(0, 3) == sharded
+        assert index.depends() == depends
+        with pytest.raises(IndexError):
+            index.record(3)
+    finally:
+        index.close()
+
+    path.write_bytes(b"NOTINDEX" + bytes(64))
+    with pytest.raises(ValueError):
+        RepodataIndex(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_iter_repodata(chunk_size: int):
+    """
+    Incremental parsing yields every record regardless of chunk boundaries.
+    """
+    repodata = {
+        "info": {"subdir": "noarch"},
+        "packages": {
+            "a-1.0-0.tar.bz2": {"name": "a", "depends": ["b >=1"], "size": 12345},
+            "b-1.0-0.tar.bz2": {"name": "b", "depends": [], "size": 6},
+        },
+        "packages.conda": {},
+        "removed": ["c-1.0-0.tar.bz2"],
+        "repodata_version": 12,
+    }
+    parsed = {}
+    for key, fn, value in iter_repodata(
+        io.StringIO(json.dumps(repodata, indent=2)), chunk_size
+    ):
+        if fn is None:
+            parsed[key] = value
+        else:
+            parsed.setdefault(key, {})[fn] = value
+    # empty streamed sections produce no entries
+    del repodata["packages.conda"]
+    assert parsed == repodata
+
+    assert list(iter_repodata(io.StringIO(""))) == []
+    for bad in ("{", '{"info": {}', '{"info": {}}x', "[]"):
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_repodata(io.StringIO(bad), chunk_size))
@@ -0,0 +1,158 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+import pytest
+
+from conda.gateways.connection.scheduler import HostLimit, HostScheduler
+
+MIB = 1 << 20
+
+
+def test_host_limit_failure():
+    limit = HostLimit("repo.example.com", 8)
+    assert limit.limit == 8
+    limit.record_failure()
+    assert limit.limit == 4
+    for _ in range(5):
+        limit.record_failure()
+    assert limit.limit == 1
+    assert limit.error_rate > 0.5
+
+
+def test_host_limit_throughput():
+    limit = HostLimit("repo.example.com", 4)
+    # 4 connections at 10 MiB/s each
+    limit.record_success(10 * MIB, 1, 4)
+    assert limit.throughput == 10 * MIB
+    # small downloads measure latency
+    limit.record_success(MIB // 2, 10, 4)
+    assert limit.limit == 4
+    # the host slows down with as many connections
+    limit.record_success(10 * MIB, 4, 4)
+    assert limit.limit == 3
+    # and holds up with fewer
+    for _ in range(3):
+        limit.record_success(10 * MIB, 1, 3)
+    assert limit.limit == 4
+
+
+def test_host_limit_connections():
+    limit = HostLimit("repo.example.com", 4)
+    assert limit.acquire(3) == 3
+    # what is left
+    assert limit.acquire(3) == 1
+    assert limit.acquire() == 0
+    limit.release(3)
+    assert limit.active == 1
+    # throughput is per connection
+    limit.record_success(40 * MIB, 1, 4, connections=4)
+    assert limit.throughput == 10 * MIB
+
+
+def test_host_limit_small_downloads_recover():
+    limit = HostLimit("repo.example.com", 4)
+    limit.record_failure()
+    assert limit.limit == 2
+    for _ in range(5):
+        limit.record_success(MIB // 2, 1, 2)
+    assert limit.throughput is None
+    assert limit.limit == 4
+
+
+def test_host_limit_errors_hold_limit():
+    limit = HostLimit("repo.example.com", 4)
+    limit.record_success(10 * MIB, 1, 4)
+    limit.record_failure()
+    assert limit.limit == 2
+    limit.record_success(10 * MIB, 1, 2)
+    assert limit.limit == 2
+    for _ in range(5):
+        limit.record_success(10 * MIB, 1, 2)
+    assert limit.limit == 4
+
+
+def test_host_scheduler():
+    release = Event()
+    lock = Lock()
+    running = {"a": 0, "b": 0}
+    most = {"a": 0, "b": 0}
+
+    def fetch(host):
+        with lock:
+            running[host] += 1
+            most[host] = max(most[host], running[host])
+        if host == "a":
+            release.wait(5)
+        with lock:
+            running[host] -= 1
+        return host
+
+    with ThreadPoolExecutor(4) as executor:
+        scheduler = HostScheduler(executor, 2)
+        slow = [
+            scheduler.submit("https://a.example.com/p.conda", None, fetch, "a")
+            for _ in range(5)
+        ]
+        fast = [
+            scheduler.submit("https://b.example.com/p.conda", None, fetch, "b")
+            for _ in range(3)
+        ]
+        # host a doesn't hold up host b
+        assert [future.result(timeout=5) for future in fast] == ["b"] * 3
+        assert not any(future.done() for future in slow)
+        release.set()
+        assert [future.result(timeout=5) for future in slow] == ["a"] * 5
+
+    assert most["a"] == 2
+    assert scheduler.limits["a.example.com"].active == 0
+
+
+def test_host_scheduler_connections():
+    release = Event()
+
+    def fetch(connections=1):
+        release.wait(5)
+        return connections
+
+    with ThreadPoolExecutor(4) as executor:
+        scheduler = HostScheduler(executor, 4)
+        url = "https://a.example.com/p.conda"
+        first = scheduler.submit(url, None, fetch, connections=3)
+        second = scheduler.submit(url, None, fetch, connections=3)
+        third = scheduler.submit(url, None, fetch)
+        limit = scheduler.limits["a.example.com"]
+        # one slot for each connection
+        assert limit.active == 4
+        assert not third.running()
+        release.set()
+        granted = [future.result(timeout=5) for future in (first, second, third)]
+    assert granted == [3, 1, 1]
+    assert limit.active == 0
+
+
+def test_host_scheduler_failure():
+    def fail():
+        raise OSError("connection reset")
+
+    with ThreadPoolExecutor(2) as executor:
+        scheduler = HostScheduler(executor, 2)
+        future = scheduler.submit("https://a.example.com/p.conda", None, fail)
+        with pytest.raises(OSError):
+            future.result(timeout=5)
+    assert scheduler.limits["a.example.com"].limit == 1
+
+
+def test_host_scheduler_cancel():
+    release = Event()
+    with ThreadPoolExecutor(1) as executor:
+        scheduler = HostScheduler(executor, 1)
+        running = scheduler.submit("https://a.example.com/1", None, release.wait, 5)
+        queued = scheduler.submit("https://a.example.com/2", None, release.wait, 5)
+        assert queued.cancel()
+        release.set()
+        assert running.result(timeout=5)
+    assert queued.cancelled()
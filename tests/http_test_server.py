@@ -6,21 +6,66 @@ Local test server based on http.server
 
 import contextlib
 import http.server
+import io
+import os
 import queue
+import re
 import socket
 import threading
 
+RANGE = re.compile(r"bytes=(\d+)-(\d*)$")
 
-def run_test_server(directory: str) -> http.server.ThreadingHTTPServer:
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Also answer single ``Range: bytes=start-end`` requests, and advertise it
+    with ``Accept-Ranges``. The requested ranges are appended to the server's
+    ``ranges``.
+    """
+
+    def end_headers(self):
+        self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+    def send_head(self):
+        match = RANGE.match(self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            start = int(match[1])
+            end = min(int(match[2]) if match[2] else size - 1, size - 1)
+            if start > end:
+                self.send_error(416)
+                return None
+            f.seek(start)
+            data = f.read(end - start + 1)
+        self.server.ranges.append((start, end))
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        return io.BytesIO(data)
+
+
+def run_test_server(
+    directory: str, accept_ranges: bool = False
+) -> http.server.ThreadingHTTPServer:
     """
     Run a test server on a random port. Inspect returned server to get port,
-    shutdown etc.
+    shutdown etc. With ``accept_ranges``, it answers Range requests.
     """
+    handler = (
+        RangeRequestHandler if accept_ranges else http.server.SimpleHTTPRequestHandler
+    )
 
     class DualStackServer(http.server.ThreadingHTTPServer):
         daemon_threads = False  # These are per-request threads
         allow_reuse_address = True  # Good for tests
         request_queue_size = 64  # Should be more than the number of test packages
+        ranges = None  # served by RangeRequestHandler
 
         def server_bind(self):
             # suppress exception when protocol is IPv4
@@ -32,9 +77,8 @@ def run_test_server(directory: str) -> http.server.ThreadingHTTPServer:
             self.RequestHandlerClass(request, client_address, self, directory=directory)
 
     def start_server(queue):
-        with DualStackServer(
-            ("127.0.0.1", 0), http.server.SimpleHTTPRequestHandler
-        ) as httpd:
+        with DualStackServer(("127.0.0.1", 0), handler) as httpd:
+            httpd.ranges = []
             host, port = httpd.socket.getsockname()[:2]
             queue.put(httpd)
             url_host = f"[{host}]" if ":" in host else host
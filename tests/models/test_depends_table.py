@@ -0,0 +1,45 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import pickle
+
+from conda.models.depends_table import DependsTable, combine_depends
+from conda.models.match_spec import MatchSpec
+
+
+def test_depends_table():
+    table = DependsTable()
+    depends = ["python >=3.8", "numpy *", "numpy <2"]
+    constrains = ["scipy >=1", "numpy >=1.20"]
+    ids = table.add(depends, constrains)
+    assert table.match_specs(ids) == combine_depends(depends, constrains)
+    # constrains on names not depended on are optional
+    assert [ms.optional for ms in table.match_specs(ids)] == [False, False, True]
+
+    # specs are stored and parsed once
+    python = table.add(["python >=3.8"], [])
+    assert python == [ids[1]]
+    assert len(table) == 3
+    assert table.match_specs(python)[0] is table.match_specs(ids)[1]
+
+    # unmergeable specs are left to PackageRecord.combined_depends
+    assert table.add(["a[build=x]", "a[build=y]"], []) is None
+
+
+def test_depends_table_loaded_lazily():
+    entries = [["a >=1", False], ["b", True]]
+    loads = []
+
+    def load():
+        loads.append(True)
+        return entries
+
+    table = DependsTable(load)
+    assert not loads
+    assert table.match_specs([1, 0]) == (
+        MatchSpec("b", optional=True),
+        MatchSpec("a >=1"),
+    )
+    assert loads == [True]
+    assert pickle.loads(pickle.dumps(table)).entries == table.entries
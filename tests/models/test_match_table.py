@@ -0,0 +1,71 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+from conda.models.match_spec import MatchSpec
+from conda.models.match_table import MIN_TABLE_SIZE, MatchTable
+from conda.testing.helpers import get_index_r_1
+
+SPECS = (
+    "numpy",
+    "numpy 1.7*",
+    "numpy >=1.6,<1.8",
+    "numpy 1.6.2|1.7.1",
+    "numpy 1.7.1 py27_0",
+    "numpy 1.7.1 *py33*",
+    "numpy[build_number='>0']",
+    "numpy[build='^py2.*$']",
+    "numpy[md5=nope]",
+    "numpy 9.9",
+    "channel-1::numpy >=1.7",
+    "defaults::numpy >=1.7",
+    "numpy[subdir=noarch]",
+    "numpy[subdir=linux-64] 1.7*",
+)
+
+
+@pytest.fixture(scope="module")
+def group():
+    _, r = get_index_r_1()
+    group = r.groups["numpy"]
+    assert len(group) >= MIN_TABLE_SIZE
+    return group
+
+
+@pytest.mark.parametrize("use_numpy", [False, True], ids=["python", "numpy"])
+@pytest.mark.parametrize("spec", SPECS)
+def test_match_table(group, spec, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    ms = MatchSpec(spec)
+    table = MatchTable(group, use_numpy=use_numpy)
+    # twice, to reuse the columns built by the first match
+    for _ in range(2):
+        assert table.match(ms) == tuple(prec for prec in group if ms.match(prec))
+
+
+def test_find_matches():
+    _, r = get_index_r_1()
+    for spec in SPECS:
+        ms = MatchSpec(spec)
+        expected = tuple(prec for prec in r.groups["numpy"] if ms.match(prec))
+        assert r.find_matches(ms) == expected
+    assert "numpy" in r._match_tables
+
+
+def test_numpy_imported_lazily():
+    # conda.resolve is imported by most commands, which never build a table
+    code = (
+        "import conda.resolve\n"
+        "from conda.models.match_table import _numpy\n"
+        "print(_numpy.cache_info().currsize)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "0"
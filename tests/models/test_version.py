@@ -1,7 +1,8 @@
 # Copyright (C) 2012 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
 from copy import copy
-from random import shuffle
+from itertools import zip_longest
+from random import Random, shuffle
 
 import pytest
 
@@ -434,3 +435,68 @@ def test_pep_440_arbitrary_equality_operator():
     # We're going to leave the not implemented for now.
     with pytest.raises(InvalidVersionSpec):
         VersionSpec("===3.3.2")
+
+
+def _reference_cmp(a, b):
+    """The element-wise comparison VersionOrder used before sort keys."""
+    for t1, t2 in zip([a.version, a.local], [b.version, b.local]):
+        for v1, v2 in zip_longest(t1, t2, fillvalue=[]):
+            for c1, c2 in zip_longest(v1, v2, fillvalue=0):
+                if c1 == c2:
+                    continue
+                elif isinstance(c1, str):
+                    if not isinstance(c2, str):
+                        return -1
+                elif isinstance(c2, str):
+                    return 1
+                return -1 if c1 < c2 else 1
+    return 0
+
+
+def _random_version(rng):
+    # zeros, 'dev', 'post' and '_' exercise the fill value and special cases
+    parts = ("0", "00", "1", "2", "10", "a", "b", "rc", "dev", "post", "_", "*")
+
+    def component():
+        return "".join(rng.choice(parts) for _ in range(rng.randint(1, 3)))
+
+    def components():
+        return "".join(rng.choice("._") + component() for _ in range(rng.randint(0, 4)))
+
+    version = str(rng.choice((0, 1, 2, 10))) + components()
+    if rng.random() < 0.2:
+        version = f"{rng.randint(0, 2)}!{version}"
+    if rng.random() < 0.2:
+        version += f"+{component()}{components()}"
+    if rng.random() < 0.1:
+        version += "_"
+    return version
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_sort_key_matches_reference_order(seed):
+    rng = Random(seed)
+    versions = []
+    while len(versions) < 150:
+        try:
+            versions.append(VersionOrder(_random_version(rng)))
+        except InvalidVersionSpec:
+            pass
+    for a in versions:
+        for b in versions:
+            expected = _reference_cmp(a, b)
+            assert (a < b) == (expected < 0), (a, b)
+            assert (a == b) == (expected == 0), (a, b)
+            assert (a.sort_key < b.sort_key) == (expected < 0), (a, b)
+    assert [v.sort_key for v in sorted(versions)] == sorted(
+        v.sort_key for v in versions
+    )
+
+
+def test_sort_key_fill_values():
+    assert VersionOrder("1.1").sort_key == VersionOrder("1.1.0.0").sort_key
+    assert VersionOrder("1.1").sort_key == VersionOrder("0!1.1+0").sort_key
+    assert VersionOrder("1.0.a").sort_key < VersionOrder("1").sort_key
+    assert VersionOrder("1").sort_key < VersionOrder("1.0.0.1").sort_key
+    assert VersionOrder("1.1dev1").sort_key < VersionOrder("1.1_").sort_key
+    assert VersionOrder("1.1post1").sort_key > VersionOrder("1.1.post1").sort_key
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: BSD-3-Clause
 import hashlib
 import os
+import threading
 from os.path import exists, isfile
 from pathlib import Path
 from tempfile import mktemp
@@ -35,6 +36,8 @@ from conda.gateways.connection.download import (
 )
 from conda.models.channel import Channel
 
+from . import http_test_server
+
 
 @pytest.mark.integration
 def test_download_connectionerror():
@@ -285,15 +288,19 @@ def test_resume_partial(tmp_path: Path, package_repository_base, package_server)
         partial.seek(10)
         partial.truncate()
 
-    # resume from `.partial` file
-    download(url, output_path, size=size, sha256=sha256)
+    # resume from `.partial` file; the kept prefix is hashed with the rest
+    checksums = download(url, output_path, size=size, sha256=sha256)
+    assert checksums == {
+        "md5": checksum(package_path, algorithm="md5"),
+        "sha256": sha256,
+    }
 
     # exercise code that avoids requesting 'range not satisfiable' if partial
     # file is full-size
     partial_path = Path(str(output_path) + ".partial")
     output_path.rename(partial_path)
 
-    download(url, output_path, size=size, sha256=sha256)
+    assert download(url, output_path, size=size, sha256=sha256) == checksums
 
     # Get 'range not satisfiable' by requesting a start offset past the end of
     # the file. Imagine we partially download a file, and the remote is replaced
@@ -318,6 +325,65 @@ def test_resume_partial(tmp_path: Path, package_repository_base, package_server)
     download(url, output_path, size=size, sha256=sha256)
 
 
+@pytest.mark.parametrize("accept_ranges", [True, False])
+def test_download_segments(tmp_path: Path, mocker, accept_ranges):
+    served = tmp_path / "served"
+    served.mkdir()
+    data = os.urandom(100_000)
+    (served / "a-1-0.conda").write_bytes(data)
+    sha256 = hashlib.sha256(data).hexdigest()
+    mocker.patch("conda.gateways.connection.download.SEGMENT_SIZE", 30_000)
+
+    # bytes hashed, by whether a segment's thread hashed them
+    new_hasher = hashlib.new
+    hashed = {True: 0, False: 0}
+
+    class Hasher:
+        def __init__(self, name):
+            self.name = name
+            self._hasher = new_hasher(name)
+
+        def update(self, data):
+            if self.name == "sha256":
+                in_segment = threading.current_thread() is not threading.main_thread()
+                hashed[in_segment] += len(data)
+            self._hasher.update(data)
+
+        def hexdigest(self):
+            return self._hasher.hexdigest()
+
+    mocker.patch("conda.gateways.connection.download.hashlib.new", Hasher)
+
+    http = http_test_server.run_test_server(str(served), accept_ranges=accept_ranges)
+    try:
+        host, port = http.socket.getsockname()[:2]
+        output_path = tmp_path / "a-1-0.conda"
+        progress = []
+        checksums = download(
+            f"http://{host}:{port}/a-1-0.conda",
+            output_path,
+            sha256=sha256,
+            size=len(data),
+            progress_update_callback=progress.append,
+            segments=3,
+        )
+    finally:
+        http.shutdown()
+
+    assert output_path.read_bytes() == data
+    assert checksums["sha256"] == sha256
+    assert checksums["md5"] == hashlib.md5(data).hexdigest()
+    assert progress[-1] == 1
+    # each byte is hashed once
+    assert sum(hashed.values()) == len(data)
+    if accept_ranges:
+        assert sorted(http.ranges) == [(0, 33332), (33333, 66665), (66666, 99999)]
+        # the first segment as it streamed
+        assert hashed[True] == 33333
+    else:
+        assert http.ranges == []
+
+
 def test_download_http_errors():
     class Response:
         def __init__(self, status_code):
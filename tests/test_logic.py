@@ -1,10 +1,19 @@
 # Copyright (C) 2012 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
+import os
 from itertools import chain, combinations, permutations, product
 
 import pytest
 
-from conda.common.logic import FALSE, TRUE, Clauses, minimal_unsatisfiable_subset
+from conda.common.logic import (
+    FALSE,
+    TRUE,
+    BDDEncoding,
+    Clauses,
+    SatPortfolio,
+    TotalizerEncoding,
+    minimal_unsatisfiable_subset,
+)
 from conda.testing.helpers import raises
 
 # These routines implement logical tests with short-circuiting
@@ -419,3 +428,71 @@ def test_minimal_unsatisfiable_subset():
         res = minimal_unsatisfiable_subset(perm, sat)
         assert sorted(res) in ([[-1], [1]], [[-2], [2]])
         assert not sat(res)
+
+
+def test_save_restore_state():
+    C = Clauses()
+    x1 = C.new_var("x1")
+    x2 = C.new_var("x2")
+    C.Require(C.Or, x1, x2)
+    state = C.save_state()
+    m, count = C.m, C.get_clause_count()
+    for _ in range(2):
+        x3 = C.new_var("x3")
+        C.Require(C.And, C.Not(x1), x3)
+        C.Require(C.And, x2, FALSE)
+        assert C.unsat
+        C.restore_state(state)
+        assert (C.m, C.get_clause_count()) == (m, count)
+        assert "x3" not in C.names
+        assert not C.unsat
+        assert C.sat([(C.Not(x1),)], names=True) == {"x2"}
+
+
+def test_minimize_portfolio(mocker):
+    def minimize(portfolio):
+        C = Clauses(15)
+        C.portfolio = portfolio
+        C.Require(C.ExactlyOne, range(1, 6))
+        C.Require(C.ExactlyOne, range(6, 11))
+        C.Require(C.Or, 3, 8)
+        C.Require(C.Not, 6)
+        sol, sval = C.minimize([(k, k) for k in range(1, 11)])
+        # the optimum stays required
+        assert C.sat([(C.Not(3),)]) is None
+        return {lit for lit in sol if 0 < lit <= 15}, sval
+
+    portfolio = SatPortfolio(2, ["pycosat"])
+    shared_clauses = mocker.spy(portfolio, "shared_clauses")
+    submit = mocker.spy(portfolio, "submit")
+    try:
+        assert minimize(portfolio) == minimize(None) == ({3, 7}, 10)
+    finally:
+        portfolio.close()
+    # the clauses all probes have in common are written once per objective
+    assert shared_clauses.call_count == 2
+    assert submit.call_count > 2
+    for (shared_path, clauses, m), _ in submit.call_args_list:
+        assert not os.path.exists(shared_path)
+
+
+@pytest.mark.parametrize("weighted", [False, True], ids=["unweighted", "weighted"])
+def test_minimize_totalizer(weighted):
+    # minimize    sum(c_k x_k) over x_1..x_10
+    # subject to  exactly one of x_1..x_5 and at least two of x_6..x_10
+    coeffs = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3] if weighted else [1] * 10
+
+    def minimize(encoding):
+        C = Clauses(10)
+        C.Require(C.ExactlyOne, range(1, 6))
+        C.Prevent(C.AtMostOne, range(6, 11))
+        objective = [(c, k) for k, c in enumerate(coeffs, 1)]
+        sol, sval = C.minimize(objective, encoding=encoding)
+        # the optimum stays required
+        for sol in C.itersolve([], 10):
+            assert sum(c for c, k in objective if k in sol) == sval
+        return sval
+
+    assert (
+        minimize(BDDEncoding) == minimize(TotalizerEncoding) == (6 if weighted else 3)
+    )
@@ -0,0 +1,117 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import pytest
+
+from conda.base.context import conda_tests_ctxt_mgmt_def_pol
+from conda.common.io import env_var
+from conda.common.logic import BDDEncoding, TotalizerEncoding
+from conda.models.match_spec import MatchSpec
+from conda.testing.helpers import (
+    get_index_r_1,
+    get_index_r_2,
+    get_index_r_4,
+    get_index_r_5,
+)
+
+
+def test_base_clauses_reused():
+    _, r = get_index_r_1()
+    specs = [MatchSpec("numpy 1.7*"), MatchSpec("python 2.7*")]
+    first = r.solve(specs)
+    assert len(r._base_clauses_cache) == 1
+    ((index, (r2, C, state)),) = r._base_clauses_cache.items()
+    assert C.m > state[0][0]
+    assert r.solve(specs) == first
+    assert r.get_conflicting_specs(specs, specs) == ()
+    assert r._base_clauses_cache[index][:2] == (r2, C)
+    # the base clauses come back without what the solves added on top
+    assert r.base_clauses(r2.index) == (r2, C)
+    assert C.m == state[0][0]
+
+
+def test_pruning_reused(mocker):
+    specs = MatchSpec("numpy"), MatchSpec("python 2.7*"), MatchSpec("scipy")
+    # the same solve history, without the pruning to reuse
+    _, fresh = get_index_r_1()
+    fresh.get_reduced_index(specs[:2])
+    fresh._pruned_cache.clear()
+    match_any = mocker.spy(fresh, "match_any")
+    expected = fresh.get_reduced_index(specs)
+    fresh_checks = match_any.call_count
+
+    _, r = get_index_r_1()
+    r.get_reduced_index(specs[:2])
+    match_any = mocker.spy(r, "match_any")
+    # what `numpy` and `python 2.7*` pruned stays pruned; what they kept is
+    # checked again
+    assert r.get_reduced_index(specs) == expected
+    assert match_any.call_count < fresh_checks
+    # the larger result replaces the one it started from
+    ((_, pruned_by_specs),) = r._pruned_cache.items()
+    assert list(pruned_by_specs) == [frozenset(specs)]
+
+    mocker.patch("conda.resolve.PRUNED_CACHE_SIZE", 2)
+    for name in ("pandas", "cython", "nose"):
+        r.get_reduced_index((MatchSpec(name),))
+    assert list(pruned_by_specs) == [
+        frozenset((MatchSpec("cython"),)),
+        frozenset((MatchSpec("nose"),)),
+    ]
+
+
+def test_solve_sat_portfolio():
+    _, r = get_index_r_1()
+    specs = [MatchSpec("numpy"), MatchSpec("scipy"), MatchSpec("python 2.7*")]
+    expected = r.solve(specs)
+    _, r = get_index_r_1()
+    with env_var(
+        "CONDA_SAT_PORTFOLIO_PROCESSES",
+        "2",
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert r.solve(specs) == expected
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("encoding", [BDDEncoding, TotalizerEncoding])
+@pytest.mark.parametrize(
+    "get_index,specs",
+    [
+        (get_index_r_1, ("numpy", "scipy", "pandas", "python 2.7*")),
+        (get_index_r_2, ("python", "flask")),
+        (get_index_r_4, ("python", "requests")),
+        (get_index_r_5, ("python",)),
+    ],
+    ids=["index", "index2", "index4", "index5"],
+)
+def test_solve_objective_encoding(get_index, specs, encoding, mocker):
+    _, r = get_index()
+    specs = [MatchSpec(spec) for spec in specs]
+
+    def clauses_added():
+        ((_, C, state),) = r._base_clauses_cache.values()
+        return C.get_clause_count() - state[0][2]
+
+    r._base_clauses_cache.clear()
+    expected = r.solve(specs)
+    default_added = clauses_added()
+    mocker.patch(
+        "conda.base.context.Context.sat_objective_encodings",
+        new_callable=mocker.PropertyMock,
+        return_value={
+            metric: encoding
+            for metric in ("channel", "version", "build", "arch", "timestamp")
+        },
+    )
+    r._base_clauses_cache.clear()
+    assert r.solve(specs) == expected
+    added = clauses_added()
+    assert added > 0
+    if encoding == BDDEncoding:
+        # the default encoding
+        assert added == default_added
+    else:
+        # one totalizer per objective, instead of a diagram per bound tried
+        assert added <= default_added